@@ -1,33 +1,60 @@
 import pathlib
 import sys
-from argparse import ArgumentParser, Namespace
-from .dtypes import Convert as settings_conv, Metadata as settings_meta
-from .modes import Convert as app_conv, Metadata as app_meta
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+from .dtypes import All as settings_all, Benchmark as settings_bench, Convert as settings_conv, Get as settings_get, Index as settings_index, Merge as settings_merge, Metadata as settings_meta
+from .dtypes import Filter, Node
+from .modes import All as app_all, Benchmark as app_bench, Convert as app_conv, Get as app_get, Index as app_index, Merge as app_merge, Metadata as app_meta
+from .utils import compressions, extractors, normalize_pmcid, read_ids
+
+# The fields written as text by convert, the rest are metadata
+text_fields = ['abstract', 'body']
+metadata_fields = [x for x in extractors.keys() if x not in text_fields]
 
 def main() -> None:
     parser = ArgumentParser(prog = 'oas', description = "Tools to work with PMC's OAS data")
     subparsers = parser.add_subparsers(help = 'sub-commands')    
     metadata_parser(subparsers.add_parser('metadata', help = "Extracts the metadata from the corpus"))
     convert_parser(subparsers.add_parser('convert', help = "Convert the data to our standard format"))
+    all_parser(subparsers.add_parser('all', help = "Extracts the metadata and converts the data in a single pass"))
+    merge_parser(subparsers.add_parser('merge', help = "Checks and combines the output of a run shared across machines"))
+    index_parser(subparsers.add_parser('index', help = "Writes the member index for each .tar file"))
+    get_parser(subparsers.add_parser('get', help = "Gets individual articles using the catalog"))
+    benchmark_parser(subparsers.add_parser('benchmark', help = "Times each stage on a synthetic corpus"))
     args = parser.parse_args()
     print_args(args)
     args.run(args)
 
 def metadata_parser(parser: ArgumentParser) -> None:
     def run(args: Namespace) -> None:
-        set = settings_meta(args.source, args.dest, args.log)
+        set = settings_meta(args.source, args.dest, args.log, args.workers, args.jobs, args.stream_size, args.restart, args.split, args.catalog, filter_settings(args), args.fields, args.stats, args.prometheus, args.shard, args.queue_bytes, args.max_seconds, args.max_bytes, args.dedup, args.format)
         app = app_meta(set)
         app.init()
         app.run()
     parser.add_argument('-source', type = pathlib.Path, required = True, help = "The folder containing the .tar'ed JATS files.")
     parser.add_argument('-dest', type = pathlib.Path, required = True, help = "The CSV file used to store the metadata")
     parser.add_argument('-log', type = pathlib.Path, help = 'The folder of raw JATS files that did not process')
+    parser.add_argument('-workers', type = int, default = 1, help = 'The number of processes used to extract the articles')
+    parser.add_argument('-jobs', type = int, default = 1, help = 'The number of tar balls processed at once')
+    parser.add_argument('-stream_size', type = int, help = 'Documents larger than this many bytes are parsed in streaming mode')
+    parser.add_argument('-restart', action = 'store_true', help = 'Reprocess every tar ball, even the completed ones')
+    parser.add_argument('-split', type = int, default = 1, help = 'The number of byte ranges each .tar file is split into')
+    parser.add_argument('-catalog', type = pathlib.Path, help = 'The SQLite file that maps PMC id and DOI to where the document is')
+    filter_parser(parser, 'A file of PMC ids or DOIs to keep')
+    parser.add_argument('-fields', nargs = '+', choices = metadata_fields, help = 'The fields to extract, in CSV column order')
+    parser.add_argument('-stats', type = pathlib.Path, help = "The JSON file for the run's counters, seconds per stage and throughput")
+    parser.add_argument('-prometheus', type = pathlib.Path, help = 'The Prometheus textfile kept up to date during the run')
+    parser.add_argument('-shard', type = shard_arg, help = "This machine's share of the tar balls, as i/N for node i (from 0) of N")
+    parser.add_argument('-queue_bytes', type = int, default = 64 * 1024 * 1024, help = 'The bytes of documents read ahead, and of output waiting to be written. 0 turns the threads off')
+    parser.add_argument('-max_seconds', type = float, help = 'The most time a document may take to parse and extract, slower ones are quarantined')
+    parser.add_argument('-max_bytes', type = int, help = 'The largest document that is parsed, bigger ones are quarantined')
+    parser.add_argument('-dedup', type = pathlib.Path, help = 'The SQLite file of every copy of each PMC id, so only the newest (by package date) is written')
+    parser.add_argument('-format', choices = ['csv', 'sqlite'], default = 'csv', help = 'The format of the metadata. sqlite is a database updated in place')
     parser.set_defaults(run = run)
     parser.set_defaults(cmd = 'metadata')
 
 def convert_parser(parser: ArgumentParser) -> None:
     def run(args: Namespace) -> None:
-        set = settings_conv(args.source, args.dest, args.lines, args.dest_pattern, args.log)
+        set = settings_conv(args.source, args.dest, args.lines, args.dest_pattern, args.log, args.workers, args.jobs, args.stream_size, args.restart, args.split, args.catalog, args.ids, filter_settings(args), args.abbreviations, args.fields, args.stats, args.prometheus, args.compression, args.level, args.bytes, args.cache, args.shard, args.queue_bytes, args.max_seconds, args.max_bytes, args.dedup, args.dedup_body, args.format, args.corpus_stats)
         app = app_conv(set)
         app.init()
         app.run()
@@ -36,9 +63,151 @@ def convert_parser(parser: ArgumentParser) -> None:
     parser.add_argument('-lines', type = int, default = 250000, help = 'The number of lines per TXT file')
     parser.add_argument('-dest_pattern',  type = str, default = '{source}.{id:04}.txt', help = 'The format of the TXT file name')
     parser.add_argument('-log', type = pathlib.Path, help = 'The folder of raw JATS files that did not process')
+    parser.add_argument('-workers', type = int, default = 1, help = 'The number of processes used to extract the articles')
+    parser.add_argument('-jobs', type = int, default = 1, help = 'The number of tar balls processed at once')
+    parser.add_argument('-stream_size', type = int, help = 'Documents larger than this many bytes are parsed in streaming mode')
+    parser.add_argument('-restart', action = 'store_true', help = 'Reprocess every tar ball, even the completed ones')
+    parser.add_argument('-split', type = int, default = 1, help = 'The number of byte ranges each .tar file is split into')
+    parser.add_argument('-catalog', type = pathlib.Path, help = 'The SQLite file that maps PMC id and DOI to where the document is')
+    filter_parser(parser, 'A file of PMC ids or DOIs to keep. Seeks straight to them when the catalog exists')
+    parser.add_argument('-abbreviations', type = pathlib.Path, help = 'A file of words that do not end a sentence')
+    parser.add_argument('-fields', nargs = '+', choices = text_fields, help = 'The text fields to write, in order')
+    parser.add_argument('-compression', choices = compressions, help = 'The compression of the TXT files')
+    parser.add_argument('-level', type = int, help = 'The compression level')
+    parser.add_argument('-bytes', type = int, help = 'The number of bytes of text per TXT file, used instead of lines')
+    parser.add_argument('-cache', type = pathlib.Path, help = 'The folder of articles extracted by earlier runs')
+    parser.add_argument('-stats', type = pathlib.Path, help = "The JSON file for the run's counters, seconds per stage and throughput")
+    parser.add_argument('-prometheus', type = pathlib.Path, help = 'The Prometheus textfile kept up to date during the run')
+    parser.add_argument('-shard', type = shard_arg, help = "This machine's share of the tar balls, as i/N for node i (from 0) of N")
+    parser.add_argument('-queue_bytes', type = int, default = 64 * 1024 * 1024, help = 'The bytes of documents read ahead, and of output waiting to be written. 0 turns the threads off')
+    parser.add_argument('-max_seconds', type = float, help = 'The most time a document may take to parse and extract, slower ones are quarantined')
+    parser.add_argument('-max_bytes', type = int, help = 'The largest document that is parsed, bigger ones are quarantined')
+    parser.add_argument('-dedup', type = pathlib.Path, help = 'The SQLite file of every copy of each PMC id, so only the newest (by package date) is written')
+    parser.add_argument('-dedup_body', action = 'store_true', help = 'Also drop articles whose body is the same as one already written under another PMC id')
+    parser.add_argument('-format', choices = ['txt', 'jsonl'], default = 'txt', help = 'The format of the files. jsonl is one article per line, with an index of where each starts')
+    parser.add_argument('-corpus_stats', action = 'store_true', help = 'Write statistics of the text (I.E. tokens, sentence lengths, vocabulary) to oas.corpus.json in dest')
     parser.set_defaults(run = run)
     parser.set_defaults(cmd = 'convert')
 
+def all_parser(parser: ArgumentParser) -> None:
+    def run(args: Namespace) -> None:
+        set = settings_all(args.source, args.dest, args.metadata, args.lines, args.dest_pattern, args.log, args.workers, args.jobs, args.stream_size, args.restart, args.split, args.catalog, filter_settings(args), args.abbreviations, args.fields, args.text_fields, args.stats, args.prometheus, args.compression, args.level, args.bytes, args.cache, args.shard, args.queue_bytes, args.max_seconds, args.max_bytes, args.dedup, args.dedup_body, args.format, args.text_format, args.corpus_stats)
+        app = app_all(set)
+        app.init()
+        app.run()
+    parser.add_argument('-source', type = pathlib.Path, required = True, help = "The folder containing the .tar'ed JATS files.")
+    parser.add_argument('-dest', type = pathlib.Path, required = True, help = 'The folder for the converted TXT files')
+    parser.add_argument('-metadata', type = pathlib.Path, required = True, help = 'The CSV file used to store the metadata')
+    parser.add_argument('-lines', type = int, default = 250000, help = 'The number of lines per TXT file')
+    parser.add_argument('-dest_pattern',  type = str, default = '{source}.{id:04}.txt', help = 'The format of the TXT file name')
+    parser.add_argument('-log', type = pathlib.Path, help = 'The folder of raw JATS files that did not process')
+    parser.add_argument('-workers', type = int, default = 1, help = 'The number of processes used to extract the articles')
+    parser.add_argument('-jobs', type = int, default = 1, help = 'The number of tar balls processed at once')
+    parser.add_argument('-stream_size', type = int, help = 'Documents larger than this many bytes are parsed in streaming mode')
+    parser.add_argument('-restart', action = 'store_true', help = 'Reprocess every tar ball, even the completed ones')
+    parser.add_argument('-split', type = int, default = 1, help = 'The number of byte ranges each .tar file is split into')
+    parser.add_argument('-catalog', type = pathlib.Path, help = 'The SQLite file that maps PMC id and DOI to where the document is')
+    filter_parser(parser, 'A file of PMC ids or DOIs to keep')
+    parser.add_argument('-abbreviations', type = pathlib.Path, help = 'A file of words that do not end a sentence')
+    parser.add_argument('-fields', nargs = '+', choices = metadata_fields, help = 'The metadata fields to extract, in CSV column order')
+    parser.add_argument('-text_fields', nargs = '+', choices = text_fields, help = 'The text fields to write, in order')
+    parser.add_argument('-compression', choices = compressions, help = 'The compression of the TXT files')
+    parser.add_argument('-level', type = int, help = 'The compression level')
+    parser.add_argument('-bytes', type = int, help = 'The number of bytes of text per TXT file, used instead of lines')
+    parser.add_argument('-cache', type = pathlib.Path, help = 'The folder of articles extracted by earlier runs')
+    parser.add_argument('-stats', type = pathlib.Path, help = "The JSON file for the run's counters, seconds per stage and throughput")
+    parser.add_argument('-prometheus', type = pathlib.Path, help = 'The Prometheus textfile kept up to date during the run')
+    parser.add_argument('-shard', type = shard_arg, help = "This machine's share of the tar balls, as i/N for node i (from 0) of N")
+    parser.add_argument('-queue_bytes', type = int, default = 64 * 1024 * 1024, help = 'The bytes of documents read ahead, and of output waiting to be written. 0 turns the threads off')
+    parser.add_argument('-max_seconds', type = float, help = 'The most time a document may take to parse and extract, slower ones are quarantined')
+    parser.add_argument('-max_bytes', type = int, help = 'The largest document that is parsed, bigger ones are quarantined')
+    parser.add_argument('-dedup', type = pathlib.Path, help = 'The SQLite file of every copy of each PMC id, so only the newest (by package date) is written')
+    parser.add_argument('-dedup_body', action = 'store_true', help = 'Also drop articles whose body is the same as one already written under another PMC id')
+    parser.add_argument('-format', choices = ['csv', 'sqlite'], default = 'csv', help = 'The format of the metadata. sqlite is a database updated in place')
+    parser.add_argument('-text_format', choices = ['txt', 'jsonl'], default = 'txt', help = 'The format of the converted files. jsonl is one article per line, with an index of where each starts')
+    parser.add_argument('-corpus_stats', action = 'store_true', help = 'Write statistics of the text (I.E. tokens, sentence lengths, vocabulary) to oas.corpus.json in dest')
+    parser.set_defaults(run = run)
+    parser.set_defaults(cmd = 'all')
+
+def shard_arg(value: str) -> Node:
+    try:
+        index, count = value.split('/')
+        return Node(int(index), int(count))
+    except ValueError:
+        raise ArgumentTypeError(f'{value} is not i/N')
+
+def filter_parser(parser: ArgumentParser, ids_help: str) -> None:
+    parser.add_argument('-journal', action = 'append', help = 'Keep articles from this journal. Can be repeated')
+    parser.add_argument('-year_min', type = int, help = 'Keep articles published in or after this year')
+    parser.add_argument('-year_max', type = int, help = 'Keep articles published in or before this year')
+    parser.add_argument('-category', action = 'append', help = 'Keep articles with this subject. Can be repeated')
+    parser.add_argument('-ids', type = pathlib.Path, help = ids_help)
+
+def filter_settings(args: Namespace) -> Filter:
+    ids = None if args.ids is None else [x if '/' in x else normalize_pmcid(x) for x in read_ids(args.ids)]
+    return Filter(args.journal, args.year_min, args.year_max, args.category, ids)
+
+def merge_parser(parser: ArgumentParser) -> None:
+    def run(args: Namespace) -> None:
+        set = settings_merge(args.source, args.split, args.dest, args.metadata, args.catalog, args.format, args.fields)
+        app = app_merge(set)
+        app.init()
+        app.run()
+    parser.add_argument('-source', type = pathlib.Path, required = True, help = "The folder containing the .tar'ed JATS files.")
+    parser.add_argument('-split', type = int, default = 1, help = 'The number of byte ranges each .tar file was split into')
+    parser.add_argument('-dest', type = pathlib.Path, help = 'The folder of converted TXT files to check')
+    parser.add_argument('-metadata', type = pathlib.Path, help = 'The CSV file to merge the metadata into')
+    parser.add_argument('-catalog', type = pathlib.Path, help = 'The SQLite file that maps PMC id and DOI to where the document is')
+    parser.add_argument('-format', choices = ['csv', 'sqlite'], default = 'csv', help = 'The format of the metadata the nodes wrote. sqlite is a database updated in place')
+    parser.add_argument('-fields', nargs = '+', choices = metadata_fields, help = "The fields the nodes extracted, in CSV column order. Defaults to their CSV files' columns")
+    parser.set_defaults(run = run)
+    parser.set_defaults(cmd = 'merge')
+
+def index_parser(parser: ArgumentParser) -> None:
+    def run(args: Namespace) -> None:
+        set = settings_index(args.source, args.jobs, args.restart)
+        app = app_index(set)
+        app.init()
+        app.run()
+    parser.add_argument('-source', type = pathlib.Path, required = True, help = "The folder containing the .tar'ed JATS files.")
+    parser.add_argument('-jobs', type = int, default = 1, help = 'The number of tar balls indexed at once')
+    parser.add_argument('-restart', action = 'store_true', help = 'Rebuild every index, even the current ones')
+    parser.set_defaults(run = run)
+    parser.set_defaults(cmd = 'index')
+
+def get_parser(parser: ArgumentParser) -> None:
+    def run(args: Namespace) -> None:
+        set = settings_get(args.catalog, args.ids, args.xml)
+        app = app_get(set)
+        app.init()
+        app.run()
+    parser.add_argument('ids', nargs = '+', help = 'The PMC ids or DOIs to get')
+    parser.add_argument('-catalog', type = pathlib.Path, required = True, help = 'The SQLite file that maps PMC id and DOI to where the document is')
+    parser.add_argument('-xml', action = 'store_true', help = 'Output the raw JATS file instead of our standard format')
+    parser.set_defaults(run = run)
+    parser.set_defaults(cmd = 'get')
+
+def benchmark_parser(parser: ArgumentParser) -> None:
+    def run(args: Namespace) -> None:
+        set = settings_bench(args.dest, args.work, args.articles, args.seed, args.paragraphs, args.abstract, args.tables, args.malformed, args.repeat, args.workers, args.baseline, args.benchmarks)
+        app = app_bench(set)
+        app.init()
+        app.run()
+    parser.add_argument('-dest', type = pathlib.Path, required = True, help = 'The JSON file for the results')
+    parser.add_argument('-work', type = pathlib.Path, help = 'The folder for the synthetic tar ball and the outputs')
+    parser.add_argument('-articles', type = int, default = 1000, help = 'The number of synthetic articles')
+    parser.add_argument('-seed', type = int, default = 0, help = 'The seed of the synthetic articles')
+    parser.add_argument('-paragraphs', type = int, default = 20, help = 'The median number of body paragraphs per article')
+    parser.add_argument('-abstract', type = float, default = 0.9, help = 'The fraction of articles with an abstract')
+    parser.add_argument('-tables', type = float, default = 1.0, help = 'The mean number of tables per article')
+    parser.add_argument('-malformed', type = float, default = 0.02, help = 'The fraction of articles with malformed XML')
+    parser.add_argument('-repeat', type = int, default = 3, help = 'The number of times each benchmark is timed')
+    parser.add_argument('-workers', type = int, default = 1, help = 'The number of processes convert and metadata use to extract the articles')
+    parser.add_argument('-baseline', type = pathlib.Path, help = 'The results of an earlier run to compare against')
+    parser.add_argument('-benchmarks', nargs = '+', choices = app_bench.names, help = 'The benchmarks to run')
+    parser.set_defaults(run = run)
+    parser.set_defaults(cmd = 'benchmark')
+
 def print_args(args: Namespace) -> None:
     print(f'--- {args.cmd} ---')
     for key in args.__dict__.keys():
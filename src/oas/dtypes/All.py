@@ -0,0 +1,219 @@
+import pathlib
+import typing as t
+from .Convert import Convert
+from .Filter import Filter
+from .Metadata import Metadata
+from .types import Limits, Node
+
+class All:
+
+    def __init__(self, source: pathlib.Path, dest: pathlib.Path, metadata: pathlib.Path, lines: int, dest_pattern: str, log: t.Optional[pathlib.Path], workers: int = 1, jobs: int = 1, stream_size: t.Optional[int] = None, restart: bool = False, split: int = 1, catalog: t.Optional[pathlib.Path] = None, filter: t.Optional[Filter] = None, abbreviations: t.Optional[pathlib.Path] = None, fields: t.Optional[t.List[str]] = None, text_fields: t.Optional[t.List[str]] = None, stats: t.Optional[pathlib.Path] = None, prometheus: t.Optional[pathlib.Path] = None, compression: t.Optional[str] = None, level: t.Optional[int] = None, bytes: t.Optional[int] = None, cache: t.Optional[pathlib.Path] = None, shard: t.Optional[Node] = None, queue_bytes: int = 64 * 1024 * 1024, max_seconds: t.Optional[float] = None, max_bytes: t.Optional[int] = None, dedup: t.Optional[pathlib.Path] = None, dedup_body: bool = False, format: str = 'csv', text_format: str = 'txt', corpus_stats: bool = False):
+        """
+        Settings for the fused metadata and convert process
+
+        Parameters
+        ----------
+        source : pathlib.Path
+            The folder containing the .tar'ed JATS files
+        dest : pathlib.Path
+            The folder for the converted TXT files
+        metadata : pathlib.Path
+            The CSV file used to store the metadata
+        lines: int
+            The number of lines per TXT file
+        dest_pattern: str
+            The format of the TXT file name.
+        log: pathlib.Path
+            The folder of raw JATS files that did not process
+        workers: int
+            The number of processes used to extract the articles
+        jobs: int
+            The number of tar balls processed at once
+        stream_size: int
+            Documents larger than this many bytes are parsed in streaming mode
+        restart: bool
+            Reprocess every tar ball, even the ones the manifests say are complete
+        split: int
+            The number of byte ranges each .tar file is split into
+        catalog: pathlib.Path
+            The SQLite file that maps PMC id and DOI to where the document is
+        filter: Filter
+            The articles to keep
+        abbreviations: pathlib.Path
+            A file of words that do not end a sentence, one per line. It replaces the built in list
+        fields: t.List[str]
+            The metadata fields to extract, in CSV column order. Empty means all of them
+        text_fields: t.List[str]
+            The text fields (abstract and/or body) to write, in order. Empty means both
+        stats: pathlib.Path
+            The JSON file for the run's counters, seconds per stage and throughput
+        prometheus: pathlib.Path
+            The Prometheus textfile kept up to date during the run
+        compression: str
+            The compression of the TXT files (gzip, bz2 or xz). Empty means none
+        level: int
+            The compression level. Empty means the compression's default
+        bytes: int
+            The number of bytes of text per TXT file, used instead of `lines`
+        cache: pathlib.Path
+            The folder of articles extracted by earlier runs, so unchanged documents are not parsed again
+        shard: Node
+            This machine's share of the tar balls, when the run is shared across machines
+        queue_bytes: int
+            The bytes of documents read ahead, and of output waiting to be written. 0 reads, parses and writes in turn
+        max_seconds: float
+            The most time a document may take to parse and extract, before it is quarantined
+        max_bytes: int
+            The largest document that is parsed, bigger ones are quarantined
+        dedup: pathlib.Path
+            The SQLite file of every copy of each PMC id, so only the newest is written. Kept across runs
+        dedup_body: bool
+            Also drop articles whose body is the same as one already written under another PMC id
+        format: str
+            The format of the metadata, csv or sqlite (a database updated in place)
+        text_format: str
+            The format of the converted files, txt or jsonl (one article per line, with an index of where each starts)
+        corpus_stats: bool
+            Gather statistics of the text (I.E. tokens, sentence lengths, vocabulary) as it is written
+        """
+        self._source = source
+        self._dest = dest
+        self._metadata = metadata
+        self._lines = lines
+        self._dest_pattern = dest_pattern
+        self._log = log
+        self._workers = workers
+        self._jobs = jobs
+        self._stream_size = stream_size
+        self._restart = restart
+        self._split = split
+        self._catalog = catalog
+        self._filter = filter
+        self._abbreviations = abbreviations
+        self._fields = fields
+        self._text_fields = text_fields
+        self._stats = stats
+        self._prometheus = prometheus
+        self._compression = compression
+        self._level = level
+        self._bytes = bytes
+        self._cache = cache
+        self._shard = shard
+        self._queue_bytes = queue_bytes
+        self._max_seconds = max_seconds
+        self._max_bytes = max_bytes
+        self._dedup = dedup
+        self._dedup_body = dedup_body
+        self._format = format
+        self._text_format = text_format
+        self._corpus_stats = corpus_stats
+
+    @property
+    def source(self) -> pathlib.Path:
+        return self._source
+    @property
+    def dest(self) -> pathlib.Path:
+        return self._dest
+    @property
+    def metadata(self) -> pathlib.Path:
+        return self._metadata
+    @property
+    def lines(self) -> int:
+        return self._lines
+    @property
+    def dest_pattern(self) -> str:
+        return self._dest_pattern
+    @property
+    def log(self) -> t.Optional[pathlib.Path]:
+        return self._log
+    @property
+    def workers(self) -> int:
+        return self._workers
+    @property
+    def jobs(self) -> int:
+        return self._jobs
+    @property
+    def stream_size(self) -> t.Optional[int]:
+        return self._stream_size
+    @property
+    def restart(self) -> bool:
+        return self._restart
+    @property
+    def split(self) -> int:
+        return self._split
+    @property
+    def catalog(self) -> t.Optional[pathlib.Path]:
+        return self._catalog
+    @property
+    def filter(self) -> t.Optional[Filter]:
+        return self._filter
+    @property
+    def abbreviations(self) -> t.Optional[pathlib.Path]:
+        return self._abbreviations
+    @property
+    def fields(self) -> t.Optional[t.List[str]]:
+        return self._fields
+    @property
+    def text_fields(self) -> t.Optional[t.List[str]]:
+        return self._text_fields
+    @property
+    def stats(self) -> t.Optional[pathlib.Path]:
+        return self._stats
+    @property
+    def prometheus(self) -> t.Optional[pathlib.Path]:
+        return self._prometheus
+    @property
+    def compression(self) -> t.Optional[str]:
+        return self._compression
+    @property
+    def level(self) -> t.Optional[int]:
+        return self._level
+    @property
+    def bytes(self) -> t.Optional[int]:
+        return self._bytes
+    @property
+    def cache(self) -> t.Optional[pathlib.Path]:
+        return self._cache
+    @property
+    def shard(self) -> t.Optional[Node]:
+        return self._shard
+    @property
+    def queue_bytes(self) -> int:
+        return self._queue_bytes
+    @property
+    def limits(self) -> Limits:
+        return Limits(self._max_seconds, self._max_bytes)
+    @property
+    def dedup(self) -> t.Optional[pathlib.Path]:
+        return self._dedup
+    @property
+    def dedup_body(self) -> bool:
+        return self._dedup_body
+    @property
+    def format(self) -> str:
+        return self._format
+    @property
+    def text_format(self) -> str:
+        return self._text_format
+    @property
+    def corpus_stats(self) -> bool:
+        return self._corpus_stats
+
+    def as_convert(self) -> Convert:
+        """
+        The settings for the convert half of the process
+        """
+        return Convert(self._source, self._dest, self._lines, self._dest_pattern, self._log, self._workers, self._jobs, self._stream_size, self._restart, self._split, self._catalog, None, self._filter, self._abbreviations, self._text_fields, self._stats, self._prometheus, self._compression, self._level, self._bytes, self._cache, self._shard, self._queue_bytes, self._max_seconds, self._max_bytes, self._dedup, self._dedup_body, self._text_format, self._corpus_stats)
+
+    def as_metadata(self) -> Metadata:
+        """
+        The settings for the metadata half of the process
+        """
+        return Metadata(self._source, self._metadata, self._log, self._workers, self._jobs, self._stream_size, self._restart, self._split, self._catalog, self._filter, self._fields, self._stats, self._prometheus, self._shard, self._queue_bytes, self._max_seconds, self._max_bytes, self._dedup, self._format)
+
+    def validate(self) -> None:
+        """
+        Ensures the settings have face validity
+        """
+        self.as_convert().validate()
+        self.as_metadata().validate()
@@ -0,0 +1,116 @@
+import pathlib
+import typing as t
+
+class Benchmark:
+
+    def __init__(self, dest: pathlib.Path, work: t.Optional[pathlib.Path] = None, articles: int = 1000, seed: int = 0, paragraphs: int = 20, abstract: float = 0.9, tables: float = 1.0, malformed: float = 0.02, repeat: int = 3, workers: int = 1, baseline: t.Optional[pathlib.Path] = None, benchmarks: t.Optional[t.List[str]] = None):
+        """
+        Settings for benchmark process
+
+        Parameters
+        ----------
+        dest : pathlib.Path
+            The JSON file for the results
+        work : pathlib.Path
+            The folder for the synthetic tar ball and the outputs. Empty means a temporary folder
+        articles : int
+            The number of synthetic articles
+        seed : int
+            The seed of the synthetic articles. The same settings always make the same tar ball
+        paragraphs : int
+            The median number of body paragraphs per article
+        abstract : float
+            The fraction of articles with an abstract
+        tables : float
+            The mean number of tables per article
+        malformed : float
+            The fraction of articles with malformed XML
+        repeat : int
+            The number of times each benchmark is timed. The best time is reported
+        workers : int
+            The number of processes `convert` and `metadata` use to extract the articles
+        baseline : pathlib.Path
+            The results of an earlier run to compare against
+        benchmarks : t.List[str]
+            The benchmarks to run. Empty means all of them
+        """
+        self._dest = dest
+        self._work = work
+        self._articles = articles
+        self._seed = seed
+        self._paragraphs = paragraphs
+        self._abstract = abstract
+        self._tables = tables
+        self._malformed = malformed
+        self._repeat = repeat
+        self._workers = workers
+        self._baseline = baseline
+        self._benchmarks = benchmarks
+
+    @property
+    def dest(self) -> pathlib.Path:
+        return self._dest
+    @property
+    def work(self) -> t.Optional[pathlib.Path]:
+        return self._work
+    @property
+    def articles(self) -> int:
+        return self._articles
+    @property
+    def seed(self) -> int:
+        return self._seed
+    @property
+    def paragraphs(self) -> int:
+        return self._paragraphs
+    @property
+    def abstract(self) -> float:
+        return self._abstract
+    @property
+    def tables(self) -> float:
+        return self._tables
+    @property
+    def malformed(self) -> float:
+        return self._malformed
+    @property
+    def repeat(self) -> int:
+        return self._repeat
+    @property
+    def workers(self) -> int:
+        return self._workers
+    @property
+    def baseline(self) -> t.Optional[pathlib.Path]:
+        return self._baseline
+    @property
+    def benchmarks(self) -> t.Optional[t.List[str]]:
+        return self._benchmarks
+
+    def validate(self) -> None:
+        """
+        Ensures the settings have face validity
+        """
+        def _folder(path: pathlib.Path) -> None:
+            if not path.exists():
+                raise ValueError(f'{str(path)} is does not exist')
+            if not path.is_dir():
+                raise ValueError(f'{str(path)} is not a folder')
+        def _nonzero_int(val: int):
+            if val <= 0:
+                raise ValueError(f'{val} must be > 0')
+        def _fraction(val: float):
+            if val < 0 or val > 1:
+                raise ValueError(f'{val} must be between 0 and 1')
+        _folder(self._dest.parent)
+        if self._work is not None:
+            _folder(self._work)
+        _nonzero_int(self._articles)
+        _nonzero_int(self._paragraphs)
+        _nonzero_int(self._repeat)
+        _nonzero_int(self._workers)
+        _fraction(self._abstract)
+        _fraction(self._malformed)
+        if self._tables < 0:
+            raise ValueError(f'{self._tables} must be >= 0')
+        if self._baseline is not None and not self._baseline.is_file():
+            raise ValueError(f'{str(self._baseline)} is not a file')
+        if self._benchmarks is not None and len(self._benchmarks) == 0:
+            raise ValueError('benchmarks must not be empty')
@@ -1,9 +1,11 @@
 import pathlib
 import typing as t
+from .Filter import Filter
+from .types import Limits, Node
 
 class Convert:
 
-    def __init__(self, source: pathlib.Path, dest: pathlib.Path, lines: int, dest_pattern: str, log: t.Optional[pathlib.Path]):
+    def __init__(self, source: pathlib.Path, dest: pathlib.Path, lines: int, dest_pattern: str, log: t.Optional[pathlib.Path], workers: int = 1, jobs: int = 1, stream_size: t.Optional[int] = None, restart: bool = False, split: int = 1, catalog: t.Optional[pathlib.Path] = None, ids: t.Optional[pathlib.Path] = None, filter: t.Optional[Filter] = None, abbreviations: t.Optional[pathlib.Path] = None, fields: t.Optional[t.List[str]] = None, stats: t.Optional[pathlib.Path] = None, prometheus: t.Optional[pathlib.Path] = None, compression: t.Optional[str] = None, level: t.Optional[int] = None, bytes: t.Optional[int] = None, cache: t.Optional[pathlib.Path] = None, shard: t.Optional[Node] = None, queue_bytes: int = 64 * 1024 * 1024, max_seconds: t.Optional[float] = None, max_bytes: t.Optional[int] = None, dedup: t.Optional[pathlib.Path] = None, dedup_body: bool = False, format: str = 'txt', corpus_stats: bool = False):
         """
         Settings for convert process
 
@@ -19,12 +21,84 @@ class Convert:
             The format of the TXT file name.
         log: pathlib.Path
             The folder of raw JATS files that did not process
+        workers: int
+            The number of processes used to extract the articles
+        jobs: int
+            The number of tar balls processed at once
+        stream_size: int
+            Documents larger than this many bytes are parsed in streaming mode
+        restart: bool
+            Reprocess every tar ball, even the ones the manifest says are complete
+        split: int
+            The number of byte ranges each .tar file is split into
+        catalog: pathlib.Path
+            The SQLite file that maps PMC id and DOI to where the document is
+        ids: pathlib.Path
+            A file of PMC ids or DOIs, one per line, to convert instead of the whole corpus
+        filter: Filter
+            The articles to keep
+        abbreviations: pathlib.Path
+            A file of words that do not end a sentence, one per line. It replaces the built in list
+        fields: t.List[str]
+            The text fields (abstract and/or body) to write, in order. Empty means both
+        stats: pathlib.Path
+            The JSON file for the run's counters, seconds per stage and throughput
+        prometheus: pathlib.Path
+            The Prometheus textfile kept up to date during the run
+        compression: str
+            The compression of the TXT files (gzip, bz2 or xz). Empty means none
+        level: int
+            The compression level. Empty means the compression's default
+        bytes: int
+            The number of bytes of text per TXT file, used instead of `lines`
+        cache: pathlib.Path
+            The folder of articles extracted by earlier runs, so unchanged documents are not parsed again
+        shard: Node
+            This machine's share of the tar balls, when the run is shared across machines
+        queue_bytes: int
+            The bytes of documents read ahead, and of output waiting to be written. 0 reads, parses and writes in turn
+        max_seconds: float
+            The most time a document may take to parse and extract, before it is quarantined
+        max_bytes: int
+            The largest document that is parsed, bigger ones are quarantined
+        dedup: pathlib.Path
+            The SQLite file of every copy of each PMC id, so only the newest is written. Kept across runs
+        dedup_body: bool
+            Also drop articles whose body is the same as one already written under another PMC id
+        format: str
+            The format of the files, txt or jsonl (one article per line, with an index of where each starts)
+        corpus_stats: bool
+            Gather statistics of the text (I.E. tokens, sentence lengths, vocabulary) as it is written
         """
         self._source = source
         self._dest = dest
         self._lines = lines
         self._dest_pattern = dest_pattern
         self._log = log
+        self._workers = workers
+        self._jobs = jobs
+        self._stream_size = stream_size
+        self._restart = restart
+        self._split = split
+        self._catalog = catalog
+        self._ids = ids
+        self._filter = filter
+        self._abbreviations = abbreviations
+        self._fields = fields
+        self._stats = stats
+        self._prometheus = prometheus
+        self._compression = compression
+        self._level = level
+        self._bytes = bytes
+        self._cache = cache
+        self._shard = shard
+        self._queue_bytes = queue_bytes
+        self._max_seconds = max_seconds
+        self._max_bytes = max_bytes
+        self._dedup = dedup
+        self._dedup_body = dedup_body
+        self._format = format
+        self._corpus_stats = corpus_stats
 
     @property
     def source(self) -> pathlib.Path:
@@ -41,6 +115,75 @@ class Convert:
     @property
     def log(self) -> t.Optional[pathlib.Path]:
         return self._log
+    @property
+    def workers(self) -> int:
+        return self._workers
+    @property
+    def jobs(self) -> int:
+        return self._jobs
+    @property
+    def stream_size(self) -> t.Optional[int]:
+        return self._stream_size
+    @property
+    def restart(self) -> bool:
+        return self._restart
+    @property
+    def split(self) -> int:
+        return self._split
+    @property
+    def catalog(self) -> t.Optional[pathlib.Path]:
+        return self._catalog
+    @property
+    def ids(self) -> t.Optional[pathlib.Path]:
+        return self._ids
+    @property
+    def filter(self) -> t.Optional[Filter]:
+        return self._filter
+    @property
+    def abbreviations(self) -> t.Optional[pathlib.Path]:
+        return self._abbreviations
+    @property
+    def fields(self) -> t.Optional[t.List[str]]:
+        return self._fields
+    @property
+    def stats(self) -> t.Optional[pathlib.Path]:
+        return self._stats
+    @property
+    def prometheus(self) -> t.Optional[pathlib.Path]:
+        return self._prometheus
+    @property
+    def compression(self) -> t.Optional[str]:
+        return self._compression
+    @property
+    def level(self) -> t.Optional[int]:
+        return self._level
+    @property
+    def bytes(self) -> t.Optional[int]:
+        return self._bytes
+    @property
+    def cache(self) -> t.Optional[pathlib.Path]:
+        return self._cache
+    @property
+    def shard(self) -> t.Optional[Node]:
+        return self._shard
+    @property
+    def queue_bytes(self) -> int:
+        return self._queue_bytes
+    @property
+    def limits(self) -> Limits:
+        return Limits(self._max_seconds, self._max_bytes)
+    @property
+    def dedup(self) -> t.Optional[pathlib.Path]:
+        return self._dedup
+    @property
+    def dedup_body(self) -> bool:
+        return self._dedup_body
+    @property
+    def format(self) -> str:
+        return self._format
+    @property
+    def corpus_stats(self) -> bool:
+        return self._corpus_stats
 
     def validate(self) -> None:
         """
@@ -57,5 +200,63 @@ class Convert:
         _folder(self._source)
         _folder(self._dest)
         _nonzero_int(self._lines)
+        _nonzero_int(self._workers)
+        _nonzero_int(self._jobs)
+        _nonzero_int(self._split)
+        if self._catalog is not None:
+            _folder(self._catalog.parent)
+        if self._ids is not None:
+            if not self._ids.is_file():
+                raise ValueError(f'{str(self._ids)} is not a file')
+        if self._abbreviations is not None and not self._abbreviations.is_file():
+            raise ValueError(f'{str(self._abbreviations)} is not a file')
+        if self._stream_size is not None:
+            _nonzero_int(self._stream_size)
         if self._log is not None:
             _folder(self._log)
+        if self._stats is not None:
+            _folder(self._stats.parent)
+        if self._prometheus is not None:
+            _folder(self._prometheus.parent)
+        if self._filter is not None:
+            self._filter.validate()
+        if self._bytes is not None:
+            _nonzero_int(self._bytes)
+        if self._cache is not None:
+            _folder(self._cache)
+        if self._queue_bytes < 0:
+            raise ValueError(f'{self._queue_bytes} must be >= 0')
+        if self._max_seconds is not None and self._max_seconds <= 0:
+            raise ValueError(f'{self._max_seconds} must be > 0')
+        if self._max_bytes is not None:
+            _nonzero_int(self._max_bytes)
+        if self._dedup is not None:
+            _folder(self._dedup.parent)
+        if self._dedup_body:
+            if self._dedup is None:
+                raise ValueError('dedup_body needs dedup')
+            if self._fields is not None and 'body' not in self._fields:
+                raise ValueError('dedup_body needs the body field')
+        if self._shard is not None:
+            if self._shard.nodes <= 0 or self._shard.node < 0 or self._shard.node >= self._shard.nodes:
+                raise ValueError(f'shard {self._shard.node}/{self._shard.nodes} must be between 0/N and N-1/N')
+            if self._catalog is not None:
+                raise ValueError('catalog can not be used with shard, pass it to merge instead')
+        if self._compression is not None and self._compression not in ['gzip', 'bz2', 'xz']:
+            raise ValueError(f'{self._compression} is not a known compression')
+        if self._format not in ['txt', 'jsonl']:
+            raise ValueError(f'{self._format} is not a known format')
+        if self._format == 'jsonl' and self._compression is not None:
+            raise ValueError('jsonl can not be compressed, its index is of the uncompressed bytes')
+        if self._level is not None:
+            if self._compression is None:
+                raise ValueError('level needs a compression')
+            low = 0 if self._compression == 'gzip' or self._compression == 'xz' else 1
+            if self._level < low or self._level > 9:
+                raise ValueError(f'{self._level} must be between {low} and 9 for {self._compression}')
+        if self._fields is not None:
+            if len(self._fields) == 0:
+                raise ValueError('fields must not be empty')
+            for field in self._fields:
+                if field not in ['abstract', 'body']:
+                    raise ValueError(f'{field} is not a text field')
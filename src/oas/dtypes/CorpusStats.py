@@ -0,0 +1,163 @@
+import base64
+import collections
+import hashlib
+import math
+import re
+import typing as t
+from .types import Article
+
+# The most tokens a sentence is binned by, longer ones share the last bin
+sentence_bins = 128
+# Articles are binned by the power of 2 of their tokens
+article_bins = 32
+# The number of most frequent tokens reported
+top_count = 100
+# The number of tokens the heavy hitters sketch keeps. Each count is at most `tokens_error` low
+top_capacity = 10000
+# The vocabulary estimate uses 2^14 registers, a standard error of about 0.8%
+_hll_bits = 14
+_hll_size = 1 << _hll_bits
+# Tokens waiting to be hashed into the registers, so each distinct one is hashed once per batch
+_pending_limit = 1000000
+_word = re.compile(r"\w+(?:[-'’]\w+)*")
+
+class CorpusStats:
+
+    def __init__(self):
+        """
+        Statistics of the text written, gathered as it is written.
+        Each part is a sketch that merges by adding (or taking the max), so each tar ball's can be kept apart then combined.
+        Tokens are the case folded words of the sentences.
+        The sentences and tokens are counted exactly, along with the articles per journal and per year (when there is one).
+        The sentence and article lengths, in tokens, are fixed bin histograms.
+        The vocabulary size is a HyperLogLog estimate and the most frequent tokens are a Misra-Gries summary.
+        """
+        self._counts: t.Counter[str] = collections.Counter()
+        self._sentence_tokens = [0] * (sentence_bins + 1)
+        self._article_tokens = [0] * article_bins
+        self._journals: t.Counter[str] = collections.Counter()
+        self._years: t.Counter[str] = collections.Counter()
+        self._registers = bytearray(_hll_size)
+        self._pending: t.Set[str] = set()
+        self._tokens: t.Counter[str] = collections.Counter()
+        self._tokens_error = 0
+
+    def __reduce__(self):
+        # Worker processes send their sketches back to the parent
+        return (CorpusStats.from_dict, (self.to_dict(),))
+
+    def add(self, article: Article, sentences: t.Iterable[str]) -> None:
+        """
+        Adds the article, given its sentences as written
+        """
+        words: t.List[str] = []
+        for sentence in sentences:
+            found = _word.findall(sentence.casefold())
+            self._counts['sentences'] += 1
+            self._counts['characters'] += len(sentence)
+            self._sentence_tokens[min(len(found), sentence_bins)] += 1
+            words.extend(found)
+        self._counts['articles'] += 1
+        self._counts['tokens'] += len(words)
+        self._article_tokens[min(len(words).bit_length(), article_bins - 1)] += 1
+        self._journals[str(article.get('journal'))] += 1
+        if article.get('year') is not None:
+            self._years[str(article['year'])] += 1
+        self._tokens.update(words)
+        if len(self._tokens) > 2 * top_capacity:
+            self._prune()
+        self._pending.update(words)
+        if len(self._pending) > _pending_limit:
+            self._hash_pending()
+
+    def merge(self, other: 'CorpusStats') -> None:
+        """
+        Adds another set of statistics to these ones
+        """
+        other._hash_pending()
+        self._counts.update(other._counts)
+        self._sentence_tokens = [a + b for a, b in zip(self._sentence_tokens, other._sentence_tokens)]
+        self._article_tokens = [a + b for a, b in zip(self._article_tokens, other._article_tokens)]
+        self._journals.update(other._journals)
+        self._years.update(other._years)
+        self._registers = bytearray(map(max, self._registers, other._registers))
+        self._tokens.update(other._tokens)
+        self._tokens_error += other._tokens_error
+        self._prune()
+
+    def vocabulary(self) -> int:
+        """
+        The estimated number of distinct tokens
+        """
+        self._hash_pending()
+        alpha = 0.7213 / (1 + 1.079 / _hll_size)
+        estimate = alpha * _hll_size * _hll_size / sum(2.0 ** -x for x in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * _hll_size and zeros > 0:
+            estimate = _hll_size * math.log(_hll_size / zeros)
+        return round(estimate)
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        """
+        The statistics as JSON, with the sketches needed to merge them again (see `from_dict`)
+        """
+        self._hash_pending()
+        self._prune()
+        top = self._tokens.most_common(top_count)
+        return {
+            'articles': self._counts['articles'],
+            'sentences': self._counts['sentences'],
+            'tokens': self._counts['tokens'],
+            'characters': self._counts['characters'],
+            'vocabulary': self.vocabulary(),
+            'sentence_tokens': { 'edges': [x for x in range(sentence_bins + 1)], 'counts': self._sentence_tokens },
+            'article_tokens': { 'edges': [0] + [1 << x for x in range(article_bins - 1)], 'counts': self._article_tokens },
+            'journals': dict(self._journals.most_common()),
+            'years': dict(sorted(self._years.items())),
+            'top_tokens': [[token, count] for token, count in top],
+            'top_tokens_error': self._tokens_error,
+            'sketches': {
+                'vocabulary': base64.b64encode(bytes(self._registers)).decode('ascii'),
+                'tokens': dict(self._tokens) } }
+
+    @staticmethod
+    def from_dict(values: t.Dict[str, t.Any]) -> 'CorpusStats':
+        """
+        The statistics written by `to_dict`
+        """
+        result = CorpusStats()
+        for name in ['articles', 'sentences', 'tokens', 'characters']:
+            result._counts[name] = values[name]
+        result._sentence_tokens = list(values['sentence_tokens']['counts'])
+        result._article_tokens = list(values['article_tokens']['counts'])
+        result._journals.update(values['journals'])
+        result._years.update(values['years'])
+        result._registers = bytearray(base64.b64decode(values['sketches']['vocabulary']))
+        result._tokens.update(values['sketches']['tokens'])
+        result._tokens_error = values['top_tokens_error']
+        return result
+
+    def _hash_pending(self) -> None:
+        """
+        Adds the waiting tokens to the vocabulary's registers
+        """
+        registers = self._registers
+        for token in self._pending:
+            hash = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size = 8).digest(), 'little')
+            i = hash & (_hll_size - 1)
+            # The position of the first 1 bit in the rest of the hash
+            rank = 64 - _hll_bits - (hash >> _hll_bits).bit_length() + 1
+            if rank > registers[i]:
+                registers[i] = rank
+        self._pending.clear()
+
+    def _prune(self) -> None:
+        """
+        Cuts the token counts down to the `top_capacity` largest, taking the next largest count off each (Misra-Gries).
+        Any token's count is then at most the total taken off too low.
+        """
+        if len(self._tokens) <= top_capacity:
+            return
+        cut = sorted(self._tokens.values(), reverse = True)[top_capacity]
+        self._tokens = collections.Counter({token: count - cut for token, count in self._tokens.items() if count > cut})
+        self._tokens_error += cut
@@ -0,0 +1,71 @@
+import typing as t
+
+class Filter:
+
+    def __init__(self, journals: t.Optional[t.List[str]] = None, year_min: t.Optional[int] = None, year_max: t.Optional[int] = None, categories: t.Optional[t.List[str]] = None, ids: t.Optional[t.List[str]] = None):
+        """
+        The articles to keep. An empty setting keeps everything
+
+        Parameters
+        ----------
+        journals : t.List[str]
+            Keep articles from any of these journals (case insensitive)
+        year_min : int
+            Keep articles published in or after this year
+        year_max : int
+            Keep articles published in or before this year
+        categories : t.List[str]
+            Keep articles with any of these subjects (case insensitive)
+        ids : t.List[str]
+            Keep articles with any of these PMC ids (I.E. PMC1234567, see `utils.normalize_pmcid`) or DOIs
+        """
+        self._journals = None if not journals else {x.strip().lower() for x in journals}
+        self._year_min = year_min
+        self._year_max = year_max
+        self._categories = None if not categories else {x.strip().lower() for x in categories}
+        self._ids = None if ids is None else [x.strip() for x in ids]
+        self._pmcids = None if ids is None else {x.strip() for x in ids if '/' not in x}
+        self._dois = None if ids is None else {x.strip().lower() for x in ids if '/' in x}
+
+    @property
+    def journals(self) -> t.Optional[t.Set[str]]:
+        return self._journals
+    @property
+    def year_min(self) -> t.Optional[int]:
+        return self._year_min
+    @property
+    def year_max(self) -> t.Optional[int]:
+        return self._year_max
+    @property
+    def categories(self) -> t.Optional[t.Set[str]]:
+        return self._categories
+    @property
+    def ids(self) -> t.Optional[t.List[str]]:
+        return self._ids
+    @property
+    def pmcids(self) -> t.Optional[t.Set[str]]:
+        return self._pmcids
+    @property
+    def dois(self) -> t.Optional[t.Set[str]]:
+        return self._dois
+    @property
+    def is_empty(self) -> bool:
+        return self._journals is None and self._year_min is None and self._year_max is None and self._categories is None and self._ids is None
+
+    def as_dict(self) -> t.Dict[str, t.Any]:
+        """
+        The filter's settings as plain, ordered values (I.E. to fingerprint the output it shaped)
+        """
+        return {
+            'journals': None if self._journals is None else sorted(self._journals),
+            'year_min': self._year_min,
+            'year_max': self._year_max,
+            'categories': None if self._categories is None else sorted(self._categories),
+            'ids': None if self._ids is None else sorted(set(self._ids)) }
+
+    def validate(self) -> None:
+        """
+        Ensures the settings have face validity
+        """
+        if self._year_min is not None and self._year_max is not None and self._year_min > self._year_max:
+            raise ValueError(f'{self._year_min} must be <= {self._year_max}')
@@ -0,0 +1,40 @@
+import pathlib
+import typing as t
+
+class Get:
+
+    def __init__(self, catalog: pathlib.Path, ids: t.List[str], xml: bool = False):
+        """
+        Settings for get process
+
+        Parameters
+        ----------
+        catalog : pathlib.Path
+            The SQLite file that maps PMC id and DOI to where the document is
+        ids : t.List[str]
+            The PMC ids or DOIs to get
+        xml: bool
+            Output the raw JATS file instead of our standard format
+        """
+        self._catalog = catalog
+        self._ids = ids
+        self._xml = xml
+
+    @property
+    def catalog(self) -> pathlib.Path:
+        return self._catalog
+    @property
+    def ids(self) -> t.List[str]:
+        return self._ids
+    @property
+    def xml(self) -> bool:
+        return self._xml
+
+    def validate(self) -> None:
+        """
+        Ensures the settings have face validity
+        """
+        if not self._catalog.is_file():
+            raise ValueError(f'{str(self._catalog)} is not a file')
+        if len(self._ids) == 0:
+            raise ValueError('at least one id is required')
@@ -0,0 +1,45 @@
+import pathlib
+
+class Index:
+
+    def __init__(self, source: pathlib.Path, jobs: int = 1, restart: bool = False):
+        """
+        Settings for index process
+
+        Parameters
+        ----------
+        source : pathlib.Path
+            The folder containing the .tar'ed JATS files
+        jobs: int
+            The number of tar balls indexed at once
+        restart: bool
+            Rebuild every index, even the current ones
+        """
+        self._source = source
+        self._jobs = jobs
+        self._restart = restart
+
+    @property
+    def source(self) -> pathlib.Path:
+        return self._source
+    @property
+    def jobs(self) -> int:
+        return self._jobs
+    @property
+    def restart(self) -> bool:
+        return self._restart
+
+    def validate(self) -> None:
+        """
+        Ensures the settings have face validity
+        """
+        def _folder(path: pathlib.Path) -> None:
+            if not path.exists():
+                raise ValueError(f'{str(path)} is does not exist')
+            if not path.is_dir():
+                raise ValueError(f'{str(path)} is not a folder')
+        def _nonzero_int(val: int):
+            if val <= 0:
+                raise ValueError(f'{val} must be > 0')
+        _folder(self._source)
+        _nonzero_int(self._jobs)
@@ -0,0 +1,142 @@
+import json
+import os
+import pathlib
+import typing as t
+from .types import Shard
+
+class Manifest:
+
+    def __init__(self, path: pathlib.Path):
+        """
+        The record of the tar balls that have been completely processed
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            The JSON file used to store the manifest
+        """
+        self._path = path
+        self._entries: t.Dict[str, t.Dict[str, t.Any]] = {}
+        if path.exists():
+            with open(path, 'r', encoding = 'utf-8') as fp:
+                self._entries = json.load(fp)
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._path
+    @property
+    def entries(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        return self._entries
+
+    def is_complete(self, tar_ball: pathlib.Path, folder: pathlib.Path, key: t.Optional[str] = None, fingerprint: t.Optional[str] = None) -> bool:
+        """
+        Checks if the tar ball is unchanged since it was processed, with the same settings, and its output is still there
+
+        Parameters
+        ----------
+        tar_ball : pathlib.Path
+            The tar ball
+        folder : pathlib.Path
+            The folder containing the output files
+        key : str
+            The name of the entry. It defaults to the tar ball's file name
+        fingerprint : str
+            The digest of the settings that shape the output (see `utils.fingerprint`). None skips the check
+        """
+        entry = self._entries.get(key or tar_ball.name)
+        if entry is None:
+            return False
+        stat = tar_ball.stat()
+        if entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime_ns:
+            return False
+        if fingerprint is not None and entry.get('fingerprint') != fingerprint:
+            return False
+        return all(folder.joinpath(name).exists() for name in entry['outputs'])
+
+    def outputs(self, tar_ball: pathlib.Path, key: t.Optional[str] = None) -> t.List[str]:
+        """
+        The output files recorded for the tar ball, if any
+        """
+        entry = self._entries.get(key or tar_ball.name)
+        return [] if entry is None else entry['outputs']
+
+    def complete(self, tar_ball: pathlib.Path, documents: int, errors: int, outputs: t.List[str], key: t.Optional[str] = None, issues: t.Optional[t.Dict[str, int]] = None, shards: t.Optional[t.List[Shard]] = None, fingerprint: t.Optional[str] = None) -> None:
+        """
+        Records the tar ball as completely processed then saves the manifest
+
+        Parameters
+        ----------
+        tar_ball : pathlib.Path
+            The tar ball
+        documents : int
+            The number of documents read from the tar ball
+        errors : int
+            The number of documents that did not process
+        outputs : t.List[str]
+            The names of the output files
+        key : str
+            The name of the entry. It defaults to the tar ball's file name
+        issues : t.Dict[str, int]
+            The number of documents that did not process for each issue
+        shards : t.List[Shard]
+            The article count, line count, size and first and last PMC id of each output file
+        fingerprint : str
+            The digest of the settings that shaped the output
+        """
+        stat = tar_ball.stat()
+        self._entries[key or tar_ball.name] = {
+            'path': str(tar_ball),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'documents': documents,
+            'errors': errors,
+            'issues': issues or {},
+            'outputs': outputs,
+            'fingerprint': fingerprint }
+        if shards is not None:
+            self._entries[key or tar_ball.name]['shards'] = [shard._asdict() for shard in shards]
+        self.save()
+
+    def issues(self, keys: t.Iterable[str]) -> t.Dict[str, int]:
+        """
+        The number of documents that did not process for each issue, summed over the entries
+        """
+        total: t.Dict[str, int] = {}
+        for key in keys:
+            for issue, count in self._entries.get(key, {}).get('issues', {}).items():
+                total[issue] = total.get(issue, 0) + count
+        return total
+
+    def forget(self, tar_ball: pathlib.Path, key: t.Optional[str] = None) -> None:
+        """
+        Removes the tar ball from the manifest
+        """
+        key = key or tar_ball.name
+        if key in self._entries:
+            del self._entries[key]
+            self.save()
+
+    def retain(self, keys: t.Iterable[str]) -> None:
+        """
+        Removes every other entry, leaving their output files alone (I.E. the tar balls another node now processes)
+        """
+        keep = set(keys)
+        if any(key not in keep for key in self._entries.keys()):
+            self._entries = {key: entry for key, entry in self._entries.items() if key in keep}
+            self.save()
+
+    def clear(self) -> None:
+        """
+        Removes every tar ball from the manifest
+        """
+        self._entries = {}
+        self.save()
+
+    def save(self) -> None:
+        """
+        Saves the manifest so a crash never leaves a half written file
+        """
+        temp = self._path.with_name(f'{self._path.name}.tmp')
+        with open(temp, 'w', encoding = 'utf-8') as fp:
+            json.dump(self._entries, fp, indent = 1)
+        os.replace(temp, self._path)
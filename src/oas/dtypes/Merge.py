@@ -0,0 +1,89 @@
+import pathlib
+import typing as t
+
+class Merge:
+
+    def __init__(self, source: pathlib.Path, split: int = 1, dest: t.Optional[pathlib.Path] = None, metadata: t.Optional[pathlib.Path] = None, catalog: t.Optional[pathlib.Path] = None, format: str = 'csv', fields: t.Optional[t.List[str]] = None):
+        """
+        Settings for merge process
+
+        Parameters
+        ----------
+        source : pathlib.Path
+            The folder containing the .tar'ed JATS files
+        split: int
+            The number of byte ranges each .tar file was split into
+        dest: pathlib.Path
+            The folder of converted TXT files to check
+        metadata: pathlib.Path
+            The CSV file to merge the metadata into
+        catalog: pathlib.Path
+            The SQLite file that maps PMC id and DOI to where the document is
+        format: str
+            The format of the metadata, csv or sqlite (a database updated in place)
+        fields: t.List[str]
+            The fields the nodes extracted, in CSV column order. None takes them from the nodes' CSV files
+        """
+        self._source = source
+        self._split = split
+        self._dest = dest
+        self._metadata = metadata
+        self._catalog = catalog
+        self._format = format
+        self._fields = fields
+
+    @property
+    def source(self) -> pathlib.Path:
+        return self._source
+    @property
+    def split(self) -> int:
+        return self._split
+    @property
+    def dest(self) -> t.Optional[pathlib.Path]:
+        return self._dest
+    @property
+    def metadata(self) -> t.Optional[pathlib.Path]:
+        return self._metadata
+    @property
+    def catalog(self) -> t.Optional[pathlib.Path]:
+        return self._catalog
+    @property
+    def format(self) -> str:
+        return self._format
+    @property
+    def fields(self) -> t.Optional[t.List[str]]:
+        return self._fields
+
+    def validate(self) -> None:
+        """
+        Ensures the settings have face validity
+        """
+        def _folder(path: pathlib.Path) -> None:
+            if not path.exists():
+                raise ValueError(f'{str(path)} is does not exist')
+            if not path.is_dir():
+                raise ValueError(f'{str(path)} is not a folder')
+        def _nonzero_int(val: int):
+            if val <= 0:
+                raise ValueError(f'{val} must be > 0')
+        _folder(self._source)
+        _nonzero_int(self._split)
+        if self._dest is None and self._metadata is None:
+            raise ValueError('dest and/or metadata must be given')
+        if self._dest is not None:
+            _folder(self._dest)
+        if self._metadata is not None:
+            _folder(self._metadata.parent.joinpath(f'{self._metadata.stem}.parts'))
+        if self._format not in ['csv', 'sqlite']:
+            raise ValueError(f'{self._format} is not a known format')
+        if self._fields is not None:
+            if self._metadata is None:
+                raise ValueError('fields needs metadata')
+            if len(self._fields) == 0:
+                raise ValueError('fields must not be empty')
+            if self._format == 'sqlite' and 'id' not in self._fields:
+                raise ValueError('sqlite needs the id field, it is the key')
+        if self._catalog is not None:
+            if self._metadata is None:
+                raise ValueError('catalog needs metadata')
+            _folder(self._catalog.parent)
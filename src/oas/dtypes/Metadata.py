@@ -1,9 +1,11 @@
 import pathlib
 import typing as t
+from .Filter import Filter
+from .types import Limits, Node
 
 class Metadata:
 
-    def __init__(self, source: pathlib.Path, dest: pathlib.Path, log: t.Optional[pathlib.Path]):
+    def __init__(self, source: pathlib.Path, dest: pathlib.Path, log: t.Optional[pathlib.Path], workers: int = 1, jobs: int = 1, stream_size: t.Optional[int] = None, restart: bool = False, split: int = 1, catalog: t.Optional[pathlib.Path] = None, filter: t.Optional[Filter] = None, fields: t.Optional[t.List[str]] = None, stats: t.Optional[pathlib.Path] = None, prometheus: t.Optional[pathlib.Path] = None, shard: t.Optional[Node] = None, queue_bytes: int = 64 * 1024 * 1024, max_seconds: t.Optional[float] = None, max_bytes: t.Optional[int] = None, dedup: t.Optional[pathlib.Path] = None, format: str = 'csv'):
         """
         Settings for metadata process
 
@@ -15,10 +17,58 @@ class Metadata:
             The CSV file used to store the metadata
         log: pathlib.Path
             The folder of raw JATS files that did not process
+        workers: int
+            The number of processes used to extract the articles
+        jobs: int
+            The number of tar balls processed at once
+        stream_size: int
+            Documents larger than this many bytes are parsed in streaming mode
+        restart: bool
+            Reprocess every tar ball, even the ones the manifest says are complete
+        split: int
+            The number of byte ranges each .tar file is split into
+        catalog: pathlib.Path
+            The SQLite file that maps PMC id and DOI to where the document is
+        filter: Filter
+            The articles to keep
+        fields: t.List[str]
+            The fields to extract, in CSV column order. Empty means all of them
+        stats: pathlib.Path
+            The JSON file for the run's counters, seconds per stage and throughput
+        prometheus: pathlib.Path
+            The Prometheus textfile kept up to date during the run
+        shard: Node
+            This machine's share of the tar balls, when the run is shared across machines
+        queue_bytes: int
+            The bytes of documents read ahead, and of output waiting to be written. 0 reads, parses and writes in turn
+        max_seconds: float
+            The most time a document may take to parse and extract, before it is quarantined
+        max_bytes: int
+            The largest document that is parsed, bigger ones are quarantined
+        dedup: pathlib.Path
+            The SQLite file of every copy of each PMC id, so only the newest is written. Kept across runs
+        format: str
+            The format of the metadata, csv or sqlite (a database updated in place)
         """
         self._source = source
         self._dest = dest
         self._log = log
+        self._workers = workers
+        self._jobs = jobs
+        self._stream_size = stream_size
+        self._restart = restart
+        self._split = split
+        self._catalog = catalog
+        self._filter = filter
+        self._fields = fields
+        self._stats = stats
+        self._prometheus = prometheus
+        self._shard = shard
+        self._queue_bytes = queue_bytes
+        self._max_seconds = max_seconds
+        self._max_bytes = max_bytes
+        self._dedup = dedup
+        self._format = format
 
     @property
     def source(self) -> pathlib.Path:
@@ -29,6 +79,51 @@ class Metadata:
     @property
     def log(self) -> t.Optional[pathlib.Path]:
         return self._log
+    @property
+    def workers(self) -> int:
+        return self._workers
+    @property
+    def jobs(self) -> int:
+        return self._jobs
+    @property
+    def stream_size(self) -> t.Optional[int]:
+        return self._stream_size
+    @property
+    def restart(self) -> bool:
+        return self._restart
+    @property
+    def split(self) -> int:
+        return self._split
+    @property
+    def catalog(self) -> t.Optional[pathlib.Path]:
+        return self._catalog
+    @property
+    def filter(self) -> t.Optional[Filter]:
+        return self._filter
+    @property
+    def fields(self) -> t.Optional[t.List[str]]:
+        return self._fields
+    @property
+    def stats(self) -> t.Optional[pathlib.Path]:
+        return self._stats
+    @property
+    def prometheus(self) -> t.Optional[pathlib.Path]:
+        return self._prometheus
+    @property
+    def shard(self) -> t.Optional[Node]:
+        return self._shard
+    @property
+    def queue_bytes(self) -> int:
+        return self._queue_bytes
+    @property
+    def limits(self) -> Limits:
+        return Limits(self._max_seconds, self._max_bytes)
+    @property
+    def dedup(self) -> t.Optional[pathlib.Path]:
+        return self._dedup
+    @property
+    def format(self) -> str:
+        return self._format
 
     def validate(self) -> None:
         """
@@ -39,8 +134,43 @@ class Metadata:
                 raise ValueError(f'{str(path)} is does not exist')
             if not path.is_dir():
                 raise ValueError(f'{str(path)} is not a folder')
+        def _nonzero_int(val: int):
+            if val <= 0:
+                raise ValueError(f'{val} must be > 0')
         _folder(self._source)
         _folder(self._dest.parent)
+        _nonzero_int(self._workers)
+        _nonzero_int(self._jobs)
+        _nonzero_int(self._split)
+        if self._catalog is not None:
+            _folder(self._catalog.parent)
+        if self._stream_size is not None:
+            _nonzero_int(self._stream_size)
         if self._log is not None:
             _folder(self._log)
+        if self._stats is not None:
+            _folder(self._stats.parent)
+        if self._prometheus is not None:
+            _folder(self._prometheus.parent)
+        if self._filter is not None:
+            self._filter.validate()
+        if self._fields is not None and len(self._fields) == 0:
+            raise ValueError('fields must not be empty')
+        if self._format not in ['csv', 'sqlite']:
+            raise ValueError(f'{self._format} is not a known format')
+        if self._format == 'sqlite' and self._fields is not None and 'id' not in self._fields:
+            raise ValueError('sqlite needs the id field')
+        if self._queue_bytes < 0:
+            raise ValueError(f'{self._queue_bytes} must be >= 0')
+        if self._max_seconds is not None and self._max_seconds <= 0:
+            raise ValueError(f'{self._max_seconds} must be > 0')
+        if self._max_bytes is not None:
+            _nonzero_int(self._max_bytes)
+        if self._dedup is not None:
+            _folder(self._dedup.parent)
+        if self._shard is not None:
+            if self._shard.nodes <= 0 or self._shard.node < 0 or self._shard.node >= self._shard.nodes:
+                raise ValueError(f'shard {self._shard.node}/{self._shard.nodes} must be between 0/N and N-1/N')
+            if self._catalog is not None:
+                raise ValueError('catalog can not be used with shard, pass it to merge instead')
 
@@ -1,27 +1,44 @@
 import typing as t
+from .types import Article
 
 class ProcessError(ValueError):
 
-    def __init__(self, document: str, issues: t.List[str]):
+    def __init__(self, document: bytes, issues: t.List[str], article: t.Optional[Article] = None, member: t.Optional[str] = None):
         """
         Settings for metadata process
 
         Parameters
         ----------
-        document : str
-            The document that could not be processed
+        document : bytes
+            The raw document that could not be processed
         issues : t.List[str]
             The list of reasons the document did not process
+        article : Article
+            The fields that did extract, when the document parsed but some fields are missing
+        member : str
+            The document's member name in the tar ball
         """
         self._document = document
         if issues is None or len(issues) == 0:
             issues = ['Unknown']
         self._issues = issues
+        self._article = article
+        self._member = member
         super().__init__(self._issues)
 
+    def __reduce__(self):
+        # Errors raised in a worker process are pickled back to the parent
+        return (ProcessError, (self._document, self._issues, self._article, self._member))
+
     @property
-    def document(self) -> str:
+    def document(self) -> bytes:
         return self._document
     @property
     def issues(self) -> t.List[str]:
         return self._issues
+    @property
+    def article(self) -> t.Optional[Article]:
+        return self._article
+    @property
+    def member(self) -> t.Optional[str]:
+        return self._member
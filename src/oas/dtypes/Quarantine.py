@@ -0,0 +1,79 @@
+import json
+import os
+import pathlib
+import typing as t
+from .types import Limits, Overrun
+
+class Quarantine:
+
+    def __init__(self, folder: pathlib.Path, name: str = 'oas.quarantine.json'):
+        """
+        The documents that went over the time or size limits, so later runs skip them without reading them.
+        Each node of a shared run keeps its own file in the folder but reads all of them,
+        so a document stays quarantined when its tar ball moves to another node.
+
+        Parameters
+        ----------
+        folder : pathlib.Path
+            The folder of the quarantine files (I.E. the manifest's)
+        name : str
+            The JSON file this run adds to
+        """
+        self._path = folder.joinpath(name)
+        # tar ball name -> member name -> issue, bytes and seconds
+        self._entries: t.Dict[str, t.Dict[str, t.Dict[str, t.Any]]] = {}
+        self._own: t.Dict[str, t.Dict[str, t.Dict[str, t.Any]]] = {}
+        for path in sorted(folder.glob('oas.quarantine*.json')):
+            with open(path, 'r', encoding = 'utf-8') as fp:
+                entries = json.load(fp)
+            if path == self._path:
+                self._own = entries
+            for tar_ball, members in entries.items():
+                self._entries.setdefault(tar_ball, {}).update(members)
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._path
+    @property
+    def entries(self) -> t.Dict[str, t.Dict[str, t.Dict[str, t.Any]]]:
+        return self._entries
+
+    def members(self, tar_ball: pathlib.Path, limits: Limits) -> t.Set[str]:
+        """
+        The member names to skip, those still over the limits.
+        A document that was too slow is tried again once the time limit is raised, or too large once the size limit is.
+        """
+        def _over(entry: t.Dict[str, t.Any]) -> bool:
+            if entry.get('seconds') is not None:
+                return limits.seconds is not None and limits.seconds <= entry['seconds']
+            return limits.bytes is not None and entry['bytes'] > limits.bytes
+        return {name for name, entry in self._entries.get(tar_ball.name, {}).items() if _over(entry)}
+
+    def skipped(self, tar_balls: t.Iterable[pathlib.Path], limits: Limits) -> t.Dict[str, t.Set[str]]:
+        """
+        The members to skip for each tar ball that has any, keyed by the tar ball's file name
+        """
+        skip = {path.name: self.members(path, limits) for path in tar_balls}
+        return {name: members for name, members in skip.items() if len(members) > 0}
+
+    def add(self, tar_ball: pathlib.Path, overruns: t.Iterable[Overrun]) -> None:
+        """
+        Records the documents then saves the quarantine, when there are any
+        """
+        changed = False
+        for overrun in overruns:
+            entry = { 'issue': overrun.issue, 'bytes': overrun.bytes, 'seconds': overrun.seconds }
+            self._own.setdefault(tar_ball.name, {})[overrun.member] = entry
+            self._entries.setdefault(tar_ball.name, {})[overrun.member] = entry
+            changed = True
+        if changed:
+            self.save()
+
+    def save(self) -> None:
+        """
+        Saves this run's file so a crash never leaves a half written file
+        """
+        temp = self._path.with_name(f'{self._path.name}.tmp')
+        with open(temp, 'w', encoding = 'utf-8') as fp:
+            json.dump(self._own, fp, indent = 1)
+        os.replace(temp, self._path)
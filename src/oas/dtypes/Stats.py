@@ -0,0 +1,108 @@
+import heapq
+import threading
+import typing as t
+
+# The number of slowest documents kept
+slowest_count = 20
+
+class Stats:
+
+    def __init__(self, counters: t.Optional[t.Dict[str, float]] = None, slowest: t.Optional[t.List[t.Tuple[float, str]]] = None):
+        """
+        The counters and stage timers of a run.
+        Counters are plain names (I.E. `documents`, `source_bytes`).
+        Stage timers are the seconds spent in the stage, named `seconds.{stage}` (I.E. `seconds.parse`).
+        The stages time themselves using `time.perf_counter` so there is no per item overhead beyond an add.
+        Each counter must only be added to from one thread, but can be read from any thread.
+        The slowest documents are kept too, along with their seconds.
+
+        Parameters
+        ----------
+        counters : t.Dict[str, float]
+            The starting values
+        slowest : t.List[t.Tuple[float, str]]
+            The starting slowest documents, as seconds and name
+        """
+        self._counters: t.Dict[str, float] = {} if counters is None else dict(counters)
+        self._slowest: t.List[t.Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        for seconds, name in slowest or []:
+            self.add_document(name, seconds)
+
+    def __reduce__(self):
+        # Worker processes send their counts back to the parent
+        return (Stats, (self.snapshot(), self.slowest()))
+
+    def __getitem__(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def add(self, name: str, value: float = 1) -> None:
+        """
+        Adds to a counter, creating it when it is new
+        """
+        try:
+            self._counters[name] += value
+        except KeyError:
+            # Only new names take the lock so `snapshot` never sees the dict change size
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def add_document(self, name: str, seconds: float) -> None:
+        """
+        Keeps the document when it is one of the `slowest_count` slowest so far
+        """
+        if len(self._slowest) >= slowest_count and seconds <= self._slowest[0][0]:
+            return
+        with self._lock:
+            if len(self._slowest) < slowest_count:
+                heapq.heappush(self._slowest, (seconds, name))
+            else:
+                heapq.heappushpop(self._slowest, (seconds, name))
+
+    def slowest(self) -> t.List[t.Tuple[float, str]]:
+        """
+        The slowest documents, slowest first, as seconds and name
+        """
+        with self._lock:
+            return sorted(self._slowest, reverse = True)
+
+    def merge(self, other: 'Stats') -> None:
+        """
+        Adds another set of counters to these ones.
+        Merging a Stats into itself does nothing, so results can always be merged even when the work shared this Stats.
+        """
+        if other is self:
+            return
+        for name, value in other.snapshot().items():
+            self.add(name, value)
+        for seconds, name in other.slowest():
+            self.add_document(name, seconds)
+
+    def take(self) -> 'Stats':
+        """
+        A copy of the counters, which are then reset
+        """
+        with self._lock:
+            result = Stats(self._counters, self._slowest)
+            self._counters.clear()
+            self._slowest = []
+        return result
+
+    def snapshot(self) -> t.Dict[str, float]:
+        """
+        A copy of the counters that is safe to take while another thread is adding to them
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def counters(self) -> t.Dict[str, float]:
+        """
+        The counters that are not stage timers
+        """
+        return {name: value for name, value in self.snapshot().items() if not name.startswith('seconds.')}
+
+    def timers(self) -> t.Dict[str, float]:
+        """
+        The seconds spent in each stage, keyed by the stage's name
+        """
+        return {name[len('seconds.'):]: value for name, value in self.snapshot().items() if name.startswith('seconds.')}
@@ -1,5 +1,24 @@
+from .All import All as All
+from .Benchmark import Benchmark as Benchmark
 from .Convert import Convert as Convert
+from .CorpusStats import CorpusStats as CorpusStats
+from .Filter import Filter as Filter
+from .Get import Get as Get
+from .Index import Index as Index
+from .Manifest import Manifest as Manifest
+from .Merge import Merge as Merge
 from .Metadata import Metadata as Metadata
+from .Quarantine import Quarantine as Quarantine
 from .ProcessError import ProcessError as ProcessError
+from .Stats import Stats as Stats
 from .types import Article as Article
+from .types import Document as Document
 from .types import Extractor as Extractor
+from .types import Limits as Limits
+from .types import NamedDocument as NamedDocument
+from .types import Node as Node
+from .types import Overrun as Overrun
+from .types import Shard as Shard
+from .types import Splitter as Splitter
+from .types import TarMember as TarMember
+from .types import TarPart as TarPart
@@ -1,5 +1,75 @@
+import pathlib
 import typing as t
 from lxml import etree # type: ignore
 
+# A raw JATS document, or a stream over one that is too big to hold in memory
+Document = t.Union[bytes, t.IO[bytes]]
 Article = t.Dict[str, t.Union[int, str, t.List[str]]]
-Extractor = t.Callable[[etree.Element], t.Union[int, str, t.List[str]]]
+Extractor = t.Callable[[etree.Element], t.Optional[t.Union[int, str, t.List[str]]]]
+
+class Limits(t.NamedTuple):
+    """
+    The most time and bytes a single document may take, None for no limit
+    """
+    seconds: t.Optional[float] = None
+    bytes: t.Optional[int] = None
+
+class NamedDocument(t.NamedTuple):
+    """
+    A document along with its member name in the tar ball
+    """
+    name: str
+    document: Document
+
+class TarMember(t.NamedTuple):
+    """
+    A JATS file's entry in a tar ball's index
+    """
+    name: str
+    pmcid: str
+    offset: int
+    size: int
+
+class Node(t.NamedTuple):
+    """
+    One of `nodes` machines sharing a run, numbered from 0
+    """
+    node: int
+    nodes: int
+
+class Overrun(t.NamedTuple):
+    """
+    A document that went over a limit
+    """
+    member: str
+    issue: str
+    # The size of the document
+    bytes: int
+    # The time limit it went over, None when it was too large
+    seconds: t.Optional[float]
+
+class Shard(t.NamedTuple):
+    """
+    An output file along with what is in it
+    """
+    name: str
+    articles: int
+    lines: int
+    # The size of the file, after any compression
+    bytes: int
+    # The PMC ids of the first and last articles
+    first: str
+    last: str
+
+class TarPart(t.NamedTuple):
+    """
+    A unit of work, one of `parts` byte ranges of a tar ball.
+    A split unit carries its range's index entries once they are known (see `utils.index_tar_parts`).
+    """
+    path: pathlib.Path
+    part: int = 0
+    parts: int = 1
+    members: t.Optional[t.Tuple[TarMember, ...]] = None
+
+# Splits each of an article's paragraphs into sentences
+Splitter = t.Callable[[t.List[str]], t.List[t.List[str]]]
@@ -0,0 +1,98 @@
+import collections
+import functools
+import typing as t
+from ..dtypes import Article, CorpusStats, NamedDocument, Overrun, ProcessError, Stats, TarPart
+from ..dtypes import All as settings
+from .. import utils
+from .Convert import Convert
+from .Metadata import Metadata
+
+class All:
+
+    def __init__(self, settings: settings):
+        """
+        Extracts the metadata and converts the data to our standard format in a single pass.
+        Each document is read, untarred and parsed once then fed to both outputs.
+
+        Parameters
+        ----------
+        settings : dtypes.settings.all
+            The settings for the process
+        """
+        self._settings = settings
+        self._convert = Convert(settings.as_convert())
+        self._metadata = Metadata(settings.as_metadata())
+
+    def init(self) -> None:
+        self._settings.validate()
+        self._convert.init()
+        self._metadata.init()
+
+    def run(self) -> None:
+        """
+        Each half keeps its own manifest so `all`, `convert` and `metadata` can resume each other's work.
+        A tar ball is redone when either half is missing.
+        """
+        settings = self._settings
+        jobs = settings.jobs
+        run = utils.UnitRun([self._convert, self._metadata], settings.source, settings.split, settings.shard, settings.restart, settings.dedup, settings.limits)
+        for unit in run.plan():
+            if settings.log is not None:
+                utils.error_log_path(settings.log, self._log_name(unit)).unlink(missing_ok = True)
+        # In this process the work adds straight to the run's stats so the progress is live
+        stats = Stats()
+        work = functools.partial(self._process_tar_ball, stats = stats if jobs <= 1 else None, skip = run.skip)
+        run.run('all', 'Processing', work, jobs, stats, settings.stats, settings.prometheus, ['Text issues', 'Metadata issues'])
+
+    def _process_tar_ball(self, unit: TarPart, stats: t.Optional[Stats] = None, skip: t.Optional[t.Dict[str, t.Set[str]]] = None) -> utils.UnitResult:
+        """
+        Extracts the union of both halves' fields.
+        A document missing a field only one half needs is still written by the other half, same as running them apart.
+        Each failed document is archived once but its issues are counted against each half it is missing from.
+        """
+        if stats is None:
+            stats = Stats()
+        txt_fields = Convert.field_selection(self._settings.text_fields)
+        csv_fields = Metadata.field_selection(self._settings.fields)
+        fields = {**csv_fields, **txt_fields}
+        if self._settings.corpus_stats:
+            fields = Convert.corpus_fields(fields)
+        txt_names = [x for x in txt_fields.keys()]
+        csv_names = [x for x in csv_fields.keys()]
+        file_pattern = str(self._settings.dest.joinpath(self._convert.file_pattern(unit)))
+        counts = [0]
+        txt_errors: t.Counter[str] = collections.Counter()
+        csv_errors: t.Counter[str] = collections.Counter()
+        overruns: t.List[Overrun] = []
+        def _count(docs: t.Iterator[NamedDocument]) -> t.Iterator[NamedDocument]:
+            for doc in docs:
+                counts[0] += 1
+                yield doc
+        with utils.ErrorLog(self._settings.log, self._log_name(unit), unit.path) as log, self._convert.open_cache(utils.part_stem(unit), fields) as cache:
+            def _log(error: ProcessError) -> None:
+                if not All._has_fields(error.article, txt_names):
+                    txt_errors.update(error.issues)
+                if not All._has_fields(error.article, csv_names):
+                    csv_errors.update(error.issues)
+                log.write(error)
+            docs = utils.list_documents(unit.path, self._settings.stream_size, unit.part, unit.parts, self._convert.member_filter(), stats, self._convert.skip(unit, skip), unit.members)
+            docs = _count(utils.read_ahead(docs, self._settings.queue_bytes, stats))
+            limits = self._settings.limits
+            articles = utils.extract_articles(docs, fields, utils.collect_overruns(_log, limits, overruns), self._settings.workers, self._settings.filter, partial = True, stats = stats, cache = cache, limits = limits)
+            if self._settings.dedup_body:
+                # Dropped from both halves, so the CSV and the TXT files hold the same articles
+                articles = utils.drop_duplicate_bodies(articles, self._settings.dedup, stats) # type: ignore
+            articles = Metadata.stream_csv(self._metadata.shard_path(unit), csv_names, articles, lambda x: All._has_fields(x, csv_names), stats, self._settings.queue_bytes)
+            articles = (article for article in articles if All._has_fields(article, txt_names))
+            corpus = CorpusStats() if self._settings.corpus_stats else None
+            txt_shards = self._convert.save(file_pattern, articles, stats, corpus)
+        if corpus is not None:
+            utils.save_corpus_stats(self._convert.corpus_stats_path(unit), corpus)
+        return utils.UnitResult(counts[0], [sum(txt_errors.values()), sum(csv_errors.values())], [dict(txt_errors), dict(csv_errors)], txt_shards, overruns, stats)
+
+    def _log_name(self, unit: TarPart) -> str:
+        return f'{utils.part_stem(unit)}.all'
+
+    @staticmethod
+    def _has_fields(article: t.Optional[Article], names: t.List[str]) -> bool:
+        return article is not None and all(name in article for name in names)
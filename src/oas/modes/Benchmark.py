@@ -0,0 +1,292 @@
+import concurrent.futures as cf
+import contextlib
+import datetime
+import gzip
+import json
+import multiprocessing as mp
+import os
+import pathlib
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import typing as t
+from ..dtypes import Article, Stats
+from ..dtypes import Benchmark as settings
+from ..dtypes import Convert as settings_conv
+from ..dtypes import Metadata as settings_meta
+from .. import __version__, utils
+from ..utils.pipeline_helper import _parse_xml
+from ..utils.synth_helper import SynthOptions, write_synth_tar_ball
+from .Convert import Convert
+from .Metadata import Metadata
+from lxml import etree # type: ignore
+
+try:
+    import resource
+except ImportError:
+    # Windows has no getrusage so the peak memory is not reported
+    resource = None # type: ignore
+
+class _Counts(t.NamedTuple):
+    """
+    The work done and bytes handled by one timed run
+    """
+    documents: int
+    bytes: int
+    # Only counted by the benchmarks that split sentences
+    sentences: t.Optional[int] = None
+
+_Body = t.Callable[[], _Counts]
+
+class Benchmark:
+
+    # The stages, in pipeline order, then the end to end modes, on the .tar then the .tar.gz
+    names = \
+        ['list_documents', 'parse_xml'] + \
+        [f'extract_{name}' for name in utils.extractors.keys()] + \
+        ['split_sentences', 'flatten_and_save', 'stream_csv', 'convert', 'metadata', 'convert_gz', 'metadata_gz']
+
+    def __init__(self, settings: settings):
+        """
+        Times each stage of the pipeline, and `convert` and `metadata` end to end, on a synthetic corpus.
+        The modes are timed again on a gzip'ed copy of the corpus, as the real one is shipped.
+        Each benchmark runs in a fresh process so its peak memory is its own.
+
+        Parameters
+        ----------
+        settings : dtypes.settings.benchmark
+            The settings for the process
+        """
+        self._settings = settings
+
+    def init(self) -> None:
+        self._settings.validate()
+        unknown = [name for name in self._settings.benchmarks or [] if name not in Benchmark.names]
+        if len(unknown) > 0:
+            raise ValueError(f"{', '.join(unknown)} are not known benchmarks")
+
+    def run(self) -> None:
+        options = SynthOptions(
+            self._settings.articles, self._settings.seed, self._settings.paragraphs,
+            abstract = self._settings.abstract, tables = self._settings.tables, malformed = self._settings.malformed)
+        work = self._settings.work
+        with tempfile.TemporaryDirectory() if work is None else contextlib.nullcontext(str(work)) as folder:
+            source = pathlib.Path(folder).joinpath('synth')
+            source.mkdir(exist_ok = True)
+            tar_ball = source.joinpath('synth.tar')
+            print(f'Writing {options.articles} synthetic articles')
+            digest = write_synth_tar_ball(tar_ball, options)
+            # Kept in its own folder, since the modes run over every tar ball in the folder
+            tar_gz = pathlib.Path(folder).joinpath('synth_gz', 'synth.tar.gz')
+            _gzip(tar_ball, tar_gz)
+            results: t.Dict[str, t.Dict[str, t.Any]] = {}
+            for name in self._settings.benchmarks or Benchmark.names:
+                # spawn, not fork, so nothing from this process counts towards the peak memory
+                with cf.ProcessPoolExecutor(max_workers = 1, mp_context = mp.get_context('spawn')) as pool:
+                    source_tar = tar_gz if name.endswith('_gz') else tar_ball
+                    result = pool.submit(_run_benchmark, name, source_tar, pathlib.Path(folder), self._settings.repeat, self._settings.workers).result()
+                results[name] = result
+                print(Benchmark._format(name, result))
+            report = {
+                'started': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'environment': {
+                    'oas': __version__,
+                    'python': platform.python_version(),
+                    'lxml': '.'.join(str(x) for x in etree.LXML_VERSION),
+                    'platform': platform.platform(),
+                    'cpus': os.cpu_count() },
+                'corpus': {**options._asdict(), 'bytes': tar_ball.stat().st_size, 'gz_bytes': tar_gz.stat().st_size, 'sha256': digest},
+                'repeat': self._settings.repeat,
+                'workers': self._settings.workers,
+                'benchmarks': results,
+                'gz_ratios': Benchmark._gz_ratios(results) }
+        if self._settings.baseline is not None:
+            report['baseline'] = self._compare(report)
+        with open(self._settings.dest, 'w', encoding = 'utf-8') as fp:
+            json.dump(report, fp, indent = 2)
+            fp.write('\n')
+
+    def _compare(self, report: t.Dict[str, t.Any]) -> t.Dict[str, float]:
+        """
+        Prints each benchmark's documents per second against the baseline's.
+        The ratios (above 1 is faster) are returned for the report.
+        """
+        with open(self._settings.baseline, 'r', encoding = 'utf-8') as fp: # type: ignore
+            baseline = json.load(fp)
+        if baseline.get('corpus', {}).get('sha256') != report['corpus']['sha256']:
+            print('Warning: the baseline was run on a different synthetic corpus')
+        print(f'Compared to {self._settings.baseline}:')
+        ratios: t.Dict[str, float] = {}
+        for name, result in report['benchmarks'].items():
+            old = baseline.get('benchmarks', {}).get(name)
+            if old is None or old['documents_per_second'] <= 0:
+                continue
+            ratios[name] = result['documents_per_second'] / old['documents_per_second']
+            print(f'  {name}: {ratios[name]:.2f}x ({(ratios[name] - 1) * 100:+.1f}%)')
+        return ratios
+
+    @staticmethod
+    def _gz_ratios(results: t.Dict[str, t.Dict[str, t.Any]]) -> t.Dict[str, float]:
+        """
+        Prints each mode's documents per second on the .tar.gz against the .tar's.
+        The ratios (below 1 is slower) are returned for the report.
+        """
+        ratios: t.Dict[str, float] = {}
+        for name in ['convert', 'metadata']:
+            tar, gz = results.get(name), results.get(f'{name}_gz')
+            if tar is None or gz is None or tar['documents_per_second'] <= 0:
+                continue
+            ratios[name] = gz['documents_per_second'] / tar['documents_per_second']
+            print(f'{name}_gz/{name}: {ratios[name]:.2f}x')
+        return ratios
+
+    @staticmethod
+    def _format(name: str, result: t.Dict[str, t.Any]) -> str:
+        rss = '' if result['peak_rss_mb'] is None else f", {result['peak_rss_mb']:.0f} MB peak"
+        sentences = '' if 'sentences_per_second' not in result else f", {result['sentences_per_second']:.0f} sentences/s"
+        return f"{name}: {result['documents_per_second']:.0f} docs/s{sentences}, {result['mb_per_second']:.1f} MB/s, {result['best_seconds']:.3f}s best of {len(result['seconds'])}{rss}"
+
+def _run_benchmark(name: str, tar_ball: pathlib.Path, work: pathlib.Path, repeat: int, workers: int) -> t.Dict[str, t.Any]:
+    """
+    Prepares the benchmark's input, untimed, then times its body `repeat` times.
+    Runs in its own process.
+    """
+    body = _prepare(name, tar_ball, work, workers)
+    seconds: t.List[float] = []
+    counts = _Counts(0, 0)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counts = body()
+        seconds.append(time.perf_counter() - start)
+    best = max(min(seconds), 1e-9)
+    result = {
+        'seconds': seconds,
+        'best_seconds': best,
+        'median_seconds': statistics.median(seconds),
+        'documents': counts.documents,
+        'bytes': counts.bytes,
+        'documents_per_second': counts.documents / best,
+        'mb_per_second': counts.bytes / best / 1e6,
+        'peak_rss_mb': _peak_rss_mb() }
+    if counts.sentences is not None:
+        result['sentences'] = counts.sentences
+        result['sentences_per_second'] = counts.sentences / best
+    return result
+
+def _prepare(name: str, tar_ball: pathlib.Path, work: pathlib.Path, workers: int) -> _Body:
+    if name == 'list_documents':
+        def _list() -> _Counts:
+            return _Counts(sum(1 for _ in utils.list_documents(tar_ball)), tar_ball.stat().st_size)
+        return _list
+    if name in ('convert', 'metadata', 'convert_gz', 'metadata_gz'):
+        return _prepare_mode(name, tar_ball, work, workers)
+    documents = [doc.document for doc in utils.list_documents(tar_ball)]
+    size = sum(len(doc) for doc in documents) # type: ignore
+    if name == 'parse_xml':
+        def _parse() -> _Counts:
+            for document in documents:
+                _parse_xml(document) # type: ignore
+            return _Counts(len(documents), size)
+        return _parse
+    if name.startswith('extract_'):
+        extractor = utils.extractors[name[len('extract_'):]]
+        roots = [_parse_xml(document) for document in documents] # type: ignore
+        def _extract() -> _Counts:
+            for root in roots:
+                try:
+                    extractor(root)
+                except Exception:
+                    pass
+            return _Counts(len(roots), size)
+        return _extract
+    articles: t.List[Article] = [article for article in utils.extract_articles(utils.list_documents(tar_ball), utils.extractors, lambda _: None, partial = True)]
+    if name == 'split_sentences':
+        splitter = utils.SentenceSplitter().split_paragraphs
+        paragraphs = [value for article in articles for value in article.values() if isinstance(value, list)]
+        text = sum(len(paragraph.encode('utf-8')) for value in paragraphs for paragraph in value)
+        def _split() -> _Counts:
+            sentences = 0
+            for value in paragraphs:
+                sentences += sum(len(x) for x in splitter(value))
+            return _Counts(len(articles), text, sentences)
+        return _split
+    if name == 'flatten_and_save':
+        splitter = utils.SentenceSplitter().split_paragraphs
+        written = [article for article in articles if all(field in article for field in ['id', 'journal', 'title'])]
+        pattern = str(work.joinpath('flatten.{id:04}.txt'))
+        def _flatten() -> _Counts:
+            stats = Stats()
+            Convert.flatten_and_save(pattern, 250000, iter(written), splitter, stats)
+            return _Counts(len(written), int(stats['output_bytes']))
+        return _flatten
+    if name == 'stream_csv':
+        fields = [x for x in Metadata.field_selection().keys()]
+        dest = work.joinpath('stream.csv')
+        def _csv() -> _Counts:
+            stats = Stats()
+            for _ in Metadata.stream_csv(dest, fields, iter(articles), stats = stats): pass
+            return _Counts(len(articles), int(stats['output_bytes']))
+        return _csv
+    raise ValueError(f'{name} is not a known benchmark')
+
+def _prepare_mode(name: str, tar_ball: pathlib.Path, work: pathlib.Path, workers: int) -> _Body:
+    """
+    Runs the mode over the synthetic tar ball's folder, quietly, starting over each time
+    """
+    log = work.joinpath('log')
+    log.mkdir(exist_ok = True)
+    if name.startswith('convert'):
+        dest = work.joinpath(name)
+        dest.mkdir(exist_ok = True)
+        app: t.Union[Convert, Metadata] = Convert(settings_conv(tar_ball.parent, dest, 250000, '{source}.{id:04}.txt', log, workers, restart = True))
+    else:
+        app = Metadata(settings_meta(tar_ball.parent, work.joinpath(f'{name}.csv'), log, workers, restart = True))
+    documents = sum(1 for _ in utils.list_documents(tar_ball))
+    def _mode() -> _Counts:
+        with _quiet():
+            app.init()
+            app.run()
+        return _Counts(documents, tar_ball.stat().st_size)
+    return _mode
+
+def _gzip(tar_ball: pathlib.Path, dest: pathlib.Path) -> None:
+    """
+    Writes a gzip'ed copy of the tar ball, at the default level and without a time stamp so it is the same every time
+    """
+    dest.parent.mkdir(exist_ok = True)
+    with open(tar_ball, 'rb') as fp_in, gzip.GzipFile(dest, 'wb', mtime = 0) as fp_out:
+        shutil.copyfileobj(fp_in, fp_out, 16 * 1024 * 1024)
+
+@contextlib.contextmanager
+def _quiet() -> t.Iterator[None]:
+    """
+    Sends stdout and stderr to the null device at the file level, so the progress bar and the worker processes are quiet too
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    null = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(null, 1)
+        os.dup2(null, 2)
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in saved + [null]:
+            os.close(fd)
+
+def _peak_rss_mb() -> t.Optional[float]:
+    """
+    The peak memory of this process, or of any of its (finished) worker processes
+    """
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
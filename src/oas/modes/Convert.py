@@ -1,13 +1,20 @@
+import contextlib
+import functools
+import json
+import os
+import pathlib
+import time
 import typing as t
-from ..dtypes import Article, Extractor, ProcessError
+from ..dtypes import Article, CorpusStats, Extractor, Manifest, NamedDocument, Overrun, Shard, Splitter, Stats, TarPart
 from ..dtypes import Convert as settings
 from .. import utils
-from io import TextIOWrapper
 
-class Convert:
+# Written in place of each \n, same as a file opened as text
+_newline = os.linesep
+# The blank line between articles
+_separator = _newline.encode('utf-8')
 
-    _eos = "!?."
-    _abbrev = ['al.', 'fig.', 'i.e.', 'e.g.']
+class Convert:
 
     def __init__(self, settings: settings):
         """
@@ -19,84 +26,373 @@ class Convert:
             The settings for the process
         """
         self._settings = settings
+        self._splitter: Splitter = utils.SentenceSplitter().split_paragraphs
 
     def init(self) -> None:
         self._settings.validate()
+        if self._settings.abbreviations is not None:
+            self._splitter = utils.SentenceSplitter(utils.load_abbreviations(self._settings.abbreviations)).split_paragraphs
 
     def run(self) -> None:
-        fields = Convert._field_selection()
-        for path in utils.list_folder_tar_balls(self._settings.source):
-            file_pattern = str(self._settings.dest.joinpath(self._settings.dest_pattern.replace("{source}", path.stem)))
-            docs = utils.list_documents(path)
-            docs = utils.progress_overlay(docs, f'{path.stem}: Reading documents #')
-            articles = utils.extract_articles(docs, fields, self._log_bad_extract)
-            Convert._flatten_and_save(file_pattern, self._settings.lines, articles)
-
-    def _log_bad_extract(self, error: ProcessError) -> None:
-        if self._settings.log is None:
-            print(f"Error: {','.join(error.issues)}")
+        catalog = self._settings.catalog
+        if self._settings.ids is not None and catalog is not None and catalog.exists():
+            self._convert_ids(self._settings.ids)
+            return
+        jobs = self._settings.jobs
+        run = utils.UnitRun([self], self._settings.source, self._settings.split, self._settings.shard, self._settings.restart, self._settings.dedup, self._settings.limits)
+        run.plan()
+        # In this process the work adds straight to the run's stats so the progress is live
+        stats = Stats()
+        work = functools.partial(self._convert_tar_ball, stats = stats if jobs <= 1 else None, skip = run.skip)
+        run.run('convert', 'Converting', work, jobs, stats, self._settings.stats, self._settings.prometheus)
+        if self._settings.catalog is not None:
+            with contextlib.closing(utils.open_catalog(self._settings.catalog)) as connection:
+                for path in run.tar_balls:
+                    utils.catalog_tar_ball(connection, path)
+
+    def _convert_ids(self, ids: pathlib.Path) -> None:
+        """
+        Converts just the listed articles, seeking straight to them using the catalog.
+        The output is named after the ids file (I.E. {source} is its stem).
+        """
+        fields = Convert.field_selection(self._settings.fields)
+        with contextlib.closing(utils.open_catalog(self._settings.catalog)) as catalog: # type: ignore
+            found, missing = utils.find_articles(catalog, utils.read_ids(ids))
+        for id in missing:
+            print(f'Error: {id} is not in the catalog')
+        file_pattern = str(self._settings.dest.joinpath(self._pattern(ids.stem)))
+        stats = Stats()
+        docs: t.Iterator[NamedDocument] = (doc for path, members in found.items() for doc in utils.list_indexed_documents(path, members, self._settings.stream_size, stats))
+        docs = utils.read_ahead(docs, self._settings.queue_bytes, stats)
+        total = sum(utils.member_blocks(member) for members in found.values() for member in members)
+        with utils.monitor_run('convert', 'Converting', stats, total, len(found), self._settings.stats, self._settings.prometheus):
+            with utils.ErrorLog(self._settings.log, f'{ids.stem}.convert') as log, self.open_cache(ids.stem, fields) as cache:
+                articles = utils.extract_articles(docs, fields, log.write, self._settings.workers, stats = stats, cache = cache, limits = self._settings.limits)
+                self.save(file_pattern, articles, stats)
+        utils.print_issues(log.issues)
+
+    def _convert_tar_ball(self, unit: TarPart, stats: t.Optional[Stats] = None, skip: t.Optional[t.Dict[str, t.Set[str]]] = None) -> utils.UnitResult:
+        if stats is None:
+            stats = Stats()
+        overruns: t.List[Overrun] = []
+        fields = Convert.field_selection(self._settings.fields)
+        if self._settings.corpus_stats:
+            fields = Convert.corpus_fields(fields)
+        file_pattern = str(self._settings.dest.joinpath(self.file_pattern(unit)))
+        counts = [0]
+        def _count(docs: t.Iterator[NamedDocument]) -> t.Iterator[NamedDocument]:
+            for doc in docs:
+                counts[0] += 1
+                yield doc
+        with utils.ErrorLog(self._settings.log, self._log_name(unit), unit.path) as log, self.open_cache(utils.part_stem(unit), fields) as cache:
+            docs = utils.list_documents(unit.path, self._settings.stream_size, unit.part, unit.parts, self.member_filter(), stats, self.skip(unit, skip), unit.members)
+            docs = _count(utils.read_ahead(docs, self._settings.queue_bytes, stats))
+            _log = utils.collect_overruns(log.write, self._settings.limits, overruns)
+            articles = utils.extract_articles(docs, fields, _log, self._settings.workers, self._settings.filter, stats = stats, cache = cache, limits = self._settings.limits)
+            if self._settings.dedup_body:
+                articles = utils.drop_duplicate_bodies(articles, self._settings.dedup, stats) # type: ignore
+            corpus = CorpusStats() if self._settings.corpus_stats else None
+            shards = self.save(file_pattern, articles, stats, corpus)
+        if corpus is not None:
+            utils.save_corpus_stats(self.corpus_stats_path(unit), corpus)
+        return utils.UnitResult(counts[0], [log.errors], [log.issues], shards, overruns, stats)
+
+    def save(self, file_pattern: str, articles: t.Iterator[Article], stats: Stats, corpus: t.Optional[CorpusStats] = None) -> t.List[Shard]:
+        """
+        Writes the articles in the format asked for (see `flatten_and_save`)
+        """
+        settings = self._settings
+        if settings.format == 'jsonl':
+            return Convert._json_and_save(file_pattern, settings.lines, articles, self._splitter, stats, settings.bytes, settings.queue_bytes, corpus)
+        return Convert.flatten_and_save(file_pattern, settings.lines, articles, self._splitter, stats, settings.bytes, settings.compression, settings.level, settings.queue_bytes, corpus)
+
+    def _outputs(self, unit: TarPart, shards: t.List[Shard]) -> t.List[str]:
+        """
+        The files written for the unit, along with the indexes for jsonl and the corpus statistics
+        """
+        if self._settings.format == 'jsonl':
+            names = [name for shard in shards for name in [shard.name, utils.jsonl_index_path(pathlib.Path(shard.name)).name]]
         else:
-            utils.write_log(self._settings.log, error)
+            names = [shard.name for shard in shards]
+        if self._settings.corpus_stats:
+            names.append(self.corpus_stats_path(unit).name)
+        return names
+
+    def corpus_stats_path(self, unit: TarPart) -> pathlib.Path:
+        return utils.corpus_stats_path(self._settings.dest, utils.part_stem(unit))
+
+    def output_folder(self) -> pathlib.Path:
+        return self._settings.dest
+
+    def fingerprint(self) -> str:
+        """
+        The digest of the settings that shape the unit's files, so a rerun with any of them changed redoes the unit
+        """
+        settings = self._settings
+        return utils.fingerprint({
+            'fields': [x for x in Convert.field_selection(settings.fields).keys()],
+            'filter': utils.filter_fingerprint(settings.filter),
+            'format': settings.format,
+            'compression': settings.compression,
+            'lines': settings.lines,
+            'bytes': settings.bytes,
+            'dest_pattern': settings.dest_pattern,
+            'abbreviations': None if settings.abbreviations is None else utils.load_abbreviations(settings.abbreviations),
+            'corpus_stats': settings.corpus_stats,
+            'dedup': settings.dedup is not None,
+            'dedup_body': settings.dedup_body })
+
+    def complete(self, unit: TarPart, manifest: Manifest, documents: int, errors: int, issues: t.Dict[str, int], shards: t.List[Shard]) -> None:
+        """
+        Records the unit's files in the manifest
+        """
+        manifest.complete(unit.path, documents, errors, self._outputs(unit, shards), utils.part_key(unit), issues, shards, self.fingerprint())
+
+    def finish(self, tar_balls: t.List[pathlib.Path], units: t.List[TarPart]) -> None:
+        """
+        Combines the units' corpus statistics into the run's.
+        A node of a shared run leaves that to `merge`.
+        """
+        if not self._settings.corpus_stats or self._settings.shard is not None:
+            return
+        dest = utils.corpus_stats_path(self._settings.dest)
+        utils.merge_corpus_stats((self.corpus_stats_path(unit) for unit in units), dest)
+        print(f'Wrote the corpus statistics to {dest}')
+
+    def skip(self, unit: TarPart, skip: t.Optional[t.Dict[str, t.Set[str]]]) -> t.Set[str]:
+        """
+        The unit's members to pass over, the quarantined ones and, with dedup, those with a newer copy
+        """
+        members = (skip or {}).get(unit.path.name, set())
+        if self._settings.dedup is not None:
+            members = members | utils.dedup_skip(self._settings.dedup, unit.path, self._settings.dest)
+        return members
+
+    def open_cache(self, name: str, fields: t.Dict[str, Extractor]) -> t.ContextManager[t.Optional[utils.ArticleCache]]:
+        """
+        The unit's cache of extracted articles, when there is a cache folder
+        """
+        if self._settings.cache is None:
+            return contextlib.nullcontext()
+        return utils.ArticleCache(self._settings.cache, name, fields)
+
+    def file_pattern(self, unit: TarPart) -> str:
+        return self._pattern(utils.part_stem(unit))
+
+    def _pattern(self, source: str) -> str:
+        """
+        The file name pattern for the source, along with the compression's extension.
+        For jsonl the extension is .jsonl, in place of any .txt.
+        """
+        pattern = self._settings.dest_pattern.replace("{source}", source)
+        extension = utils.output_extension(self._settings.compression)
+        if self._settings.format == 'jsonl':
+            extension = '.jsonl'
+            pattern = pattern[:-len('.txt')] if pattern.endswith('.txt') else pattern
+        return pattern if pattern.endswith(extension) else pattern + extension
+
+    def _log_name(self, unit: TarPart) -> str:
+        return f'{utils.part_stem(unit)}.convert'
+
+    def is_complete(self, unit: TarPart, manifest: Manifest) -> bool:
+        """
+        Whether the unit's files are done, with the same settings
+        """
+        return manifest.is_complete(unit.path, self._settings.dest, utils.part_key(unit), self.fingerprint())
+
+    def rollback(self, unit: TarPart, manifest: Manifest) -> None:
+        """
+        Removes any output from an earlier, unfinished or outdated, run of the unit
+        """
+        dest = self._settings.dest
+        key = utils.part_key(unit)
+        stale = [dest.joinpath(name) for name in manifest.outputs(unit.path, key)]
+        stale.extend(utils.list_pattern_files(dest, self.file_pattern(unit)))
+        if self._settings.format == 'jsonl':
+            stale.extend(utils.list_pattern_files(dest, self.file_pattern(unit) + '.idx'))
+        if self._settings.corpus_stats:
+            stale.append(self.corpus_stats_path(unit))
+        if self._settings.log is not None:
+            stale.append(utils.error_log_path(self._settings.log, self._log_name(unit)))
+        for file_name in stale:
+            file_name.unlink(missing_ok = True)
+        manifest.forget(unit.path, key)
+
+    def member_filter(self) -> t.Optional[t.Set[str]]:
+        """
+        The PMC ids to keep, when they can be checked using just the member names
+        """
+        filter = self._settings.filter
+        if filter is None or filter.pmcids is None or filter.dois:
+            return None
+        return filter.pmcids
+
+    @staticmethod
+    def field_selection(text_fields: t.Optional[t.List[str]] = None) -> t.Dict[str, Extractor]:
+        """
+        The extractors for the header plus the text fields, in the order they are written
+        """
+        if text_fields is None:
+            text_fields = ['abstract', 'body']
+        return utils.select_extractors(['id', 'journal', 'title'] + text_fields)
 
     @staticmethod
-    def _field_selection() -> t.Dict[str, Extractor]:
-        fields = {}
-        fields['id'] = utils.extract_id
-        fields['journal'] = utils.extract_journal
-        fields['title'] = utils.extract_title
-        fields['abstract'] = utils.extract_abstract
-        fields['body'] = utils.extract_body
-        return fields
+    def corpus_fields(fields: t.Dict[str, Extractor]) -> t.Dict[str, Extractor]:
+        """
+        The fields along with the year the corpus statistics count the articles by.
+        When it is not already one of them it is optional, so a document without a year is still written.
+        """
+        if 'year' in fields:
+            return fields
+        return {**fields, 'year': utils.optional_extractor(utils.extractors['year'])}
 
     @staticmethod
-    def _flatten_and_save(file_pattern: str, count: int, articles: t.Iterator[Article]) -> None:
-        fp: t.Optional[TextIOWrapper] = None
+    def flatten_and_save(file_pattern: str, count: int, articles: t.Iterator[Article], splitter: Splitter, stats: t.Optional[Stats] = None, size: t.Optional[int] = None, compression: t.Optional[str] = None, level: t.Optional[int] = None, queue_bytes: int = 0, corpus: t.Optional[CorpusStats] = None) -> t.List[Shard]:
+        """
+        Writes the articles to TXT files of about `count` lines, or `size` bytes of text, each.
+        Each article is joined and encoded once then written in a single call.
+        The line endings are the platform's, same as a file opened as text.
+        With `queue_bytes` the files are written (and compressed) on a background thread, up to that many bytes behind.
+        The `seconds.split` spent splitting sentences and `seconds.write` spent writing are added to `stats`,
+        along with the `lines`, `output_files` and `output_bytes`.
+        Each article's sentences are added to `corpus`, along with the `seconds.corpus_stats` it took.
+        """
+        if stats is None:
+            stats = Stats()
+        shards: t.List[Shard] = []
+        fp: t.Optional[t.BinaryIO] = None
         fp_i: int = 0
         fp_lines: int = 0
+        fp_bytes: int = 0
+        file_name = ''
+        written = { 'articles': 0, 'lines': 0 }
+        ids = ['', '']
+        def _close(fp: t.BinaryIO) -> None:
+            fp.close()
+            disk = os.path.getsize(file_name)
+            shards.append(Shard(pathlib.Path(file_name).name, written['articles'], written['lines'], disk, ids[0], ids[1]))
+            stats.add('output_files')
+            stats.add('output_bytes', disk)
         for article in articles:
+            start = time.perf_counter()
             if fp is None:
                 file_name = file_pattern.format(id = fp_i)
-                fp = open(file_name, 'w', encoding = 'utf-8')
+                fp = utils.write_behind(utils.open_output(pathlib.Path(file_name), compression, level), queue_bytes, stats, 'txt')
                 fp_i += 1
                 fp_lines = 0
-            lines = [line for line in Convert._flatten_article(article)]
-            fp.writelines((f'{x}\n' for x in lines))
+                fp_bytes = 0
+                written = { 'articles': 0, 'lines': 0 }
+                ids[0] = Convert._pmcid(article)
+            lines = [line for line in Convert.flatten_article(article, splitter)]
+            split = time.perf_counter()
+            text = '\n'.join(lines) + '\n'
+            if _newline != '\n':
+                text = text.replace('\n', _newline)
+            data = text.encode('utf-8')
             fp_lines += len(lines) + 1
-            if fp_lines >= count:
-                fp.close()
+            fp_bytes += len(data)
+            full = fp_lines >= count if size is None else fp_bytes >= size
+            if not full:
+                data += _separator
+                fp_bytes += len(_separator)
+            fp.write(data)
+            written['articles'] += 1
+            written['lines'] += len(lines) + (0 if full else 1)
+            ids[1] = Convert._pmcid(article)
+            stats.add('lines', len(lines) + 1)
+            if full:
+                _close(fp)
                 fp = None
-            else:
-                fp.writelines(['\n'])
+            stats.add('seconds.split', split - start)
+            stats.add('seconds.write', time.perf_counter() - split)
+            if corpus is not None:
+                # After the header, the sentences with a blank line after each paragraph
+                Convert._add_corpus_stats(corpus, article, (line for line in lines[4:] if line != ''), stats)
         if fp is not None:
+            _close(fp)
+        return shards
+
+    @staticmethod
+    def _json_and_save(file_pattern: str, count: int, articles: t.Iterator[Article], splitter: Splitter, stats: t.Optional[Stats] = None, size: t.Optional[int] = None, queue_bytes: int = 0, corpus: t.Optional[CorpusStats] = None) -> t.List[Shard]:
+        """
+        Writes the articles as JSON, one per line, to JSONL files of about `count` articles, or `size` bytes, each.
+        The text fields are lists of paragraphs, each a list of sentences.
+        Each file gets an index of the byte offset of every line (see `utils.write_jsonl_index`) so it can be read in any order.
+        The same stats are added as `_flatten_and_save`, with a `lines` per article.
+        """
+        if stats is None:
+            stats = Stats()
+        shards: t.List[Shard] = []
+        fp: t.Optional[t.BinaryIO] = None
+        fp_i: int = 0
+        offsets: t.List[int] = []
+        file_name = ''
+        ids = ['', '']
+        def _close(fp: t.BinaryIO) -> None:
             fp.close()
+            utils.write_jsonl_index(pathlib.Path(file_name), offsets)
+            disk = os.path.getsize(file_name)
+            shards.append(Shard(pathlib.Path(file_name).name, len(offsets) - 1, len(offsets) - 1, disk, ids[0], ids[1]))
+            stats.add('output_files')
+            stats.add('output_bytes', disk)
+        for article in articles:
+            start = time.perf_counter()
+            if fp is None:
+                file_name = file_pattern.format(id = fp_i)
+                fp = utils.write_behind(utils.open_output(pathlib.Path(file_name)), queue_bytes, stats, 'txt')
+                fp_i += 1
+                offsets = [0]
+                ids[0] = Convert._pmcid(article)
+            record = Convert._split_article(article, splitter)
+            split = time.perf_counter()
+            line = json.dumps(record, ensure_ascii = False).encode('utf-8') + b'\n'
+            fp.write(line)
+            offsets.append(offsets[-1] + len(line))
+            ids[1] = Convert._pmcid(article)
+            stats.add('lines')
+            full = len(offsets) - 1 >= count if size is None else offsets[-1] >= size
+            if full:
+                _close(fp)
+                fp = None
+            stats.add('seconds.split', split - start)
+            stats.add('seconds.write', time.perf_counter() - split)
+            if corpus is not None:
+                sentences = (sentence for value in record.values() if isinstance(value, list) for paragraph in value for sentence in paragraph)
+                Convert._add_corpus_stats(corpus, article, sentences, stats)
+        if fp is not None:
+            _close(fp)
+        return shards
+
+    @staticmethod
+    def _add_corpus_stats(corpus: CorpusStats, article: Article, sentences: t.Iterable[str], stats: Stats) -> None:
+        start = time.perf_counter()
+        corpus.add(article, sentences)
+        stats.add('seconds.corpus_stats', time.perf_counter() - start)
+
+    @staticmethod
+    def _pmcid(article: Article) -> str:
+        id = article.get('id')
+        return '' if id is None else utils.normalize_pmcid(str(id))
 
     @staticmethod
-    def _flatten_article(article: Article) -> t.Iterator[str]:
+    def _split_article(article: Article, splitter: Splitter) -> t.Dict[str, t.Any]:
+        """
+        The same fields as `_flatten_article`, with the text fields split into paragraphs of sentences
+        """
+        record: t.Dict[str, t.Any] = { 'id': article['id'], 'journal': article['journal'], 'title': article['title'] }
+        for name, value in article.items():
+            if isinstance(value, list):
+                record[name] = [[sentence for sentence in sentences] for sentences in splitter(value)]
+        return record
+
+    @staticmethod
+    def flatten_article(article: Article, splitter: Splitter) -> t.Iterator[str]:
         yield f"--- {article['id']} ---"
         yield f"--- {article['journal']} ---"
         yield f"--- {article['title']} ---"
         yield ""
-        if 'abstract' in article and isinstance(article['abstract'], list):
-            for paragraph in article['abstract']:
-                for sentence in Convert._split_sentences(paragraph):
-                    yield sentence
-                yield ""
-        if 'body' in article and isinstance(article['body'], list):
-            for paragraph in article['body']:
-                for sentence in Convert._split_sentences(paragraph):
-                    yield sentence
-                yield ""
-
-    @staticmethod
-    def _split_sentences(text: str) -> t.Iterator[str]:
-        words = text.split()
-        st: int = 0
-        for i in range(0, len(words)-1):
-            if words[i][-1] in Convert._eos:
-                if words[i] in Convert._abbrev:
-                    continue
-                if words[i+1][0].isupper() or words[i+1][0].isdigit():
-                    yield ' '.join(words[st:(i+1)])
-                    st = i + 1
-        if st < len(words):
-            yield ' '.join(words[st:len(text)])
+        for value in article.values():
+            if isinstance(value, list):
+                for sentences in splitter(value):
+                    yield from sentences
+                    yield ""
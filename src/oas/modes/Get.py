@@ -0,0 +1,42 @@
+import contextlib
+import sys
+from ..dtypes import Get as settings
+from ..dtypes import NamedDocument, ProcessError
+from .. import utils
+from .Convert import Convert
+
+class Get:
+
+    def __init__(self, settings: settings):
+        """
+        Gets individual articles using the catalog.
+
+        Parameters
+        ----------
+        settings : dtypes.settings.get
+            The settings for the process
+        """
+        self._settings = settings
+        self._splitter = utils.SentenceSplitter().split_paragraphs
+
+    def init(self) -> None:
+        self._settings.validate()
+
+    def run(self) -> None:
+        with contextlib.closing(utils.open_catalog(self._settings.catalog)) as catalog:
+            found, missing = utils.find_articles(catalog, self._settings.ids)
+        for id in missing:
+            print(f'Error: {id} is not in the catalog', file = sys.stderr)
+        for path, members in found.items():
+            for member in members:
+                document = utils.read_member(path, member)
+                if self._settings.xml:
+                    sys.stdout.buffer.write(document)
+                    sys.stdout.buffer.write(b'\n')
+                else:
+                    for article in utils.extract_articles(iter([NamedDocument(member.name, document)]), Convert.field_selection(), self._log_bad_extract):
+                        for line in Convert.flatten_article(article, self._splitter):
+                            print(line)
+
+    def _log_bad_extract(self, error: ProcessError) -> None:
+        print(f"Error: {','.join(error.issues)}", file = sys.stderr)
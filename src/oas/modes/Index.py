@@ -0,0 +1,38 @@
+import typing as t
+from ..dtypes import Index as settings
+from ..dtypes import TarPart
+from .. import utils
+
+class Index:
+
+    def __init__(self, settings: settings):
+        """
+        Writes the member index (.tar.idx) sidecar for each tar ball.
+
+        Parameters
+        ----------
+        settings : dtypes.settings.index
+            The settings for the process
+        """
+        self._settings = settings
+
+    def init(self) -> None:
+        self._settings.validate()
+
+    def run(self) -> None:
+        tar_balls = [path for path in utils.list_folder_tar_balls(self._settings.source) if not utils.is_compressed(path)]
+        units = utils.list_tar_parts(tar_balls, 1)
+        results = utils.schedule_tar_balls(units, self._index_tar_ball, self._settings.jobs)
+        results = utils.progress_overlay(results, 'Indexing tar ball #')
+        total = 0
+        for _, count in results:
+            total += count
+        print(f'Indexed {total} documents in {len(units)} tar balls')
+
+    def _index_tar_ball(self, unit: TarPart) -> int:
+        members: t.Optional[t.List[t.Any]] = None
+        if not self._settings.restart:
+            members = utils.load_index(unit.path)
+        if members is None:
+            members = utils.build_index(unit.path)
+        return len(members)
@@ -0,0 +1,118 @@
+import pathlib
+import typing as t
+from ..dtypes import Manifest, Node, TarPart
+from ..dtypes import Merge as settings
+from ..dtypes import Metadata as settings_meta
+from .. import utils
+from .Metadata import Metadata
+
+class Merge:
+
+    def __init__(self, settings: settings):
+        """
+        Checks the output of a run shared across machines (I.E. `-shard i/N`) then combines it.
+        Every tar ball must have been processed by exactly one node, with all of its output still there.
+        Only the shared folders are used, so it can run anywhere once every node is done.
+
+        Parameters
+        ----------
+        settings : dtypes.settings.merge
+            The settings for the process
+        """
+        self._settings = settings
+        self._metadata: t.Optional[Metadata] = None
+        if settings.metadata is not None:
+            self._metadata = self._metadata_mode(settings.metadata, settings.fields)
+
+    def init(self) -> None:
+        self._settings.validate()
+
+    def run(self) -> None:
+        """
+        Nothing is merged when any check fails
+        """
+        tar_balls = [path for path in utils.list_folder_tar_balls(self._settings.source)]
+        units = utils.list_tar_parts(tar_balls, self._settings.split)
+        problems: t.List[str] = []
+        if self._settings.dest is not None:
+            problems.extend(self._check(units, self._settings.dest))
+        if self._metadata is not None:
+            problems.extend(self._check(units, self._metadata.output_folder()))
+        for problem in problems:
+            print(f'Error: {problem}')
+        if len(problems) > 0:
+            raise ValueError(f'{len(problems)} problems were found, nothing was merged')
+        if self._settings.dest is not None:
+            self._merge_corpus_stats(units, self._settings.dest)
+        if self._metadata is not None and self._settings.metadata is not None:
+            if self._settings.fields is None:
+                # The nodes may have been given -fields, so the columns are taken from what they wrote
+                self._metadata = self._metadata_mode(self._settings.metadata, utils.csv_shard_fields([self._metadata.shard_path(unit) for unit in units]))
+            self._metadata.finish(tar_balls, units)
+            print(f'Merged {len(units)} tar balls into {self._settings.metadata}')
+
+    def _metadata_mode(self, dest: pathlib.Path, fields: t.Optional[t.List[str]]) -> Metadata:
+        settings = self._settings
+        return Metadata(settings_meta(settings.source, dest, None, split = settings.split, catalog = settings.catalog, fields = fields, format = settings.format))
+
+    def _merge_corpus_stats(self, units: t.List[TarPart], folder: pathlib.Path) -> None:
+        """
+        Combines the nodes' corpus statistics, when every unit has them (I.E. they ran with `-corpus_stats`)
+        """
+        paths = [utils.corpus_stats_path(folder, utils.part_stem(unit)) for unit in units]
+        if len(paths) == 0 or not all(path.exists() for path in paths):
+            return
+        dest = utils.corpus_stats_path(folder)
+        utils.merge_corpus_stats(paths, dest)
+        print(f'Wrote the corpus statistics to {dest}')
+
+    def _check(self, units: t.List[TarPart], folder: pathlib.Path) -> t.List[str]:
+        """
+        Checks the nodes' manifests in the folder cover each unit once, with no gaps or overlaps.
+        The output files must all be there, each claimed by a single unit, with the sizes the nodes wrote.
+        Every unit must have been processed with the same settings (see `utils.fingerprint`).
+        """
+        manifests = {node: Manifest(path) for node, path in utils.list_node_manifests(folder).items()}
+        if len(manifests) == 0:
+            return [f'{folder} has no node manifests']
+        problems: t.List[str] = []
+        for count in sorted({node.nodes for node in manifests.keys()}):
+            problems.extend(f'{folder} has no manifest from node {i} of {count}' for i in range(count) if Node(i, count) not in manifests)
+        keys = {utils.part_key(unit) for unit in units}
+        claimed: t.Dict[str, str] = {}
+        documents = 0
+        errors = 0
+        for unit in units:
+            key = utils.part_key(unit)
+            owners = [node for node, manifest in manifests.items() if key in manifest.entries]
+            if len(owners) == 0:
+                problems.append(f'{key} was not processed by any node')
+                continue
+            if len(owners) > 1:
+                problems.append(f"{key} was processed by {' and '.join(_node_name(x) for x in owners)}")
+                continue
+            manifest = manifests[owners[0]]
+            if not manifest.is_complete(unit.path, folder, key):
+                problems.append(f'{key} changed since {_node_name(owners[0])} processed it, or its output is missing')
+                continue
+            entry = manifest.entries[key]
+            for shard in entry.get('shards', []):
+                size = folder.joinpath(shard['name']).stat().st_size
+                if size != shard['bytes']:
+                    problems.append(f"{shard['name']} is {size} bytes but {_node_name(owners[0])} wrote {shard['bytes']}")
+            for name in entry['outputs']:
+                if name in claimed:
+                    problems.append(f'{name} is the output of both {claimed[name]} and {key}')
+                claimed[name] = key
+            documents += entry['documents']
+            errors += entry['errors']
+        for node, manifest in manifests.items():
+            problems.extend(f'{key} from {_node_name(node)} is not in {self._settings.source}' for key in manifest.entries.keys() if key not in keys)
+        settings = {entry.get('fingerprint') for manifest in manifests.values() for key, entry in manifest.entries.items() if key in keys}
+        if len(settings) > 1:
+            problems.append(f'{folder} was written with {len(settings)} different sets of settings, rerun the nodes with the same options')
+        print(f'Checked {folder}: {len(units)} tar balls, {len(claimed)} files, {documents} documents, {errors} errors from {len(manifests)} nodes')
+        return problems
+
+def _node_name(node: Node) -> str:
+    return f'node {node.node} of {node.nodes}'
@@ -1,7 +1,12 @@
+import contextlib
 import csv
+import functools
+import io
+import os
 import pathlib
+import time
 import typing as t
-from ..dtypes import Article, Extractor, ProcessError
+from ..dtypes import Article, Extractor, Manifest, NamedDocument, Overrun, Shard, Stats, TarPart
 from ..dtypes import Metadata as settings
 from .. import utils
 
@@ -20,51 +25,157 @@ class Metadata:
 
     def init(self) -> None:
         self._settings.validate()
-        if self._settings.dest.exists():
-            self._settings.dest.unlink()
+        # The database is updated in place, unless starting over
+        if self._settings.shard is None and (self._settings.format == 'csv' or self._settings.restart):
+            for suffix in ['', '-wal', '-shm']:
+                self._settings.dest.with_name(self._settings.dest.name + suffix).unlink(missing_ok = True)
 
     def run(self) -> None:
-        fields = Metadata._field_selection()
-        field_names = [x for x in fields.keys()]
-        source_files = (path for path in utils.list_folder_tar_balls(self._settings.source))
-        doc_collections = (utils.list_documents(file) for file in source_files)
-        docs = (x for y in doc_collections for x in y)
-        docs = utils.progress_overlay(docs, 'Reading document #')
-        articles = utils.extract_articles(docs, fields, self._log_bad_extract)
-        articles = Metadata._stream_csv(self._settings.dest, field_names, articles)
-        for _ in articles: pass
-
-    def _log_bad_extract(self, error: ProcessError) -> None:
-        if self._settings.log is None:
-            print(f"Error: {','.join(error.issues)}")
+        jobs = self._settings.jobs
+        run = utils.UnitRun([self], self._settings.source, self._settings.split, self._settings.shard, self._settings.restart, self._settings.dedup, self._settings.limits)
+        run.plan()
+        # In this process the work adds straight to the run's stats so the progress is live
+        stats = Stats()
+        work = functools.partial(self._extract_tar_ball, stats = stats if jobs <= 1 else None, skip = run.skip)
+        run.run('metadata', 'Reading', work, jobs, stats, self._settings.stats, self._settings.prometheus)
+
+    def output_folder(self) -> pathlib.Path:
+        """
+        The folder of the units' CSV shards (I.E. {dest}.parts)
+        """
+        dest = self._settings.dest
+        return dest.parent.joinpath(f'{dest.stem}.parts')
+
+    def fingerprint(self) -> str:
+        """
+        The digest of the settings that shape the unit's CSV shard, so a rerun with any of them changed redoes the unit
+        """
+        settings = self._settings
+        return utils.fingerprint({
+            'fields': [x for x in Metadata.field_selection(settings.fields).keys()],
+            'filter': utils.filter_fingerprint(settings.filter),
+            'dedup': settings.dedup is not None })
+
+    def is_complete(self, unit: TarPart, manifest: Manifest) -> bool:
+        return manifest.is_complete(unit.path, self.output_folder(), utils.part_key(unit), self.fingerprint())
+
+    def complete(self, unit: TarPart, manifest: Manifest, documents: int, errors: int, issues: t.Dict[str, int], shards: t.List[Shard]) -> None:
+        """
+        Records the unit's CSV shard in the manifest
+        """
+        manifest.complete(unit.path, documents, errors, [self.shard_path(unit).name], utils.part_key(unit), issues, fingerprint = self.fingerprint())
+
+    def finish(self, tar_balls: t.List[pathlib.Path], units: t.List[TarPart]) -> None:
+        """
+        Merges the shards into the CSV file, or loads the changed ones into the database, then catalogs the tar balls.
+        A node of a shared run leaves that to `merge`.
+        """
+        if self._settings.shard is not None:
+            print(f'Run merge once every node is done to write {self._settings.dest}')
+            return
+        shards = [self.shard_path(unit) for unit in units]
+        if self._settings.format == 'sqlite':
+            fields = [x for x in Metadata.field_selection(self._settings.fields).keys()]
+            with contextlib.closing(utils.open_database(self._settings.dest, fields)) as database:
+                loaded, rows = utils.load_csv_shards(database, shards)
+            print(f'Loaded {rows} rows from {loaded} new or changed CSV files into {self._settings.dest}')
         else:
-            utils.write_log(self._settings.log, error)
-    
+            utils.merge_csv_shards(shards, self._settings.dest)
+        if self._settings.catalog is not None:
+            with contextlib.closing(utils.open_catalog(self._settings.catalog)) as catalog:
+                for path in tar_balls:
+                    utils.catalog_tar_ball(catalog, path)
+                for shard in shards if self._settings.format == 'sqlite' else [self._settings.dest]:
+                    utils.catalog_dois(catalog, shard)
+
+    def _extract_tar_ball(self, unit: TarPart, stats: t.Optional[Stats] = None, skip: t.Optional[t.Dict[str, t.Set[str]]] = None) -> utils.UnitResult:
+        if stats is None:
+            stats = Stats()
+        overruns: t.List[Overrun] = []
+        fields = Metadata.field_selection(self._settings.fields)
+        field_names = [x for x in fields.keys()]
+        counts = [0]
+        def _count(docs: t.Iterator[NamedDocument]) -> t.Iterator[NamedDocument]:
+            for doc in docs:
+                counts[0] += 1
+                yield doc
+        with utils.ErrorLog(self._settings.log, self._log_name(unit), unit.path) as log:
+            docs = utils.list_documents(unit.path, self._settings.stream_size, unit.part, unit.parts, self.member_filter(), stats, self.skip(unit, skip), unit.members)
+            docs = _count(utils.read_ahead(docs, self._settings.queue_bytes, stats))
+            _log = utils.collect_overruns(log.write, self._settings.limits, overruns)
+            articles = utils.extract_articles(docs, fields, _log, self._settings.workers, self._settings.filter, stats = stats, limits = self._settings.limits)
+            articles = Metadata.stream_csv(self.shard_path(unit), field_names, articles, stats = stats, queue_bytes = self._settings.queue_bytes)
+            for _ in articles: pass
+        return utils.UnitResult(counts[0], [log.errors], [log.issues], [], overruns, stats)
+
+    def skip(self, unit: TarPart, skip: t.Optional[t.Dict[str, t.Set[str]]]) -> t.Set[str]:
+        """
+        The unit's members to pass over, the quarantined ones and, with dedup, those with a newer copy
+        """
+        members = (skip or {}).get(unit.path.name, set())
+        if self._settings.dedup is not None:
+            members = members | utils.dedup_skip(self._settings.dedup, unit.path, self.output_folder())
+        return members
+
+    def shard_path(self, unit: TarPart) -> pathlib.Path:
+        return self.output_folder().joinpath(f'{utils.part_stem(unit)}.csv')
+
+    def _log_name(self, unit: TarPart) -> str:
+        return f'{utils.part_stem(unit)}.metadata'
+
+    def rollback(self, unit: TarPart, manifest: Manifest) -> None:
+        """
+        Removes the shard, and error archive, from an earlier, unfinished or outdated, run of the unit
+        """
+        self.shard_path(unit).unlink(missing_ok = True)
+        if self._settings.log is not None:
+            utils.error_log_path(self._settings.log, self._log_name(unit)).unlink(missing_ok = True)
+        manifest.forget(unit.path, utils.part_key(unit))
+
+    def member_filter(self) -> t.Optional[t.Set[str]]:
+        """
+        The PMC ids to keep, when they can be checked using just the member names
+        """
+        filter = self._settings.filter
+        if filter is None or filter.pmcids is None or filter.dois:
+            return None
+        return filter.pmcids
+
     @staticmethod
-    def _field_selection() -> t.Dict[str, Extractor]:
-        fields = {}
-        fields['id'] = utils.extract_id
-        fields['journal'] = utils.extract_journal
-        fields['volume'] = utils.extract_volume
-        fields['issue'] = utils.extract_issue
-        fields['year'] = utils.extract_year
-        fields['category'] = utils.extract_category
-        fields['doi'] = utils.extract_doi
-        fields['issn'] = utils.extract_issn
-        fields['authors'] = utils.extract_authors
-        fields['title'] = utils.extract_title
-        fields['references'] = utils.extract_references
-        return fields
+    def field_selection(names: t.Optional[t.List[str]] = None) -> t.Dict[str, Extractor]:
+        """
+        The extractors for the named fields, in CSV column order.
+        Only these are run so the sections of the JATS file none of them read are never parsed.
+        """
+        if names is None:
+            names = ['id', 'journal', 'volume', 'issue', 'year', 'category', 'doi', 'issn', 'authors', 'title', 'references']
+        return utils.select_extractors(names)
 
     @staticmethod
-    def _stream_csv(dest: pathlib.Path, fields: t.List[str], articles: t.Iterator[Article]) -> t.Iterator[Article]:
-        with open(dest, 'w', encoding = 'utf-8', newline = '') as fp:
+    def stream_csv(dest: pathlib.Path, fields: t.List[str], articles: t.Iterator[Article], keep: t.Optional[t.Callable[[Article], bool]] = None, stats: t.Optional[Stats] = None, queue_bytes: int = 0) -> t.Iterator[Article]:
+        """
+        Writes each article as a CSV row then passes it on.
+        When `keep` is given only the articles it accepts are written, but all are passed on.
+        The `seconds.write_csv` spent writing is added to `stats`, along with the `rows`, `output_files` and `output_bytes`.
+        With `queue_bytes` the file is written on a background thread, up to that many bytes behind.
+        """
+        if stats is None:
+            stats = Stats()
+        with io.TextIOWrapper(utils.write_behind(open(dest, 'wb'), queue_bytes, stats, 'csv'), encoding = 'utf-8', newline = '') as fp:
             writer = csv.writer(fp, delimiter = ',', quotechar = '"', quoting = csv.QUOTE_ALL)    
             writer.writerow(fields)
             for article in articles:
+                if keep is not None and not keep(article):
+                    yield article
+                    continue
+                start = time.perf_counter()
                 row = [None] * len(fields)
                 for i in range(0, len(fields)):
                     if fields[i] in article:
                         row[i] = article[fields[i]]
                 writer.writerow(row)
+                stats.add('rows')
+                stats.add('seconds.write_csv', time.perf_counter() - start)
                 yield article
+        stats.add('output_files')
+        stats.add('output_bytes', os.path.getsize(dest))
@@ -1,2 +1,7 @@
+from .All import All as All
+from .Benchmark import Benchmark as Benchmark
 from .Convert import Convert as Convert
+from .Get import Get as Get
+from .Index import Index as Index
+from .Merge import Merge as Merge
 from .Metadata import Metadata as Metadata
@@ -1,3 +1,27 @@
+from .cache_helper import ArticleCache as ArticleCache
+from .cache_helper import article_cache_path as article_cache_path
+from .cache_helper import cache_version as cache_version
+from .cache_helper import document_digest as document_digest
+from .catalog_helper import catalog_dois as catalog_dois
+from .catalog_helper import catalog_tar_ball as catalog_tar_ball
+from .catalog_helper import find_articles as find_articles
+from .catalog_helper import normalize_pmcid as normalize_pmcid
+from .catalog_helper import open_catalog as open_catalog
+from .catalog_helper import read_ids as read_ids
+from .corpus_helper import corpus_stats_path as corpus_stats_path
+from .corpus_helper import load_corpus_stats as load_corpus_stats
+from .corpus_helper import merge_corpus_stats as merge_corpus_stats
+from .corpus_helper import save_corpus_stats as save_corpus_stats
+from .database_helper import csv_shard_fields as csv_shard_fields
+from .database_helper import load_csv_shards as load_csv_shards
+from .database_helper import open_database as open_database
+from .dedup_helper import body_digest as body_digest
+from .dedup_helper import dedup_skip as dedup_skip
+from .dedup_helper import drop_duplicate_bodies as drop_duplicate_bodies
+from .dedup_helper import open_dedup as open_dedup
+from .dedup_helper import package_order as package_order
+from .dedup_helper import plan_dedup as plan_dedup
+from .dedup_helper import save_dedup_plan as save_dedup_plan
 from .extract_helper import extract_id as extract_id
 from .extract_helper import extract_journal as extract_journal
 from .extract_helper import extract_volume as extract_volume
@@ -11,8 +35,65 @@ from .extract_helper import extract_title as extract_title
 from .extract_helper import extract_abstract as extract_abstract
 from .extract_helper import extract_body as extract_body
 from .extract_helper import extract_references as extract_references
+from .extract_helper import extractors as extractors
+from .extract_helper import needed_sections as needed_sections
+from .extract_helper import optional_extractor as optional_extractor
+from .extract_helper import select_extractors as select_extractors
+from .fs_helper import compressions as compressions
+from .fs_helper import is_compressed as is_compressed
 from .fs_helper import list_folder_tar_balls as list_folder_tar_balls
 from .fs_helper import list_documents as list_documents
-from .fs_helper import write_log as write_log
+from .fs_helper import list_pattern_files as list_pattern_files
+from .fs_helper import open_output as open_output
+from .fs_helper import output_extension as output_extension
+from .fs_helper import tar_ball_stem as tar_ball_stem
+from .index_helper import build_index as build_index
+from .index_helper import get_index as get_index
+from .index_helper import index_path as index_path
+from .index_helper import list_indexed_documents as list_indexed_documents
+from .index_helper import load_index as load_index
+from .index_helper import member_blocks as member_blocks
+from .index_helper import pmc_id as pmc_id
+from .index_helper import read_member as read_member
+from .jsonl_helper import JsonlReader as JsonlReader
+from .jsonl_helper import jsonl_index_path as jsonl_index_path
+from .jsonl_helper import read_jsonl_index as read_jsonl_index
+from .jsonl_helper import write_jsonl_index as write_jsonl_index
+from .log_helper import ErrorLog as ErrorLog
+from .log_helper import error_log_path as error_log_path
+from .log_helper import print_issues as print_issues
+from .log_helper import read_error_log as read_error_log
+from .pipeline_helper import collect_overruns as collect_overruns
 from .pipeline_helper import extract_articles as extract_articles
+from .pipeline_helper import overrun as overrun
+from .progress_helper import byte_progress as byte_progress
+from .progress_helper import every as every
 from .progress_helper import progress_overlay as progress_overlay
+from .run_helper import UnitOutput as UnitOutput
+from .run_helper import UnitResult as UnitResult
+from .run_helper import UnitRun as UnitRun
+from .run_helper import filter_fingerprint as filter_fingerprint
+from .run_helper import fingerprint as fingerprint
+from .schedule_helper import assign_tar_parts as assign_tar_parts
+from .schedule_helper import index_tar_parts as index_tar_parts
+from .schedule_helper import list_node_manifests as list_node_manifests
+from .schedule_helper import list_tar_parts as list_tar_parts
+from .schedule_helper import manifest_name as manifest_name
+from .schedule_helper import merge_csv_shards as merge_csv_shards
+from .schedule_helper import node_tar_parts as node_tar_parts
+from .schedule_helper import part_key as part_key
+from .schedule_helper import part_size as part_size
+from .schedule_helper import part_stem as part_stem
+from .schedule_helper import quarantine_name as quarantine_name
+from .schedule_helper import schedule_tar_balls as schedule_tar_balls
+from .sentence_helper import SentenceSplitter as SentenceSplitter
+from .sentence_helper import default_abbreviations as default_abbreviations
+from .sentence_helper import load_abbreviations as load_abbreviations
+from .stage_helper import read_ahead as read_ahead
+from .stage_helper import write_behind as write_behind
+from .stats_helper import monitor_run as monitor_run
+from .stats_helper import write_prometheus as write_prometheus
+from .stats_helper import write_stats_report as write_stats_report
+from .synth_helper import SynthOptions as SynthOptions
+from .synth_helper import synth_documents as synth_documents
+from .synth_helper import write_synth_tar_ball as write_synth_tar_ball
@@ -0,0 +1,169 @@
+import hashlib
+import marshal
+import os
+import pathlib
+import struct
+import typing as t
+from .. import __version__
+from ..dtypes import Article, Extractor, ProcessError
+from lxml import etree # type: ignore
+
+# Bump when the extracted articles change for the same document (I.E. an extractor or the XML parsing changes), so the articles cached before are evicted.
+# The package and lxml versions are part of the cache's version too.
+extractor_version = 1
+
+_magic = b'OASCACHE'
+# Each record is the document's digest and the length of the marshalled (issues, article) that follows
+_record = struct.Struct('<16sI')
+
+class ArticleCache:
+
+    def __init__(self, folder: pathlib.Path, name: str, fields: t.Dict[str, Extractor]):
+        """
+        Keeps the articles extracted from a tar ball so a rerun skips parsing the documents that did not change.
+        Each article is keyed by the BLAKE2 digest of its document's bytes.
+        The articles, or the issues of the documents that did not process, are appended to `{folder}/{name}.{fields}.articles` as they are extracted.
+        A cache written by another version of the extractors, or lxml, is evicted when it is opened.
+        A record cut short by an interrupted run is dropped.
+
+        Parameters
+        ----------
+        folder : pathlib.Path
+            The folder for the cache files
+        name : str
+            The cache's name (I.E. the tar ball's stem)
+        fields : t.Dict[str, Extractor]
+            The named extractors run on each document. Each set of fields has its own cache file
+        """
+        self._path = article_cache_path(folder, name, fields)
+        self._header = marshal.dumps({'version': cache_version(), 'fields': [x for x in fields.keys()]})
+        self._index: t.Dict[bytes, t.Tuple[int, int]] = {}
+        self._reader: t.Optional[t.BinaryIO] = None
+        self._writer: t.Optional[t.BinaryIO] = None
+        self._size = 0
+        self._flushed = 0
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._path
+    @property
+    def entries(self) -> int:
+        return len(self._index)
+
+    def open(self) -> 'ArticleCache':
+        """
+        Reads the index of the cache file, starting it over when it is from another version
+        """
+        self._flushed = self._scan()
+        self._writer = open(self._path, 'r+b' if self._flushed > 0 else 'w+b')
+        if self._flushed == 0:
+            self._writer.write(_magic + _record.pack(b'', len(self._header)) + self._header)
+            self._writer.flush()
+            self._flushed = self._writer.tell()
+        else:
+            # Drops any record cut short by an interrupted run
+            self._writer.truncate(self._flushed)
+        self._writer.seek(self._flushed)
+        self._size = self._flushed
+        self._reader = open(self._path, 'rb')
+        return self
+
+    def get(self, digest: bytes) -> t.Union[Article, ProcessError, None]:
+        """
+        The cached article, or the reason the document did not process, or None when the document is not cached.
+        A ProcessError's document is empty.
+        """
+        entry = self._index.get(digest)
+        if entry is None:
+            return None
+        offset, size = entry
+        if offset + size > self._flushed:
+            self._writer.flush() # type: ignore
+            self._flushed = self._size
+        self._reader.seek(offset) # type: ignore
+        issues, article = marshal.loads(self._reader.read(size)) # type: ignore
+        return article if issues is None else ProcessError(b'', issues, article)
+
+    def put(self, digest: bytes, result: t.Union[Article, ProcessError]) -> None:
+        """
+        Appends the article, or the reason the document did not process
+        """
+        if digest in self._index:
+            return
+        if isinstance(result, ProcessError):
+            data = marshal.dumps((result.issues, result.article))
+        else:
+            data = marshal.dumps((None, result))
+        self._writer.write(_record.pack(digest, len(data))) # type: ignore
+        self._writer.write(data) # type: ignore
+        self._index[digest] = (self._size + _record.size, len(data))
+        self._size += _record.size + len(data)
+
+    def close(self) -> None:
+        for fp in [self._reader, self._writer]:
+            if fp is not None:
+                fp.close()
+        self._reader = None
+        self._writer = None
+
+    def __enter__(self) -> 'ArticleCache':
+        return self.open()
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _scan(self) -> int:
+        """
+        Indexes the records of a cache file from this version.
+        The size of the whole records is returned, 0 when the file has to be started over.
+        """
+        if not self._path.exists():
+            return 0
+        with open(self._path, 'rb') as fp:
+            head = fp.read(len(_magic) + _record.size)
+            if len(head) < len(_magic) + _record.size or head[:len(_magic)] != _magic:
+                return 0
+            _, size = _record.unpack(head[len(_magic):])
+            if fp.read(size) != self._header:
+                return 0
+            end = fp.tell()
+            file_size = os.fstat(fp.fileno()).st_size
+            while True:
+                head = fp.read(_record.size)
+                if len(head) < _record.size:
+                    break
+                digest, size = _record.unpack(head)
+                if end + _record.size + size > file_size:
+                    break
+                fp.seek(size, os.SEEK_CUR)
+                self._index[digest] = (end + _record.size, size)
+                end += _record.size + size
+        return end
+
+def article_cache_path(folder: pathlib.Path, name: str, fields: t.Dict[str, Extractor]) -> pathlib.Path:
+    """
+    The path of a cache file
+
+    Parameters
+    ----------
+    folder : pathlib.Path
+        The folder for the cache files
+    name : str
+        The cache's name (I.E. the tar ball's stem)
+    fields : t.Dict[str, Extractor]
+        The named extractors run on each document
+    """
+    digest = hashlib.blake2b(','.join(fields.keys()).encode('utf-8'), digest_size = 4).hexdigest()
+    return folder.joinpath(f'{name}.{digest}.articles')
+
+def cache_version() -> str:
+    """
+    The version of the extracted articles, changing whenever they might
+    """
+    return f"oas {__version__}, extractors {extractor_version}, lxml {'.'.join(str(x) for x in etree.LXML_VERSION)}"
+
+def document_digest(document: bytes) -> bytes:
+    """
+    The cache key of a raw JATS document
+    """
+    return hashlib.blake2b(document, digest_size = 16).digest()
@@ -0,0 +1,120 @@
+import csv
+import pathlib
+import sqlite3
+import typing as t
+from ..dtypes import TarMember
+from .fs_helper import is_compressed
+from .index_helper import get_index
+
+_schema = """
+CREATE TABLE IF NOT EXISTS articles (
+    pmcid TEXT PRIMARY KEY,
+    doi TEXT,
+    tar_ball TEXT NOT NULL,
+    member TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_doi ON articles (doi);
+"""
+
+def open_catalog(path: pathlib.Path) -> sqlite3.Connection:
+    """
+    Opens (creating if needed) the corpus catalog that maps PMC id and DOI to a tar ball member
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The SQLite file
+    """
+    connection = sqlite3.connect(path)
+    connection.executescript(_schema)
+    return connection
+
+def catalog_tar_ball(catalog: sqlite3.Connection, tar_ball: pathlib.Path) -> int:
+    """
+    Records where each of the tar ball's documents is.
+    Compressed tar balls can not be seeked so they are not recorded.
+
+    Parameters
+    ----------
+    catalog : sqlite3.Connection
+        The corpus catalog
+    tar_ball : pathlib.Path
+        The tar ball
+    """
+    if is_compressed(tar_ball):
+        return 0
+    members = get_index(tar_ball)
+    rows = ((x.pmcid, str(tar_ball.resolve()), x.name, x.offset, x.size) for x in members)
+    with catalog:
+        catalog.executemany("""
+            INSERT INTO articles (pmcid, tar_ball, member, offset, size) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (pmcid) DO UPDATE SET tar_ball = excluded.tar_ball, member = excluded.member, offset = excluded.offset, size = excluded.size
+            """, rows)
+    return len(members)
+
+def catalog_dois(catalog: sqlite3.Connection, metadata: pathlib.Path) -> None:
+    """
+    Records the DOIs found in a metadata CSV
+
+    Parameters
+    ----------
+    catalog : sqlite3.Connection
+        The corpus catalog
+    metadata : pathlib.Path
+        The CSV with at least the id and doi columns
+    """
+    with open(metadata, 'r', encoding = 'utf-8', newline = '') as fp:
+        reader = csv.DictReader(fp)
+        if reader.fieldnames is None or 'id' not in reader.fieldnames or 'doi' not in reader.fieldnames:
+            return
+        rows = ((row['doi'], normalize_pmcid(row['id'])) for row in reader if row['doi'] != '' and row['id'] != '')
+        with catalog:
+            catalog.executemany('UPDATE articles SET doi = ? WHERE pmcid = ?', rows)
+
+def find_articles(catalog: sqlite3.Connection, ids: t.Iterable[str]) -> t.Tuple[t.Dict[pathlib.Path, t.List[TarMember]], t.List[str]]:
+    """
+    Finds the documents by PMC id or DOI
+
+    Parameters
+    ----------
+    catalog : sqlite3.Connection
+        The corpus catalog
+    ids : t.Iterable[str]
+        The PMC ids (I.E. PMC1234567 or 1234567) or DOIs (I.E. 10.1371/journal.pone.0000001)
+
+    Returns
+    -------
+    The members grouped by tar ball in offset order, and the ids that were not found
+    """
+    found: t.Dict[pathlib.Path, t.List[TarMember]] = {}
+    missing: t.List[str] = []
+    for id in ids:
+        if '/' in id:
+            row = catalog.execute('SELECT pmcid, tar_ball, member, offset, size FROM articles WHERE doi = ?', (id.strip(),)).fetchone()
+        else:
+            row = catalog.execute('SELECT pmcid, tar_ball, member, offset, size FROM articles WHERE pmcid = ?', (normalize_pmcid(id),)).fetchone()
+        if row is None:
+            missing.append(id)
+        else:
+            pmcid, tar_ball, member, offset, size = row
+            found.setdefault(pathlib.Path(tar_ball), []).append(TarMember(member, pmcid, offset, size))
+    for members in found.values():
+        members.sort(key = lambda member: member.offset)
+    return (found, missing)
+
+def read_ids(path: pathlib.Path) -> t.List[str]:
+    """
+    Reads a file of ids, one per line. Blank lines and # comments are skipped
+    """
+    with open(path, 'r', encoding = 'utf-8') as fp:
+        lines = (line.split('#')[0].strip() for line in fp)
+        return [line for line in lines if line != '']
+
+def normalize_pmcid(id: str) -> str:
+    """
+    The PMC id in the form used by the member names (I.E. 1234567 -> PMC1234567)
+    """
+    id = id.strip().upper()
+    return id if id.startswith('PMC') else f'PMC{id}'
@@ -0,0 +1,48 @@
+import json
+import os
+import pathlib
+import typing as t
+from ..dtypes import CorpusStats
+
+def corpus_stats_path(folder: pathlib.Path, name: str = 'oas') -> pathlib.Path:
+    """
+    The JSON file of the corpus statistics (I.E. {folder}/{name}.corpus.json)
+
+    Parameters
+    ----------
+    folder : pathlib.Path
+        The folder of the output
+    name : str
+        The tar ball's, or part's, stem. The default is the whole run's
+    """
+    return folder.joinpath(f'{name}.corpus.json')
+
+def save_corpus_stats(path: pathlib.Path, corpus: CorpusStats) -> None:
+    """
+    Saves the statistics so a crash never leaves a half written file
+    """
+    temp = path.with_name(f'{path.name}.tmp')
+    with open(temp, 'w', encoding = 'utf-8') as fp:
+        json.dump(corpus.to_dict(), fp, indent = 1, ensure_ascii = False)
+    os.replace(temp, path)
+
+def load_corpus_stats(path: pathlib.Path) -> CorpusStats:
+    with open(path, 'r', encoding = 'utf-8') as fp:
+        return CorpusStats.from_dict(json.load(fp))
+
+def merge_corpus_stats(paths: t.Iterable[pathlib.Path], dest: pathlib.Path) -> CorpusStats:
+    """
+    Combines the statistics of each tar ball into the run's
+
+    Parameters
+    ----------
+    paths : t.Iterable[pathlib.Path]
+        The tar balls' JSON files
+    dest : pathlib.Path
+        The run's JSON file
+    """
+    corpus = CorpusStats()
+    for path in paths:
+        corpus.merge(load_corpus_stats(path))
+    save_corpus_stats(dest, corpus)
+    return corpus
@@ -0,0 +1,181 @@
+import csv
+import pathlib
+import sqlite3
+import typing as t
+
+# The columns looked up by, indexed once the rows are loaded
+_indexed = ['doi', 'journal', 'year', 'issn']
+# The columns stored as numbers, so ranges can use the index
+_integers = ['year']
+# Every shard, with its place in the load order
+_shards_columns = ['name', 'size', 'mtime', 'rank']
+
+def open_database(path: pathlib.Path, fields: t.List[str]) -> sqlite3.Connection:
+    """
+    Opens (creating if needed) the metadata database, tuned for loading rows in bulk.
+    The articles table has a column per field, keyed by id, along with the CSV shard each row came from.
+    The copies table lists every shard that has each id, so a row can be taken from another shard when its own is removed.
+    When the fields changed since it was created the database is started over.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The SQLite file
+    fields : t.List[str]
+        The fields, in CSV column order. Must include the id
+    """
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        PRAGMA journal_mode = WAL;
+        PRAGMA synchronous = NORMAL;
+        PRAGMA temp_store = MEMORY;
+        PRAGMA cache_size = -262144;
+        """)
+    columns = [row[1] for row in connection.execute('PRAGMA table_info(articles)')]
+    shards = [row[1] for row in connection.execute('PRAGMA table_info(shards)')]
+    if (columns != [] and columns != fields + ['shard']) or (shards != [] and shards != _shards_columns):
+        connection.executescript('DROP TABLE IF EXISTS articles; DROP TABLE IF EXISTS shards; DROP TABLE IF EXISTS copies;')
+        columns = []
+    connection.executescript("""
+        CREATE TABLE IF NOT EXISTS shards (
+            name TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            rank INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS copies (
+            shard TEXT NOT NULL,
+            id TEXT NOT NULL,
+            PRIMARY KEY (shard, id)
+        ) WITHOUT ROWID;
+        """)
+    if columns == []:
+        types = ', '.join(f"{_quote(x)} {'INTEGER' if x in _integers else 'TEXT'}{' PRIMARY KEY' if x == 'id' else ''}" for x in fields)
+        connection.execute(f'CREATE TABLE articles ({types}, shard TEXT NOT NULL)')
+    return connection
+
+def csv_shard_fields(shards: t.List[pathlib.Path]) -> t.Optional[t.List[str]]:
+    """
+    The columns of the CSV shards (I.E. the `-fields` the nodes were given), from the first one there is
+    """
+    for shard in shards:
+        if shard.exists():
+            with open(shard, 'r', encoding = 'utf-8', newline = '') as fp:
+                return next(csv.reader(fp), None)
+    return None
+
+def load_csv_shards(database: sqlite3.Connection, shards: t.List[pathlib.Path]) -> t.Tuple[int, int]:
+    """
+    Loads the CSV shards into the database, updating it in place.
+    Only the shards that are new or changed since the last load (by size and modified time) are read.
+    When an id is in more than one shard the row from the last one in `shards` is kept, the same as loading them all in order.
+    The rows of the changed shards, and of those no longer listed, are removed first.
+    The ids they had are put back from the other shards that have them, before the changed shards are loaded again.
+    Each step is a single transaction so an interrupted load can just be run again.
+    The indexes are built after the first load, and kept up to date by the later ones.
+
+    Parameters
+    ----------
+    database : sqlite3.Connection
+        The metadata database (see `open_database`)
+    shards : t.List[pathlib.Path]
+        Every CSV shard, in the order they are to be loaded
+
+    Returns
+    -------
+    The number of shards loaded and the number of rows loaded from them
+    """
+    fields = [row[1] for row in database.execute('PRAGMA table_info(articles)')][:-1]
+    known = {row[0]: (row[1], row[2]) for row in database.execute('SELECT name, size, mtime FROM shards')}
+    stats = {shard.name: shard.stat() for shard in shards}
+    changed = [shard for shard in shards if known.get(shard.name) != (stats[shard.name].st_size, stats[shard.name].st_mtime_ns)]
+    removed = known.keys() - stats.keys()
+    dropped = removed | {shard.name for shard in changed if shard.name in known}
+    with database:
+        # A new shard is listed, as never loaded, so its rank is there for the rows it is compared with
+        database.executemany("""
+            INSERT INTO shards (name, size, mtime, rank) VALUES (?, -1, -1, ?)
+            ON CONFLICT (name) DO UPDATE SET rank = excluded.rank
+            """, ((shard.name, rank) for rank, shard in enumerate(shards)))
+    if len(dropped) > 0:
+        with database:
+            _drop_shards(database, fields, dropped, [shard for shard in shards if shard not in changed])
+            database.executemany('DELETE FROM shards WHERE name = ?', ((x,) for x in removed))
+    rows = 0
+    for shard in changed:
+        stat = stats[shard.name]
+        with database, open(shard, 'r', encoding = 'utf-8', newline = '') as fp:
+            reader = csv.reader(fp)
+            header = next(reader, None)
+            if header is not None and header != fields:
+                raise ValueError(f'{shard} has the columns {header}, not {fields}')
+            rows += _insert_rows(database, fields, shard.name, reader)
+            database.execute('UPDATE shards SET size = ?, mtime = ? WHERE name = ?', (stat.st_size, stat.st_mtime_ns, shard.name))
+    for field in [x for x in _indexed if x in fields]:
+        database.execute(f'CREATE INDEX IF NOT EXISTS articles_{field} ON articles ({_quote(field)})')
+    database.execute('CREATE INDEX IF NOT EXISTS articles_shard ON articles (shard)')
+    database.execute('CREATE INDEX IF NOT EXISTS copies_id ON copies (id)')
+    database.execute('PRAGMA optimize')
+    database.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return (len(changed), rows)
+
+def _insert_rows(database: sqlite3.Connection, fields: t.List[str], shard: str, rows: t.Iterable[t.List[str]]) -> int:
+    """
+    Adds the shard's rows, replacing those of the same id from a shard earlier in the load order
+
+    Returns
+    -------
+    The number of rows added or replaced
+    """
+    id = fields.index('id')
+    ids: t.List[str] = []
+    def _rows() -> t.Iterator[t.List[t.Optional[str]]]:
+        for row in rows:
+            if row[id] != '':
+                ids.append(row[id])
+            yield [x if x != '' else None for x in row] + [shard]
+    columns = ', '.join(_quote(x) for x in fields + ['shard'])
+    updates = ', '.join(f'{_quote(x)} = excluded.{_quote(x)}' for x in fields[:id] + fields[id + 1:] + ['shard'])
+    before = database.total_changes
+    database.executemany(f"""
+        INSERT INTO articles ({columns}) VALUES ({', '.join('?' * (len(fields) + 1))})
+        ON CONFLICT (id) DO UPDATE SET {updates}
+        WHERE (SELECT rank FROM shards WHERE name = excluded.shard) >= (SELECT rank FROM shards WHERE name = articles.shard)
+        """, _rows())
+    count = database.total_changes - before
+    database.executemany('INSERT OR IGNORE INTO copies (shard, id) VALUES (?, ?)', ((shard, x) for x in ids))
+    return count
+
+def _drop_shards(database: sqlite3.Connection, fields: t.List[str], names: t.Set[str], remaining: t.List[pathlib.Path]) -> None:
+    """
+    Removes the rows of the named shards, putting back each id they had from the last of the remaining shards that has it
+    """
+    database.execute('CREATE TEMP TABLE dropped (name TEXT PRIMARY KEY) WITHOUT ROWID')
+    database.executemany('INSERT INTO dropped (name) VALUES (?)', ((x,) for x in names))
+    database.execute('CREATE TEMP TABLE lost (id TEXT PRIMARY KEY) WITHOUT ROWID')
+    database.execute('INSERT INTO lost (id) SELECT id FROM articles WHERE shard IN (SELECT name FROM dropped) AND id IS NOT NULL')
+    database.execute('DELETE FROM articles WHERE shard IN (SELECT name FROM dropped)')
+    database.execute('DELETE FROM copies WHERE shard IN (SELECT name FROM dropped)')
+    # The remaining shard each lost id is put back from
+    found: t.Dict[str, t.Set[str]] = {}
+    for shard, id in database.execute("""
+        SELECT shard, id FROM (
+            SELECT c.shard, c.id, ROW_NUMBER() OVER (PARTITION BY c.id ORDER BY s.rank DESC) AS n
+            FROM lost l JOIN copies c ON c.id = l.id JOIN shards s ON s.name = c.shard)
+        WHERE n = 1
+        """):
+        found.setdefault(shard, set()).add(id)
+    database.execute('DROP TABLE temp.lost')
+    database.execute('DROP TABLE temp.dropped')
+    id = fields.index('id')
+    for path in remaining:
+        ids = found.get(path.name)
+        if ids is None:
+            continue
+        with open(path, 'r', encoding = 'utf-8', newline = '') as fp:
+            reader = csv.reader(fp)
+            next(reader, None)
+            _insert_rows(database, fields, path.name, (row for row in reader if row[id] in ids))
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
@@ -0,0 +1,209 @@
+import contextlib
+import hashlib
+import pathlib
+import re
+import sqlite3
+import time
+import typing as t
+from ..dtypes import Article, Stats
+from .catalog_helper import normalize_pmcid
+from .index_helper import get_index
+
+_schema = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+CREATE TABLE IF NOT EXISTS packages (
+    tar_ball TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    rank INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS copies (
+    pmcid TEXT NOT NULL,
+    tar_ball TEXT NOT NULL,
+    member TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS copies_tar_ball ON copies (tar_ball);
+CREATE INDEX IF NOT EXISTS copies_pmcid ON copies (pmcid);
+CREATE TABLE IF NOT EXISTS newest (
+    scope TEXT NOT NULL,
+    pmcid TEXT NOT NULL,
+    tar_ball TEXT NOT NULL,
+    member TEXT NOT NULL,
+    PRIMARY KEY (scope, pmcid)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bodies (
+    hash BLOB PRIMARY KEY,
+    pmcid TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+_date = re.compile(r'\d{4}-\d{2}-\d{2}')
+_space = re.compile(r'\s+')
+
+def open_dedup(path: pathlib.Path) -> sqlite3.Connection:
+    """
+    Opens (creating if needed) the dedup store: every copy of each PMC id, the newest one, and the bodies kept.
+    Each statement commits on its own so the jobs of a run can share the store without waiting on each other.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The SQLite file
+    """
+    connection = sqlite3.connect(path, timeout = 60, isolation_level = None)
+    connection.executescript(_schema)
+    return connection
+
+def package_order(tar_balls: t.Iterable[pathlib.Path]) -> t.List[pathlib.Path]:
+    """
+    The tar balls oldest first, by the date in their name (I.E. oa_comm_xml.incr.2024-01-03.tar.gz) then by name.
+    Those without a date come before those with one.
+    """
+    def _key(path: pathlib.Path) -> t.Tuple[str, str]:
+        match = _date.search(path.name)
+        return ('' if match is None else match.group(0), path.name)
+    return sorted(tar_balls, key = _key)
+
+def plan_dedup(dedup: sqlite3.Connection, tar_balls: t.List[pathlib.Path], scope: pathlib.Path) -> t.Set[str]:
+    """
+    Works out which copy of each PMC id is the newest, using the member names in the tar balls' indexes.
+    The newest copy is the one in the newest tar ball (see `package_order`), or the later one within a tar ball.
+    Only the tar balls that changed since the last plan are indexed again.
+    The plan is kept until `save_dedup_plan` so the output it replaces can be rolled back first.
+
+    Parameters
+    ----------
+    dedup : sqlite3.Connection
+        The dedup store
+    tar_balls : t.List[pathlib.Path]
+        Every tar ball in the source, not just this node's
+    scope : pathlib.Path
+        The folder of the output the plan is for (I.E. the manifest's), each is planned apart
+
+    Returns
+    -------
+    The names of the tar balls whose older copies changed since the last plan, so their output has to be redone
+    """
+    paths = {str(path.resolve()): path for path in tar_balls}
+    with _transaction(dedup):
+        known = {row[0]: (row[1], row[2]) for row in dedup.execute('SELECT tar_ball, size, mtime FROM packages')}
+        for name in known.keys() - paths.keys():
+            dedup.execute('DELETE FROM copies WHERE tar_ball = ?', (name,))
+            dedup.execute('DELETE FROM packages WHERE tar_ball = ?', (name,))
+        for rank, path in enumerate(package_order(tar_balls)):
+            name = str(path.resolve())
+            stat = path.stat()
+            if known.get(name) != (stat.st_size, stat.st_mtime_ns):
+                dedup.execute('DELETE FROM copies WHERE tar_ball = ?', (name,))
+                copies = ((x.pmcid, name, x.name, i) for i, x in enumerate(get_index(path)))
+                dedup.executemany('INSERT INTO copies (pmcid, tar_ball, member, position) VALUES (?, ?, ?, ?)', copies)
+            dedup.execute("""
+                INSERT INTO packages (tar_ball, size, mtime, rank) VALUES (?, ?, ?, ?)
+                ON CONFLICT (tar_ball) DO UPDATE SET size = excluded.size, mtime = excluded.mtime, rank = excluded.rank
+                """, (name, stat.st_size, stat.st_mtime_ns, rank))
+    dedup.executescript("""
+        DROP TABLE IF EXISTS temp.planned;
+        CREATE TEMP TABLE planned (pmcid TEXT PRIMARY KEY, tar_ball TEXT NOT NULL, member TEXT NOT NULL) WITHOUT ROWID;
+        INSERT INTO planned
+        SELECT pmcid, tar_ball, member FROM (
+            SELECT c.pmcid, c.tar_ball, c.member, ROW_NUMBER() OVER (PARTITION BY c.pmcid ORDER BY p.rank DESC, c.position DESC) AS n
+            FROM copies c JOIN packages p ON p.tar_ball = c.tar_ball)
+        WHERE n = 1;
+        """)
+    # A copy the last plan did not know of was written, same as when there was no plan
+    rows = dedup.execute("""
+        SELECT DISTINCT c.tar_ball FROM copies c
+        JOIN planned n ON n.pmcid = c.pmcid
+        LEFT JOIN newest o ON o.scope = ? AND o.pmcid = c.pmcid
+        WHERE (o.pmcid IS NOT NULL AND (o.tar_ball != c.tar_ball OR o.member != c.member)) != (n.tar_ball != c.tar_ball OR n.member != c.member)
+        """, (_scope(scope),))
+    return {paths[row[0]].name for row in rows}
+
+def save_dedup_plan(dedup: sqlite3.Connection, scope: pathlib.Path) -> int:
+    """
+    Keeps the plan from `plan_dedup`, once the output it replaces is rolled back, so `dedup_skip` can use it
+
+    Returns
+    -------
+    The number of older copies that will be skipped
+    """
+    with _transaction(dedup):
+        dedup.execute('DELETE FROM newest WHERE scope = ?', (_scope(scope),))
+        dedup.execute('INSERT INTO newest (scope, pmcid, tar_ball, member) SELECT ?, pmcid, tar_ball, member FROM planned', (_scope(scope),))
+    return dedup.execute('SELECT COUNT(*) FROM copies').fetchone()[0] - dedup.execute('SELECT COUNT(*) FROM planned').fetchone()[0]
+
+def dedup_skip(path: pathlib.Path, tar_ball: pathlib.Path, scope: pathlib.Path) -> t.Set[str]:
+    """
+    The member names of the tar ball's older copies, to pass over without reading them
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The dedup store
+    tar_ball : pathlib.Path
+        The tar ball
+    scope : pathlib.Path
+        The folder of the output, as given to `save_dedup_plan`
+    """
+    with contextlib.closing(open_dedup(path)) as dedup:
+        rows = dedup.execute("""
+            SELECT c.member FROM copies c JOIN newest n ON n.scope = ? AND n.pmcid = c.pmcid
+            WHERE c.tar_ball = ? AND (n.tar_ball != c.tar_ball OR n.member != c.member)
+            """, (_scope(scope), str(tar_ball.resolve())))
+        return {row[0] for row in rows}
+
+def body_digest(body: t.Union[str, t.List[str]]) -> bytes:
+    """
+    A hash of the body that ignores case and white space, so copies that were only reformatted match
+    """
+    text = ' '.join(body) if isinstance(body, list) else body
+    return hashlib.blake2b(_space.sub(' ', text.casefold()).strip().encode('utf-8'), digest_size = 16).digest()
+
+def drop_duplicate_bodies(articles: t.Iterator[Article], path: pathlib.Path, stats: t.Optional[Stats] = None) -> t.Iterator[Article]:
+    """
+    Drops the articles whose body is the same as one already kept under another PMC id.
+    The first PMC id to claim a body keeps it, across runs and jobs. The same PMC id always keeps its own body.
+    Articles without an id or a body are passed on.
+
+    Parameters
+    ----------
+    articles : t.Iterator[Article]
+        The articles
+    path : pathlib.Path
+        The dedup store
+    stats : Stats
+        Counts the `duplicates` and the `seconds.dedup` spent on the lookups
+    """
+    if stats is None:
+        stats = Stats()
+    with contextlib.closing(open_dedup(path)) as dedup:
+        for article in articles:
+            id = article.get('id')
+            body = article.get('body')
+            if id is None or body is None:
+                yield article
+                continue
+            start = time.perf_counter()
+            pmcid = normalize_pmcid(str(id))
+            digest = body_digest(body) # type: ignore
+            dedup.execute('INSERT OR IGNORE INTO bodies (hash, pmcid) VALUES (?, ?)', (digest, pmcid))
+            owner = dedup.execute('SELECT pmcid FROM bodies WHERE hash = ?', (digest,)).fetchone()[0]
+            stats.add('seconds.dedup', time.perf_counter() - start)
+            if owner != pmcid:
+                stats.add('duplicates')
+                continue
+            yield article
+
+def _scope(scope: pathlib.Path) -> str:
+    return str(scope.resolve())
+
+@contextlib.contextmanager
+def _transaction(dedup: sqlite3.Connection) -> t.Iterator[None]:
+    dedup.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        dedup.execute('ROLLBACK')
+        raise
+    dedup.execute('COMMIT')
@@ -1,73 +1,152 @@
+import functools
 import typing as t
+from ..dtypes import Extractor
 from lxml import etree # type: ignore
 
 _translate = str.maketrans({'“':'"', '”':'"', "‘":"'", "’":"'", "`":"'"})
 
+# The XPath expressions are compiled once per process instead of on every call.
+# Text only expressions skip lxml's "smart strings" as we never need the parent back.
+_xp_id = etree.XPath("./front/article-meta/article-id[@pub-id-type='pmc']")
+_xp_journal = etree.XPath("./front/journal-meta//journal-title")
+_xp_volume = etree.XPath("./front/article-meta/volume")
+_xp_issue = etree.XPath("./front/article-meta/issue")
+_xp_category = etree.XPath("./front/article-meta/article-categories//subject")
+_xp_doi = etree.XPath("./front/article-meta/article-id[@pub-id-type='doi']")
+_xp_year = etree.XPath("./front/article-meta/pub-date/year/text()", smart_strings = False)
+_xp_issn = etree.XPath("./front/journal-meta/issn")
+_xp_authors = etree.XPath("./front/article-meta/contrib-group/contrib/name")
+_xp_title = etree.XPath("./front/article-meta/title-group/article-title//text()", smart_strings = False)
+_xp_abstract = [etree.XPath("./front/article-meta/abstract//p"), etree.XPath("./front/article-meta/trans-abstract//p")]
+_xp_body = [etree.XPath("./body//sec/p"), etree.XPath("./body/p")]
+_xp_references = etree.XPath("count(./back/ref-list/ref)")
+_xp_given_names = etree.XPath("./given-names/text()", smart_strings = False)
+_xp_surname = etree.XPath("./surname/text()", smart_strings = False)
+_xp_text = etree.XPath(".//text()", smart_strings = False)
+
 def extract_id(root: etree.Element) -> t.Optional[str]:
-    xpath = "./front/article-meta/article-id[@pub-id-type='pmc']"
-    value = _nct(root.find(xpath))
+    value = _nct(_first(_xp_id(root)))
     return value
 
 def extract_journal(root: etree.Element) -> t.Optional[str]:
-    xpath = "./front/journal-meta//journal-title"
-    value = _nct(root.find(xpath))
+    value = _nct(_first(_xp_journal(root)))
     return value
 
 def extract_volume(root: etree.Element) -> t.Optional[str]:
-    xpath = "./front/article-meta/volume"
-    value = _nct(root.find(xpath))
+    value = _nct(_first(_xp_volume(root)))
     return value
 
 def extract_issue(root: etree.Element) -> t.Optional[str]:
-    xpath = "./front/article-meta/issue"
-    value = _nct(root.find(xpath))
+    value = _nct(_first(_xp_issue(root)))
     return value
 
 def extract_category(root: etree.Element) -> t.Optional[str]:
-    xpath = "./front/article-meta/article-categories//subject"
-    value = _ncs(';'.join([x for x in map(_nct, root.xpath(xpath)) if x is not None]))
+    value = _ncs(';'.join([x for x in map(_nct, _xp_category(root)) if x is not None]))
     return value
 
 def extract_doi(root: etree.Element) -> t.Optional[str]:
-    xpath = "./front/article-meta/article-id[@pub-id-type='doi']"
-    value = _ncs(';'.join(map(_nct, root.xpath(xpath))))
+    value = _ncs(';'.join(map(_nct, _xp_doi(root))))
     return value
 
 def extract_year(root: etree.Element) -> t.Optional[int]:
-    xpath = "./front/article-meta/pub-date/year/text()"
-    value = min(map(lambda year: int(year) , root.xpath(xpath)))
+    value = min(map(lambda year: int(year) , _xp_year(root)))
     return value
 
 def extract_issn(root: etree.Element) -> t.Optional[str]:
-    xpath = './front/journal-meta/issn'
-    value = _ncs(';'.join([x for x in map(_nct, root.xpath(xpath)) if x is not None]))
+    value = _ncs(';'.join([x for x in map(_nct, _xp_issn(root)) if x is not None]))
     return value
 
 def extract_authors(root: etree.Element) -> t.Optional[str]:
-    xpath = "./front/article-meta/contrib-group/contrib/name"
-    value = _ncs(';'.join(map(_extract_author_name, root.xpath(xpath))))
+    value = _ncs(';'.join(map(_extract_author_name, _xp_authors(root))))
     return value
 
 def extract_title(root: etree.Element) -> t.Optional[str]:
-    xpath = "./front/article-meta/title-group/article-title//text()"
-    value = _ncs(' '.join(''.join(root.xpath(xpath)).split()))
+    value = _ncs(' '.join(''.join(_xp_title(root)).split()))
     return value
 
 def extract_abstract(root: etree.Element) -> t.Optional[t.List[str]]:
-    xpaths = ["./front/article-meta/abstract//p", "./front/article-meta/trans-abstract//p"]
-    value = _ncls(_extract_paragraphs(root, xpaths))
+    value = _ncls(_extract_paragraphs(root, _xp_abstract))
     return value
 
 def extract_body(root: etree.Element) -> t.Optional[t.List[str]]:
-    xpaths = ["./body//sec/p", "./body/p"]
-    value = _ncls(_extract_paragraphs(root, xpaths))
+    value = _ncls(_extract_paragraphs(root, _xp_body))
     return value
 
 def extract_references(root: etree.Element) -> t.Optional[int]:
-    xpath = "./back/ref-list/ref"
-    value = len(root.findall(xpath))
+    value = int(_xp_references(root))
     return value
 
+# Every named extractor along with the top level section of the JATS file (front, body or back) it reads
+_registry: t.List[t.Tuple[str, Extractor, str]] = [
+    ('id', extract_id, 'front'),
+    ('journal', extract_journal, 'front'),
+    ('volume', extract_volume, 'front'),
+    ('issue', extract_issue, 'front'),
+    ('year', extract_year, 'front'),
+    ('category', extract_category, 'front'),
+    ('doi', extract_doi, 'front'),
+    ('issn', extract_issn, 'front'),
+    ('authors', extract_authors, 'front'),
+    ('title', extract_title, 'front'),
+    ('abstract', extract_abstract, 'front'),
+    ('body', extract_body, 'body'),
+    ('references', extract_references, 'back')]
+extractors: t.Dict[str, Extractor] = {name: extractor for name, extractor, _ in _registry}
+_sections: t.Dict[Extractor, str] = {extractor: section for _, extractor, section in _registry}
+_all_sections = frozenset(['front', 'body', 'back'])
+
+def select_extractors(names: t.List[str]) -> t.Dict[str, Extractor]:
+    """
+    The named extractors, in the given order
+
+    Parameters
+    ----------
+    names : t.List[str]
+        The field names, from `extractors`
+    """
+    unknown = [name for name in names if name not in extractors]
+    if len(unknown) > 0:
+        raise ValueError(f"{', '.join(unknown)} are not known fields")
+    return {name: extractors[name] for name in names}
+
+def optional_extractor(extractor: Extractor) -> Extractor:
+    """
+    The extractor, giving None instead of an error when the field is missing.
+    For a field that is nice to have, so a document without it still processes.
+
+    Parameters
+    ----------
+    extractor : Extractor
+        The extractor, from `extractors`
+    """
+    return functools.partial(_or_none, extractor)
+
+def _or_none(extractor: Extractor, root: etree.Element) -> t.Optional[t.Union[int, str, t.List[str]]]:
+    try:
+        return extractor(root)
+    except Exception:
+        return None
+
+def needed_sections(fields: t.Dict[str, Extractor]) -> t.FrozenSet[str]:
+    """
+    The top level sections of the JATS file the extractors read.
+    An extractor that is not in the registry is assumed to read everything.
+    """
+    sections: t.Set[str] = set()
+    for extractor in fields.values():
+        if isinstance(extractor, functools.partial) and extractor.func is _or_none:
+            extractor = extractor.args[0]
+        if extractor not in _sections:
+            return _all_sections
+        sections.add(_sections[extractor])
+    return frozenset(sections)
+
+def _first(nodes: t.List[etree.Element]) -> t.Optional[etree.Element]:
+    """
+    The first node found, mirrors etree.Element.find
+    """
+    return nodes[0] if len(nodes) > 0 else None
+
 def _nct(obj: etree.Element) -> t.Optional[str]:
     """
     Simple null-conditional macro
@@ -107,14 +186,14 @@ def _extract_author_name(node: etree.Element) -> str:
     """
     gets the author name in the expected format
     """
-    given = node.xpath("./given-names/text()")
-    sur = node.xpath("./surname/text()")
+    given = _xp_given_names(node)
+    sur = _xp_surname(node)
     given = next(iter(given or []), '')
     sur = next(iter(sur or []), '')
     full = '{given} {sur}'.format(given = given, sur = sur).strip()    
     return full if len(full) > 3 else '???'
 
-def _extract_paragraphs(root: etree.Element, xpaths: t.List[str]) -> t.List[str]:
+def _extract_paragraphs(root: etree.Element, xpaths: t.List[etree.XPath]) -> t.List[str]:
     """
     Extracts paragraphs for the given xpath
 
@@ -122,11 +201,11 @@ def _extract_paragraphs(root: etree.Element, xpaths: t.List[str]) -> t.List[str]
     ----------
     root: etree.Element
         The document root
-    xpaths: list[str]
-        The list of possible locations
+    xpaths: list[etree.XPath]
+        The list of possible locations, compiled
     """
     for xpath in xpaths:
-        result = [x for x in map(lambda node: ''.join(node.xpath(".//text()")), root.xpath(xpath))]
+        result = [''.join(_xp_text(node)) for node in xpath(root)]
         if len(result) > 0:
             return result
     return []
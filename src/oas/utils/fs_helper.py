@@ -1,8 +1,17 @@
+import bz2
+import contextlib
+import gzip
+import io
+import lzma
 import pathlib
+import queue
+import re
 import tarfile as tf
+import threading
+import time
 import typing as t
-import uuid
-from ..dtypes import ProcessError
+from ..dtypes import Document, NamedDocument, Stats, TarMember
+from .index_helper import get_index, is_pmc_member, list_indexed_documents, pmc_id, split_index
 
 def list_folder_tar_balls(folder_in: pathlib.Path) -> t.Iterator[pathlib.Path]:
     """
@@ -16,7 +25,7 @@ def list_folder_tar_balls(folder_in: pathlib.Path) -> t.Iterator[pathlib.Path]:
     def _is_tar_ball(file_path: pathlib.Path) -> bool:
         result = \
             file_path.is_file() and \
-            file_path.suffix.lower() == '.tar' and \
+            file_path.name.lower().endswith(('.tar', '.tar.gz', '.tgz')) and \
             not file_path.stem.startswith('_')
         return result
     for file_name in folder_in.iterdir():
@@ -24,43 +33,234 @@ def list_folder_tar_balls(folder_in: pathlib.Path) -> t.Iterator[pathlib.Path]:
             if _is_tar_ball(file_name):
                 yield file_name
 
-def list_documents(tarball: pathlib.Path) -> t.Iterator[str]:
+def tar_ball_stem(tar_ball: pathlib.Path) -> str:
     """
-    Lists all the documents in the tar ball
+    The tar ball's file name without the .tar, .tar.gz or .tgz extension
+
+    Parameters
+    ----------
+    tar_ball : pathlib.Path
+        The tar ball
+    """
+    name = tar_ball.name
+    for suffix in ['.tar', '.tar.gz', '.tgz']:
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return tar_ball.stem
+
+def is_compressed(tar_ball: pathlib.Path) -> bool:
+    """
+    Checks if the tar ball is gzip'ed and so can only be read front to back
+    """
+    return tar_ball.name.lower().endswith(('.tar.gz', '.tgz'))
+
+def list_documents(tarball: pathlib.Path, stream_size: t.Optional[int] = None, part: int = 0, parts: int = 1, pmcids: t.Optional[t.Set[str]] = None, stats: t.Optional[Stats] = None, skip: t.Optional[t.Set[str]] = None, members: t.Optional[t.Sequence[TarMember]] = None) -> t.Iterator[NamedDocument]:
+    """
+    Lists all the documents in the tar ball as raw bytes, along with their member names
 
     Parameters
     ----------
     tarball : pathlib.Path
         The the tar ball
+    stream_size : int
+        Documents larger than this many bytes are returned as a stream instead of being read into memory.
+        The stream is only valid until the next document is requested.
+        None means always read the document.
+    part : int
+        Which of the `parts` byte ranges of the tar ball to list
+    parts : int
+        The number of byte ranges the tar ball is split into.
+        More than 1 uses the tar ball's index to seek straight to the range.
+    pmcids : t.Set[str]
+        Only list the documents whose member name is one of these PMC ids (I.E. PMC1234567).
+        The other documents are skipped without being read.
+    stats : Stats
+        Counts the `documents`, their `document_bytes`, the `source_bytes` of the tar ball passed over (compressed bytes for a .tar.gz)
+        and the `seconds.read` spent reading.
+        Along with the documents `skipped`.
+    skip : t.Set[str]
+        The member names to pass over without reading (I.E. the quarantined documents)
+    members : t.Sequence[TarMember]
+        The part's index entries when split (see `index_tar_parts`).
+        None gets the tar ball's index and splits it here.
     """
-    def _is_pmc_file(info: tf.TarInfo) -> bool:
-        if info.isfile():
-            name = info.name.upper()
-            return name.startswith('PMC') and name.endswith('.XML')
-        return False
-    with tf.open(tarball, 'r') as tar_ball:
+    if stats is None:
+        stats = Stats()
+    if skip is not None and len(skip) == 0:
+        skip = None
+    if parts > 1:
+        if members is None:
+            members = split_index(get_index(tarball), parts)[part]
+        if pmcids is not None:
+            members = [member for member in members if member.pmcid in pmcids]
+        if skip is not None:
+            stats.add('skipped', sum(1 for member in members if member.name in skip))
+            members = [member for member in members if member.name not in skip]
+        yield from list_indexed_documents(tarball, members, stream_size, stats)
+        return
+    with _open_tar_ball(tarball, stats) as (tar_ball, position):
+        read = 0
+        start = time.perf_counter()
         tar_info = tar_ball.next()
         while tar_info is not None:
-            if _is_pmc_file(tar_info):
+            if skip is not None and tar_info.name in skip:
+                stats.add('skipped')
+            elif is_pmc_member(tar_info) and (pmcids is None or pmc_id(tar_info.name) in pmcids):
                 tar_file = tar_ball.extractfile(tar_info)
                 if tar_file is not None:
-                    stream = tar_file.read()
-                    document = stream.decode('utf-8')
-                    yield document
+                    if stream_size is not None and tar_info.size > stream_size:
+                        document: Document = tar_file
+                    else:
+                        document = tar_file.read()
+                    done = position()
+                    stats.add('documents')
+                    stats.add('document_bytes', tar_info.size)
+                    stats.add('source_bytes', done - read)
+                    stats.add('seconds.read', time.perf_counter() - start)
+                    read = done
+                    yield NamedDocument(tar_info.name, document)
+                    start = time.perf_counter()
             tar_info = tar_ball.next()
+    # The end of archive blocks, and any compressed trailer, count as passed over once the listing is done
+    stats.add('source_bytes', tarball.stat().st_size - read)
+
+def output_extension(compression: t.Optional[str]) -> str:
+    """
+    The file extension added for the compression (I.E. gzip -> .gz), if any
+    """
+    return '' if compression is None else _compressions[compression][0]
+
+def open_output(path: pathlib.Path, compression: t.Optional[str] = None, level: t.Optional[int] = None) -> t.BinaryIO:
+    """
+    Opens an output file for writing bytes, through a large buffer
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The file
+    compression : str
+        gzip, bz2 or xz. None means no compression
+    level : int
+        The compression level. None means the compression's default (gzip 6, bz2 9, xz 6)
+    """
+    if compression is None:
+        return open(path, 'wb', buffering = _output_buffer)
+    _, default, opener = _compressions[compression]
+    return io.BufferedWriter(opener(path, level if level is not None else default), _output_buffer) # type: ignore
 
-def write_log(log: pathlib.Path, error: ProcessError) -> None:
+_output_buffer = 1024 * 1024
+# The extension, default level and opener for each compression
+_compressions: t.Dict[str, t.Tuple[str, int, t.Callable[[pathlib.Path, int], io.BufferedIOBase]]] = {
+    'gzip': ('.gz', 6, lambda path, level: gzip.GzipFile(path, 'wb', compresslevel = level, mtime = 0)),
+    'bz2': ('.bz2', 9, lambda path, level: bz2.BZ2File(path, 'wb', compresslevel = level)),
+    'xz': ('.xz', 6, lambda path, level: lzma.LZMAFile(path, 'wb', preset = level)) }
+compressions = [x for x in _compressions.keys()]
+
+def list_pattern_files(folder: pathlib.Path, pattern: str) -> t.Iterator[pathlib.Path]:
     """
-    Writes out a message as a single file
+    Lists the files in the folder that match a file name pattern
 
     Parameters
     ----------
-    log : pathlib.Path
-        The folder of raw messages
-    error : ProcessError
-        The error itself
-    """
-    issue = ''.join([tok.capitalize() for tok in error.issues[0].split(' ')])
-    path = log.joinpath(f'PMC.{issue}.{uuid.uuid4()}.xml')
-    with open(path, 'w', encoding = 'utf-8', newline = '') as fp:
-        fp.write(error.document)
+    folder : pathlib.Path
+        The folder to search
+    pattern : str
+        The file name pattern where `{id}` (with any format spec) is an increasing number
+    """
+    parts = re.split(r'\{id[^}]*\}', pattern)
+    regex = re.compile(r'\d+'.join(re.escape(part) for part in parts))
+    for file_name in folder.iterdir():
+        if file_name.is_file() and regex.fullmatch(file_name.name):
+            yield file_name
+
+@contextlib.contextmanager
+def _open_tar_ball(tarball: pathlib.Path, stats: Stats) -> t.Iterator[t.Tuple[tf.TarFile, t.Callable[[], int]]]:
+    """
+    Opens the tar ball for reading, along with how many bytes of the file have been read.
+    A .tar.gz is read as a stream (r|) with the inflating done on a background thread.
+    """
+    if is_compressed(tarball):
+        reader = _InflateReader(tarball, stats)
+        with io.BufferedReader(reader, 1024 * 1024) as inflated:
+            with tf.open(fileobj = inflated, mode = 'r|') as tar_ball:
+                yield (tar_ball, lambda: reader.position)
+    else:
+        with tf.open(tarball, 'r') as tar_ball:
+            yield (tar_ball, lambda: tar_ball.offset)
+
+class _InflateReader(io.RawIOBase):
+    """
+    Reads a .gz file, inflating it on a background thread.
+    The inflated chunks are passed through a bounded queue so inflating overlaps with parsing without using unbounded memory.
+    """
+
+    def __init__(self, path: pathlib.Path, stats: t.Optional[Stats] = None, chunk_size: int = 1024 * 1024, depth: int = 16):
+        self._path = path
+        self._stats = Stats() if stats is None else stats
+        self._position = 0
+        self._chunk_size = chunk_size
+        self._queue: queue.Queue = queue.Queue(maxsize = depth)
+        self._stop = threading.Event()
+        self._chunk = memoryview(b'')
+        self._eof = False
+        self._thread = threading.Thread(target = self._inflate, name = f'inflate {path.name}', daemon = True)
+        self._thread.start()
+
+    @property
+    def position(self) -> int:
+        """
+        The number of compressed bytes inflated so far
+        """
+        return self._position
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while len(self._chunk) == 0:
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if item is None:
+                self._eof = True
+            elif isinstance(item, BaseException):
+                self._eof = True
+                raise item
+            else:
+                self._chunk = memoryview(item)
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stop.set()
+            while self._thread.is_alive():
+                try:
+                    self._queue.get(timeout = 0.1)
+                except queue.Empty:
+                    pass
+        super().close()
+
+    def _inflate(self) -> None:
+        def _put(item: t.Any) -> bool:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout = 0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        try:
+            with open(self._path, 'rb') as raw, gzip.GzipFile(fileobj = raw, mode = 'rb') as fp:
+                while True:
+                    start = time.perf_counter()
+                    chunk = fp.read(self._chunk_size)
+                    self._position = raw.tell()
+                    self._stats.add('seconds.inflate', time.perf_counter() - start)
+                    if len(chunk) == 0 or not _put(chunk):
+                        break
+            _put(None)
+        except BaseException as exception:
+            _put(exception)
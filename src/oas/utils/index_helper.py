@@ -0,0 +1,195 @@
+import os
+import pathlib
+import tarfile as tf
+import tempfile
+import time
+import typing as t
+from ..dtypes import Document, NamedDocument, Stats, TarMember
+
+_magic = '#oas-index'
+_version = '1'
+
+def is_pmc_member(info: tf.TarInfo) -> bool:
+    """
+    Checks if the tar ball member is a PMC JATS file
+    """
+    if info.isfile():
+        name = info.name.upper()
+        return name.startswith('PMC') and name.endswith('.XML')
+    return False
+
+def index_path(tar_ball: pathlib.Path) -> pathlib.Path:
+    """
+    The sidecar index file for the tar ball (I.E. {tar_ball}.idx)
+    """
+    return tar_ball.with_name(f'{tar_ball.name}.idx')
+
+def get_index(tar_ball: pathlib.Path) -> t.List[TarMember]:
+    """
+    Gets the member index for the tar ball.
+    The sidecar is reused when the tar ball's size and modified time have not changed, otherwise it is rebuilt.
+
+    Parameters
+    ----------
+    tar_ball : pathlib.Path
+        The tar ball. A .tar.gz can be listed but its offsets are into the inflated data, so can not be read from
+    """
+    members = load_index(tar_ball)
+    if members is None:
+        members = build_index(tar_ball)
+    return members
+
+def load_index(tar_ball: pathlib.Path) -> t.Optional[t.List[TarMember]]:
+    """
+    Loads the sidecar index for the tar ball if it is still current
+    """
+    path = index_path(tar_ball)
+    if not path.exists():
+        return None
+    stat = tar_ball.stat()
+    with open(path, 'r', encoding = 'utf-8') as fp:
+        header = fp.readline().rstrip('\n').split('\t')
+        if header != [_magic, _version, str(stat.st_size), str(stat.st_mtime_ns)]:
+            return None
+        members: t.List[TarMember] = []
+        for line in fp:
+            name, pmcid, offset, size = line.rstrip('\n').split('\t')
+            members.append(TarMember(name, pmcid, int(offset), int(size)))
+        return members
+
+def build_index(tar_ball: pathlib.Path) -> t.List[TarMember]:
+    """
+    Scans the tar ball's headers and writes the sidecar index.
+    Only the headers are read, the data is skipped over.
+    If the sidecar can not be written (I.E. a read only folder) the index is still returned.
+
+    Parameters
+    ----------
+    tar_ball : pathlib.Path
+        The tar ball. A .tar.gz is inflated to reach its headers
+    """
+    stat = tar_ball.stat()
+    members: t.List[TarMember] = []
+    with tf.open(tar_ball, 'r:*') as tar:
+        info = tar.next()
+        while info is not None:
+            if is_pmc_member(info):
+                members.append(TarMember(info.name, pmc_id(info.name), info.offset_data, info.size))
+            info = tar.next()
+    path = index_path(tar_ball)
+    try:
+        # A temp file of its own, so processes indexing the same tar ball never write over each other's
+        handle, temp = tempfile.mkstemp(prefix = f'{path.name}.', suffix = '.tmp', dir = path.parent)
+        try:
+            with open(handle, 'w', encoding = 'utf-8', newline = '\n') as fp:
+                fp.write(f'{_magic}\t{_version}\t{stat.st_size}\t{stat.st_mtime_ns}\n')
+                fp.writelines(f'{x.name}\t{x.pmcid}\t{x.offset}\t{x.size}\n' for x in members)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+    except OSError as error:
+        print(f'Warning: could not save {path}: {error}')
+    return members
+
+def pmc_id(name: str) -> str:
+    """
+    The PMC id from a member's name (I.E. PMC001xxxxxx/PMC1234567.xml -> PMC1234567)
+    """
+    return pathlib.PurePosixPath(name).stem.upper()
+
+def split_index(members: t.List[TarMember], parts: int) -> t.List[t.List[TarMember]]:
+    """
+    Splits the members into contiguous ranges of about the same number of bytes
+
+    Parameters
+    ----------
+    members : t.List[TarMember]
+        The members in tar ball order
+    parts : int
+        The number of ranges
+    """
+    total = sum(member.size for member in members)
+    result: t.List[t.List[TarMember]] = [[] for _ in range(parts)]
+    seen = 0
+    for member in members:
+        # Place by the member's midpoint so each range gets ~total/parts bytes
+        i = min(parts - 1, ((seen + member.size // 2) * parts) // max(total, 1))
+        result[i].append(member)
+        seen += member.size
+    return result
+
+def list_indexed_documents(tarball: pathlib.Path, members: t.Sequence[TarMember], stream_size: t.Optional[int], stats: t.Optional[Stats] = None) -> t.Iterator[NamedDocument]:
+    """
+    Lists the given documents, along with their member names, by reading straight from their offsets
+
+    Parameters
+    ----------
+    tarball : pathlib.Path
+        The (uncompressed) tar ball
+    members : t.Sequence[TarMember]
+        The members' index entries
+    stream_size : int
+        Documents larger than this many bytes are returned as a stream instead of being read into memory
+    stats : Stats
+        Counts the same as `list_documents`.
+        The `source_bytes` of each document are its blocks in the tar ball, header included (see `member_blocks`).
+    """
+    if stats is None:
+        stats = Stats()
+    with tf.open(tarball, 'r:') as tar_ball:
+        fd = tar_ball.fileobj.fileno() # type: ignore
+        for member in members:
+            start = time.perf_counter()
+            if stream_size is not None and member.size > stream_size:
+                tar_info = tf.TarInfo(member.name)
+                tar_info.size = member.size
+                tar_info.offset_data = member.offset
+                document: Document = tar_ball.extractfile(tar_info) # type: ignore
+            else:
+                document = _pread(fd, member.size, member.offset)
+            stats.add('documents')
+            stats.add('document_bytes', member.size)
+            stats.add('source_bytes', member_blocks(member))
+            stats.add('seconds.read', time.perf_counter() - start)
+            yield NamedDocument(member.name, document)
+
+def member_blocks(member: TarMember) -> int:
+    """
+    The bytes the member takes up in the tar ball, I.E. its header plus its data padded to whole blocks
+    """
+    return tf.BLOCKSIZE + -(-member.size // tf.BLOCKSIZE) * tf.BLOCKSIZE
+
+def read_member(tar_ball: pathlib.Path, member: TarMember) -> bytes:
+    """
+    Reads a single member straight from its offset without scanning the tar ball
+
+    Parameters
+    ----------
+    tar_ball : pathlib.Path
+        The (uncompressed) tar ball
+    member : TarMember
+        The member's index entry
+    """
+    fd = os.open(tar_ball, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        return _pread(fd, member.size, member.offset)
+    finally:
+        os.close(fd)
+
+def _pread(fd: int, size: int, offset: int) -> bytes:
+    """
+    os.pread where available (not Windows), otherwise seek then read
+    """
+    if hasattr(os, 'pread'):
+        chunks: t.List[bytes] = []
+        while size > 0:
+            chunk = os.pread(fd, size, offset)
+            if len(chunk) == 0:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+            offset += len(chunk)
+        return b''.join(chunks)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
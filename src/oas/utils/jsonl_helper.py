@@ -0,0 +1,121 @@
+import array
+import bisect
+import json
+import mmap
+import pathlib
+import struct
+import sys
+import typing as t
+
+_magic = b'OASJIDX1'
+# The magic then the number of articles, followed by one more offset than there are articles
+_header = struct.Struct('<8sQ')
+
+def jsonl_index_path(path: pathlib.Path) -> pathlib.Path:
+    """
+    The offsets index for the JSONL file (I.E. {path}.idx)
+    """
+    return path.with_name(f'{path.name}.idx')
+
+def write_jsonl_index(path: pathlib.Path, offsets: t.List[int]) -> None:
+    """
+    Writes the byte offset where each line of the JSONL file starts, then where the last one ends.
+    The offsets are little endian unsigned 64 bit ints after a 16 byte header, so article `k` is at `16 + 8k`.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The JSONL file
+    offsets : t.List[int]
+        The offsets, starting at 0
+    """
+    values = array.array('Q', offsets)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    with open(jsonl_index_path(path), 'wb') as fp:
+        fp.write(_header.pack(_magic, len(offsets) - 1))
+        fp.write(values.tobytes())
+
+def read_jsonl_index(path: pathlib.Path) -> array.array:
+    """
+    Reads the offsets written by `write_jsonl_index`
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The JSONL file
+    """
+    with open(jsonl_index_path(path), 'rb') as fp:
+        magic, count = _header.unpack(fp.read(_header.size))
+        if magic != _magic:
+            raise ValueError(f'{jsonl_index_path(path)} is not a JSONL index')
+        values = array.array('Q')
+        values.frombytes(fp.read(8 * (count + 1)))
+    if len(values) != count + 1:
+        raise ValueError(f'{jsonl_index_path(path)} is cut short')
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+class JsonlReader:
+
+    def __init__(self, folder: pathlib.Path, pattern: str = '*.jsonl'):
+        """
+        Reads the articles written by `convert -format jsonl` in any order.
+        The files in the folder are taken in name order as one sequence, so `reader[k]` is the k-th article across all of them.
+        Only the indexes are read up front. Each JSONL file is memory mapped the first time one of its articles is read.
+
+        Parameters
+        ----------
+        folder : pathlib.Path
+            The folder of JSONL files, each with its `.idx`
+        pattern : str
+            The glob of the JSONL file names
+        """
+        self._paths = sorted(folder.glob(pattern))
+        self._offsets = [read_jsonl_index(path) for path in self._paths]
+        # The number of articles before each file, then the total
+        self._starts = [0]
+        for offsets in self._offsets:
+            self._starts.append(self._starts[-1] + len(offsets) - 1)
+        self._maps: t.Dict[int, mmap.mmap] = {}
+
+    @property
+    def paths(self) -> t.List[pathlib.Path]:
+        return self._paths
+
+    def __len__(self) -> int:
+        return self._starts[-1]
+
+    def __getitem__(self, k: int) -> t.Dict[str, t.Any]:
+        """
+        The k-th article, with the `abstract` and `body` as lists of paragraphs of sentences
+        """
+        if k < 0:
+            k += len(self)
+        if k < 0 or k >= len(self):
+            raise IndexError(f'{k} is out of range')
+        i = bisect.bisect_right(self._starts, k) - 1
+        j = k - self._starts[i]
+        data = self._maps.get(i)
+        if data is None:
+            with open(self._paths[i], 'rb') as fp:
+                data = mmap.mmap(fp.fileno(), 0, access = mmap.ACCESS_READ)
+            self._maps[i] = data
+        offsets = self._offsets[i]
+        return json.loads(data[offsets[j]:offsets[j + 1]])
+
+    def __iter__(self) -> t.Iterator[t.Dict[str, t.Any]]:
+        for k in range(len(self)):
+            yield self[k]
+
+    def close(self) -> None:
+        for data in self._maps.values():
+            data.close()
+        self._maps.clear()
+
+    def __enter__(self) -> 'JsonlReader':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
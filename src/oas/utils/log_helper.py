@@ -0,0 +1,156 @@
+import collections
+import io
+import json
+import pathlib
+import queue
+import tarfile as tf
+import threading
+import time
+import typing as t
+from ..dtypes import ProcessError
+from .index_helper import pmc_id
+
+class ErrorLog:
+
+    def __init__(self, folder: t.Optional[pathlib.Path], name: str, tar_ball: t.Optional[pathlib.Path] = None, queue_size: int = 256):
+        """
+        Collects the documents that did not process into a single archive, `{folder}/{name}.errors.tar`.
+        Each document is a member of the archive under its original member name.
+        The issues, PMC id and source tar ball are recorded as JSON in each member's PAX `comment` header.
+        Tools ignore that header so `tar -xf` still gives back the raw JATS files.
+        The archive is written on a background thread, through a bounded queue, so a burst of failures never blocks extraction on file creates.
+        It is only created when there is a failure.
+
+        Parameters
+        ----------
+        folder : pathlib.Path
+            The folder for the archive.
+            None means the issues are printed instead.
+        name : str
+            The archive's name, without the `.errors.tar`
+        tar_ball : pathlib.Path
+            The tar ball the documents came from
+        queue_size : int
+            The number of failures waiting to be written before `write` blocks
+        """
+        self._path = None if folder is None else error_log_path(folder, name)
+        self._tar_ball = tar_ball
+        self._queue: queue.Queue = queue.Queue(queue_size)
+        self._thread: t.Optional[threading.Thread] = None
+        self._failure: t.Optional[BaseException] = None
+        self._errors = 0
+        self._issues: t.Counter[str] = collections.Counter()
+
+    @property
+    def path(self) -> t.Optional[pathlib.Path]:
+        return self._path
+    @property
+    def errors(self) -> int:
+        """
+        The number of documents that did not process
+        """
+        return self._errors
+    @property
+    def issues(self) -> t.Dict[str, int]:
+        """
+        The number of documents that did not process for each issue
+        """
+        return dict(self._issues)
+
+    def write(self, error: ProcessError) -> None:
+        """
+        Counts the error then queues it to be written
+        """
+        self._errors += 1
+        self._issues.update(error.issues)
+        if self._path is None:
+            print(f"Error: {','.join(error.issues)}")
+            return
+        if self._failure is not None:
+            raise self._failure
+        if self._thread is None:
+            self._thread = threading.Thread(target = self._write_archive, daemon = True)
+            self._thread.start()
+        self._queue.put(error)
+
+    def close(self) -> None:
+        """
+        Waits for the queued errors to be written then closes the archive
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._failure is not None:
+            raise self._failure
+
+    def __enter__(self) -> 'ErrorLog':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _write_archive(self) -> None:
+        try:
+            with tf.open(self._path, 'w', format = tf.PAX_FORMAT) as archive: # type: ignore
+                count = 0
+                error = self._queue.get()
+                while error is not None:
+                    count += 1
+                    archive.addfile(self._tar_info(error, count), io.BytesIO(error.document))
+                    error = self._queue.get()
+        except BaseException as exception:
+            self._failure = exception
+            # Keep draining so `write` never blocks on a dead writer
+            while self._queue.get() is not None:
+                pass
+
+    def _tar_info(self, error: ProcessError, count: int) -> tf.TarInfo:
+        name = error.member or f'unknown.{count:06}.xml'
+        info = tf.TarInfo(name)
+        info.size = len(error.document)
+        info.mtime = int(time.time())
+        info.pax_headers = { 'comment': json.dumps({
+            'issues': error.issues,
+            'pmcid': None if error.member is None else pmc_id(error.member),
+            'tar_ball': None if self._tar_ball is None else self._tar_ball.name }) }
+        return info
+
+def error_log_path(folder: pathlib.Path, name: str) -> pathlib.Path:
+    """
+    The path of an error archive
+
+    Parameters
+    ----------
+    folder : pathlib.Path
+        The folder of error archives
+    name : str
+        The archive's name, without the `.errors.tar`
+    """
+    return folder.joinpath(f'{name}.errors.tar')
+
+def read_error_log(path: pathlib.Path) -> t.Iterator[ProcessError]:
+    """
+    Reads back the documents in an error archive
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The error archive
+    """
+    with tf.open(path, 'r') as archive:
+        for info in archive:
+            fp = archive.extractfile(info)
+            if fp is not None:
+                comment = json.loads(info.pax_headers.get('comment', '{}'))
+                yield ProcessError(fp.read(), comment.get('issues', []), None, info.name)
+
+def print_issues(issues: t.Dict[str, int], title: str = 'Issues') -> None:
+    """
+    Prints the number of documents that did not process for each issue, most common first
+    """
+    if len(issues) == 0:
+        return
+    print(f'{title}:')
+    for issue, count in sorted(issues.items(), key = lambda x: (-x[1], x[0])):
+        print(f'  {issue}: {count}')
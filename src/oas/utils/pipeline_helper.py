@@ -1,45 +1,536 @@
+import collections
+import concurrent.futures as cf
+import copy
+import io
+import time
 import typing as t
-from ..dtypes import Article, Extractor, ProcessError
+from ..dtypes import Article, Document, Extractor, Filter, Limits, NamedDocument, Overrun, ProcessError, Stats
+from .cache_helper import ArticleCache, document_digest
+from .catalog_helper import normalize_pmcid
+from .extract_helper import extract_category, extract_doi, extract_id, extract_journal, extract_year, needed_sections
 from lxml import etree # type: ignore
 
-def extract_articles(documents: t.Iterator[str], fields: t.Dict[str, Extractor], log: t.Callable[[ProcessError], None]) -> t.Iterator[Article]:
+_fields: t.Dict[str, Extractor] = {}
+_accept: t.Optional[Filter] = None
+_limits = Limits()
+_sections: t.FrozenSet[str] = frozenset()
+_stats = Stats()
+_parser = etree.XMLParser()
+_recover_parser = etree.XMLParser(recover = True)
+_front = frozenset(['front'])
+_all_sections = frozenset(['front', 'body', 'back'])
+_tag_ends = [b'>', b'/', b' ', b'\t', b'\r', b'\n']
+# The issues of a document that went over a limit
+too_slow = 'Too slow'
+too_large = 'Too large'
+# The number of streamed parse events between checks of the time limit
+_events_per_check = 4096
+
+class _Cached(t.NamedTuple):
     """
-    Extracts an article's named fields from the string representation
+    A document whose article was found in the cache, so it is never parsed
     """
-    for document in documents:
-        try:
-            yield _extract_article(document, fields)
-        except ProcessError as error:
-            log(error)
+    document: bytes
+    result: t.Union[Article, ProcessError]
+
+def extract_articles(documents: t.Iterator[NamedDocument], fields: t.Dict[str, Extractor], log: t.Callable[[ProcessError], None], workers: int = 1, accept: t.Optional[Filter] = None, chunk_size: int = 64, partial: bool = False, stats: t.Optional[Stats] = None, cache: t.Optional[ArticleCache] = None, limits: t.Optional[Limits] = None) -> t.Iterator[Article]:
+    """
+    Extracts an article's named fields from the raw bytes representation
 
-def _extract_article(document: str, fields: t.Dict[str, Extractor]) -> Article:
+    Parameters
+    ----------
+    documents : t.Iterator[NamedDocument]
+        The raw JATS documents, along with their member names.
+        Streamed documents are always extracted in this process before the next document is read.
+    fields : t.Dict[str, Extractor]
+        The named extractors to run on each document
+    log : t.Callable[[ProcessError], None]
+        Called, in this process, for each document that did not process.
+        The error carries the document's member name.
+    workers : int
+        The number of processes used to extract the articles.
+        1 means extract in this process.
+    accept : Filter
+        The articles to keep.
+        It is checked against just the `<front>` so rejected articles never have their `<body>` parsed.
+    chunk_size : int
+        The number of documents sent to a worker at a time
+    partial : bool
+        Also yield the fields that did extract from an article that is missing some, after it is logged.
+        Used when outputs needing different fields share a single pass.
+    stats : Stats
+        Counts the `articles`, `errors` and `filtered` out articles, the `recovered` and `streamed` parses,
+        the `seconds.filter` and `seconds.parse` and the `seconds.extract.{field}` of each extractor.
+        The workers' counts are added as their chunks come back, along with the `seconds.wait` spent waiting on them.
+        The slowest documents are kept, timed from the start of their filtering to the end of their extraction.
+    cache : ArticleCache
+        The articles extracted by an earlier run, looked up by the document's digest before it is parsed.
+        The articles, and the documents that did not process, are added to it.
+        Counts the `cached` articles and the `seconds.cache` spent on the lookups.
+        Documents that went over the limits are never cached.
+    limits : Limits
+        The most time and bytes a document may take.
+        Over the size limit a document is never parsed, and it is logged as `Too large`.
+        The time is checked after the parse and around each extractor (and every few thousand events of a streamed parse),
+        so a document is only stopped between those steps. It is logged as `Too slow`.
+    """
+    if stats is None:
+        stats = Stats()
+    if accept is not None and accept.is_empty:
+        accept = None
+    if limits is None:
+        limits = Limits()
+    digests: t.Deque[t.Optional[bytes]] = collections.deque()
+    if cache is not None:
+        documents = _look_up(documents, cache, digests, stats)
+    results: t.Iterator[t.Tuple[str, t.Tuple[t.Union[Article, ProcessError, None], float]]]
+    if workers <= 1:
+        sections = needed_sections(fields)
+        results = ((doc.name, _timed_extract(doc.document, fields, accept, sections, limits, stats)) for doc in documents)
+    else:
+        results = _extract_pooled(documents, fields, accept, limits, workers, chunk_size, stats)
+    for name, (result, seconds) in results:
+        stats.add_document(name, seconds)
+        if cache is not None:
+            digest = digests.popleft()
+            if digest is not None and result is not None and not _is_overrun(result):
+                cache.put(digest, result)
+        if isinstance(result, ProcessError):
+            stats.add('errors')
+            result = ProcessError(result.document, result.issues, result.article, name)
+            log(result)
+            if partial and result.article is not None:
+                yield result.article
+        elif result is not None:
+            stats.add('articles')
+            yield result
+        else:
+            stats.add('filtered')
+
+def overrun(error: ProcessError, limits: Limits) -> t.Optional[Overrun]:
+    """
+    The document's record for the quarantine, when it went over a limit
+
+    Parameters
+    ----------
+    error : ProcessError
+        The document that did not process, as logged
+    limits : Limits
+        The limits it was processed with
+    """
+    if not _is_overrun(error):
+        return None
+    issue = too_slow if too_slow in error.issues else too_large
+    return Overrun(error.member or '', issue, len(error.document), limits.seconds if issue == too_slow else None)
+
+def collect_overruns(log: t.Callable[[ProcessError], None], limits: Limits, overruns: t.List[Overrun]) -> t.Callable[[ProcessError], None]:
+    """
+    Wraps the log so the documents that went over a limit are also added to `overruns`, for the quarantine
+    """
+    def _log(error: ProcessError) -> None:
+        found = overrun(error, limits)
+        if found is not None:
+            overruns.append(found)
+        log(error)
+    return _log
+
+def _is_overrun(result: t.Union[Article, ProcessError]) -> bool:
+    return isinstance(result, ProcessError) and (too_slow in result.issues or too_large in result.issues)
+
+def _look_up(documents: t.Iterator[NamedDocument], cache: ArticleCache, digests: t.Deque[t.Optional[bytes]], stats: Stats) -> t.Iterator[NamedDocument]:
+    """
+    Swaps each cached document for its article.
+    The digest of each document to be extracted is queued, in order, so its article can be cached when it comes back.
+    Streamed documents are never cached.
+    """
+    for doc in documents:
+        if not isinstance(doc.document, bytes):
+            digests.append(None)
+            yield doc
+            continue
+        start = time.perf_counter()
+        digest = document_digest(doc.document)
+        result = cache.get(digest)
+        stats.add('seconds.cache', time.perf_counter() - start)
+        if result is None:
+            digests.append(digest)
+            yield doc
+        else:
+            stats.add('cached')
+            digests.append(None)
+            yield NamedDocument(doc.name, _Cached(doc.document, result)) # type: ignore
+
+def _extract_pooled(documents: t.Iterator[NamedDocument], fields: t.Dict[str, Extractor], accept: t.Optional[Filter], limits: Limits, workers: int, chunk_size: int, stats: Stats) -> t.Iterator[t.Tuple[str, t.Tuple[t.Union[Article, ProcessError, None], float]]]:
+    """
+    Fans the documents out to a process pool in chunks.
+    Results come back in the original order, paired with the member names which never leave this process.
+    At most 2 chunks per worker are in flight so memory stays bounded.
+    """
+    in_flight: t.Deque[t.Tuple[t.List[str], cf.Future]] = collections.deque()
+    def _submit(names: t.List[str], chunk: t.List[bytes]) -> None:
+        if len(chunk) > 0:
+            in_flight.append((names, pool.submit(_extract_chunk, chunk)))
+    def _next() -> t.Iterator[t.Tuple[str, t.Tuple[t.Union[Article, ProcessError, None], float]]]:
+        names, future = in_flight.popleft()
+        start = time.perf_counter()
+        results, worker_stats = future.result()
+        stats.add('seconds.wait', time.perf_counter() - start)
+        stats.merge(worker_stats)
+        return zip(names, results)
+    with cf.ProcessPoolExecutor(max_workers = workers, initializer = _init_worker, initargs = (fields, accept, limits)) as pool:
+        names: t.List[str] = []
+        chunk: t.List[bytes] = []
+        for name, document in documents:
+            if isinstance(document, bytes):
+                names.append(name)
+                chunk.append(document)
+                if len(chunk) < chunk_size:
+                    continue
+                _submit(names, chunk)
+            else:
+                _submit(names, chunk)
+                done: cf.Future = cf.Future()
+                done.set_result(([_timed_extract(document, fields, accept, needed_sections(fields), limits, stats)], stats))
+                in_flight.append(([name], done))
+            names = []
+            chunk = []
+            while len(in_flight) >= workers * 2:
+                yield from _next()
+        _submit(names, chunk)
+        while len(in_flight) > 0:
+            yield from _next()
+
+def _init_worker(fields: t.Dict[str, Extractor], accept: t.Optional[Filter], limits: Limits) -> None:
+    global _fields, _accept, _limits, _sections
+    _fields = fields
+    _accept = accept
+    _limits = limits
+    _sections = needed_sections(fields)
+
+def _extract_chunk(documents: t.List[bytes]) -> t.Tuple[t.List[t.Tuple[t.Union[Article, ProcessError, None], float]], Stats]:
+    results = [_timed_extract(document, _fields, _accept, _sections, _limits, _stats) for document in documents]
+    return (results, _stats.take())
+
+def _timed_extract(document: Document, fields: t.Dict[str, Extractor], accept: t.Optional[Filter], sections: t.FrozenSet[str], limits: Limits, stats: Stats) -> t.Tuple[t.Union[Article, ProcessError, None], float]:
+    """
+    The result of `_try_extract` along with the seconds it took
+    """
+    start = time.perf_counter()
+    result = _try_extract(document, fields, accept, sections, limits, stats, start)
+    return (result, time.perf_counter() - start)
+
+def _try_extract(document: Document, fields: t.Dict[str, Extractor], accept: t.Optional[Filter], sections: t.FrozenSet[str], limits: Limits, stats: Stats, start: float) -> t.Union[Article, ProcessError, None]:
+    """
+    Extracts the article, the reason it did not process, or None when it is filtered out.
+    When the fields only need the `<front>` the filter is checked on the same parse.
+    """
+    deadline = None if limits.seconds is None else start + limits.seconds
     try:
-        root =  _parse_xml(document)
+        if isinstance(document, _Cached):
+            return _extract_cached(document, accept, stats)
+        if limits.bytes is not None and _document_size(document) > limits.bytes:
+            stats.add('overruns')
+            return ProcessError(document if isinstance(document, bytes) else _read_stream(document), [too_large])
+        if isinstance(document, bytes):
+            front_only = sections <= _front
+            if accept is not None and not front_only:
+                start = time.perf_counter()
+                accepted = _is_accepted(_parse_front(io.BytesIO(document)), accept, document)
+                stats.add('seconds.filter', time.perf_counter() - start)
+                if not accepted:
+                    return None
+            return _extract_article(document, fields, sections, accept if front_only else None, stats, deadline)
+        else:
+            return _extract_streamed(document, fields, accept, stats, deadline)
+    except ProcessError as error:
+        if too_slow in error.issues:
+            stats.add('overruns')
+        return error
+
+def _document_size(document: Document) -> int:
+    """
+    The size of the document, without reading a stream
+    """
+    if isinstance(document, bytes):
+        return len(document)
+    if _is_seekable(document):
+        size = document.seek(0, io.SEEK_END)
+        document.seek(0)
+        return size
+    # A member of a streamed tar ball (r|) still knows its size
+    return getattr(getattr(document, 'raw', None), 'size', 0)
+
+def _is_seekable(stream: t.IO[bytes]) -> bool:
+    try:
+        return stream.seekable()
+    except AttributeError:
+        # Members of a streamed tar ball (r|) can not even be asked
+        return False
+
+def _read_stream(stream: t.IO[bytes]) -> bytes:
+    """
+    The whole document, for the log, when the stream can go back to the start
+    """
+    if _is_seekable(stream):
+        stream.seek(0)
+        return stream.read()
+    return b''
+
+def _check_deadline(deadline: t.Optional[float], document: bytes) -> None:
+    """
+    Stops the document once it is over the time limit.
+    No fields are kept, so a quarantined document is missing from every output, same as when it is skipped.
+    """
+    if deadline is not None and time.perf_counter() > deadline:
+        raise ProcessError(document, [too_slow])
+
+def _extract_cached(cached: _Cached, accept: t.Optional[Filter], stats: Stats) -> t.Union[Article, ProcessError, None]:
+    """
+    The cached article, once the filter is checked against the document's `<front>`
+    """
+    if accept is not None:
+        start = time.perf_counter()
+        accepted = _is_accepted(_parse_front(io.BytesIO(cached.document)), accept, cached.document)
+        stats.add('seconds.filter', time.perf_counter() - start)
+        if not accepted:
+            return None
+    if isinstance(cached.result, ProcessError):
+        return ProcessError(cached.document, cached.result.issues, cached.result.article)
+    return cached.result
+
+def _extract_article(document: bytes, fields: t.Dict[str, Extractor], sections: t.FrozenSet[str], accept: t.Optional[Filter], stats: Stats, deadline: t.Optional[float] = None) -> t.Optional[Article]:
+    start = time.perf_counter()
+    try:
+        root =  _parse_pruned_xml(document, sections, stats)
     except Exception as exception:
         raise ProcessError(document, ['Bad XML']) from exception
+    finally:
+        stats.add('seconds.parse', time.perf_counter() - start)
+    _check_deadline(deadline, document)
+    if accept is not None and not _is_accepted(root, accept, document):
+        return None
+    return _extract_fields(root, document, fields, stats, deadline)
+
+def _extract_streamed(stream: t.IO[bytes], fields: t.Dict[str, Extractor], accept: t.Optional[Filter], stats: Stats, deadline: t.Optional[float] = None) -> t.Optional[Article]:
+    """
+    Extracts an article that is too big to hold in memory.
+    The stream is only read into memory when the document has to be logged.
+    """
+    def _seekable() -> bool:
+        return _is_seekable(stream)
+    def _document() -> bytes:
+        return _read_stream(stream)
+    stats.add('streamed')
+    if accept is not None and _seekable():
+        start = time.perf_counter()
+        try:
+            accepted = _is_accepted(_parse_front(stream), accept, b'')
+        except ProcessError as error:
+            raise ProcessError(_document(), error.issues)
+        stream.seek(0)
+        stats.add('seconds.filter', time.perf_counter() - start)
+        if not accepted:
+            return None
+    start = time.perf_counter()
+    try:
+        if not _seekable():
+            # There is no second chance so recover from the start
+            root = _iterparse_xml(stream, True, deadline)
+            if accept is not None and not _is_accepted(root, accept, b''):
+                return None
+        else:
+            try:
+                root = _iterparse_xml(stream, False, deadline)
+            except etree.XMLSyntaxError:
+                stats.add('recovered')
+                stream.seek(0)
+                root = _iterparse_xml(stream, True, deadline)
+    except ProcessError as error:
+        raise ProcessError(_document(), error.issues)
+    except Exception as exception:
+        raise ProcessError(_document(), ['Bad XML']) from exception
+    finally:
+        stats.add('seconds.parse', time.perf_counter() - start)
+    try:
+        return _extract_fields(root, b'', fields, stats, deadline)
+    except ProcessError as error:
+        raise ProcessError(_document(), error.issues, error.article)
+
+def _extract_fields(root: etree.Element, document: bytes, fields: t.Dict[str, Extractor], stats: Stats, deadline: t.Optional[float] = None) -> Article:
     article: Article = {}
     missing: t.List[str] = []
     for name, extractor in fields.items():
+        _check_deadline(deadline, document)
+        start = time.perf_counter()
         try:
-            article[name] = extractor(root)
+            # An extractor that finds nothing gives None, written as an empty value
+            article[name] = extractor(root) # type: ignore
         except:
             missing.append(name)
+        stats.add('seconds.extract.' + name, time.perf_counter() - start)
+    _check_deadline(deadline, document)
     if len(missing) > 0:
-        raise ProcessError(document, [f'Missing {name}' for name in missing])
+        raise ProcessError(document, [f'Missing {name}' for name in missing], article)
     return article
 
-def _parse_xml(xml: str) -> etree.Element:
+def _parse_front(stream: t.IO[bytes]) -> t.Optional[etree.Element]:
+    """
+    Parses just enough of the document to get the `<front>`.
+    The root is returned with only the `<front>` as its child.
+    """
+    for _, front in etree.iterparse(stream, events = ('end',), tag = 'front', recover = True):
+        return front.getparent()
+    return None
+
+def _is_accepted(root: t.Optional[etree.Element], accept: Filter, document: bytes) -> bool:
+    """
+    Checks the article against the filter using only the `<front>`.
+    A document without a `<front>`, or missing a field the filter needs, did not process so it is raised as a `ProcessError`.
+    """
+    if root is None:
+        raise ProcessError(document, ['Missing front'])
+    def _field(name: str, extractor: Extractor) -> t.Any:
+        try:
+            return extractor(root)
+        except Exception as exception:
+            raise ProcessError(document, [f'Missing {name}']) from exception
+    if accept.pmcids is not None and accept.dois is not None:
+        id = _field('id', extract_id)
+        pmcid = None if id is None else normalize_pmcid(id)
+        dois = set((_field('doi', extract_doi) or '').lower().split(';'))
+        if pmcid not in accept.pmcids and len(dois & accept.dois) == 0:
+            return False
+    if accept.journals is not None:
+        if (_field('journal', extract_journal) or '').lower() not in accept.journals:
+            return False
+    if accept.year_min is not None or accept.year_max is not None:
+        year = _field('year', extract_year)
+        if year is None or (accept.year_min is not None and year < accept.year_min) or (accept.year_max is not None and year > accept.year_max):
+            return False
+    if accept.categories is not None:
+        categories = set((_field('category', extract_category) or '').lower().split(';'))
+        if len(categories & accept.categories) == 0:
+            return False
+    return True
+
+def _parse_xml(xml: bytes, stats: t.Optional[Stats] = None) -> etree.Element:
     """
     PMC _almost_ always has a good JATS file saved. When this is not the case, try various fallbacks.
-    * The XML includes the encoding declaration (<?xml version="1.0" encoding="UTF-8"?>).
-      Cast it to bytes first then continue processing per https://stackoverflow.com/questions/57833080
+    * The XML is parsed straight from the bytes so the encoding declaration (<?xml version="1.0" encoding="UTF-8"?>) is honored
+      per https://stackoverflow.com/questions/57833080
     * The XML is malformed (I.E. missing "xmlns:xlink")
       Use the recover parser per https://stackoverflow.com/questions/8888628
+    The parsers are created once per process and reused for every document.
+    Each fallback is counted as `recovered`.
     """
     try:
-        return etree.fromstring(xml)
-    except ValueError:
-        return etree.fromstring(bytes(xml, encoding = 'utf-8'))
+        return etree.fromstring(xml, _parser)
     except etree.XMLSyntaxError:
-        parser = etree.XMLParser(recover = True)
-        return etree.fromstring(xml, parser)
+        if stats is not None:
+            stats.add('recovered')
+        return etree.fromstring(xml, _recover_parser)
+
+def _parse_pruned_xml(xml: bytes, sections: t.FrozenSet[str], stats: t.Optional[Stats] = None) -> etree.Element:
+    """
+    Parses the document without the top level sections no extractor reads.
+    When the pruned document is not well formed the whole document is parsed as normal,
+    so a damaged section that is not needed never changes how the rest is recovered.
+    Each of those is counted as `unpruned`.
+    """
+    pruned = _prune_xml(xml, sections)
+    if pruned is not xml:
+        try:
+            return etree.fromstring(pruned, _parser)
+        except etree.XMLSyntaxError:
+            if stats is not None:
+                stats.add('unpruned')
+    return _parse_xml(xml, stats)
+
+def _prune_xml(xml: bytes, sections: t.FrozenSet[str]) -> bytes:
+    """
+    Cuts the `<body>` and/or `<back>` out of the raw bytes so they are never parsed.
+    When only the `<front>` is needed everything after it, up to the root's end tag, is cut.
+    The article's own sections are the first ones after `</front>` as sub articles always come last.
+    """
+    if _all_sections <= sections:
+        return xml
+    front = xml.find(b'</front>')
+    if front < 0:
+        return xml
+    front += len(b'</front>')
+    if sections <= _front:
+        end = xml.rfind(b'</')
+        return xml[:front] + xml[end:] if end >= front else xml
+    for section in _all_sections - sections - _front:
+        xml = _cut_element(xml, section.encode('ascii'), front)
+    return xml
+
+def _cut_element(xml: bytes, tag: bytes, start: int) -> bytes:
+    """
+    Cuts the first `<tag>` element at or after start, along with everything in it
+    """
+    begin = xml.find(b'<' + tag, start)
+    while begin >= 0 and xml[begin + len(tag) + 1:begin + len(tag) + 2] not in _tag_ends:
+        begin = xml.find(b'<' + tag, begin + 1)
+    if begin < 0:
+        return xml
+    close = xml.find(b'>', begin)
+    if close < 0:
+        return xml
+    if xml[close - 1:close] != b'/':
+        close = xml.find(b'</' + tag + b'>', close)
+        if close < 0:
+            return xml
+        close += len(tag) + 2
+    return xml[:begin] + xml[close + 1:]
+
+def _iterparse_xml(stream: t.IO[bytes], recover: bool, deadline: t.Optional[float] = None) -> etree.Element:
+    """
+    Builds a compact tree for a giant JATS file using iterparse.
+    `<front>` and `<back>` are kept as is.
+    The `<body>` paragraphs the extractors look for are copied out as they close,
+    everything in the `<body>` is then emptied as it closes.
+    Nothing is moved or removed from the tree while it is being parsed as libxml2 can still point into it,
+    which corrupts the heap on malformed documents parsed with recover.
+    When the `<body>` closes it is rebuilt from just those paragraphs so the normal extractors see the same text.
+    The time limit is checked every `_events_per_check` events.
+    """
+    root: t.Optional[etree.Element] = None
+    body: t.Optional[etree.Element] = None
+    in_p = 0
+    sec_paragraphs = etree.Element('sec')
+    body_paragraphs = etree.Element('body')
+    events = 0
+    for event, elem in etree.iterparse(stream, events = ('start', 'end'), recover = recover, huge_tree = True):
+        events += 1
+        if events % _events_per_check == 0:
+            _check_deadline(deadline, b'')
+        if event == 'start':
+            if root is None:
+                root = elem
+            elif body is None:
+                if elem.tag == 'body' and elem.getparent() == root:
+                    body = elem
+            elif elem.tag == 'p':
+                in_p += 1
+            continue
+        if body is None:
+            continue
+        if elem == body:
+            body.clear()
+            body.extend(list(body_paragraphs))
+            if len(sec_paragraphs) > 0:
+                body.append(sec_paragraphs)
+            body = None
+            continue
+        parent = elem.getparent()
+        if elem.tag == 'p':
+            in_p -= 1
+            # A paragraph nested inside another is also part of that paragraph's text
+            if parent.tag == 'sec':
+                sec_paragraphs.append(copy.deepcopy(elem))
+            elif parent == body and in_p == 0:
+                body_paragraphs.append(copy.deepcopy(elem))
+        if in_p == 0:
+            elem.clear(keep_tail = True)
+    return root
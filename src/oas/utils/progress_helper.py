@@ -1,4 +1,6 @@
+import contextlib
 import progressbar as pb # type: ignore
+import threading
 import typing as t
 
 T = t.TypeVar('T')
@@ -10,4 +12,59 @@ def progress_overlay(items: t.Iterator[T], title: str) -> t.Iterator[T]:
         for item in items:
             bar_i = bar_i + 1
             bar.update(bar_i) # type: ignore
-            yield item
\ No newline at end of file
+            yield item
+
+@contextlib.contextmanager
+def byte_progress(title: str, total: int, done: t.Callable[[], float], documents: t.Callable[[], float], interval: float = 0.5) -> t.Iterator[None]:
+    """
+    Shows how many of the bytes are done, the throughput and the time left while the body of the `with` runs.
+    The bar is redrawn from a background thread every `interval` seconds,
+    so the work itself only has to keep the counts up to date.
+
+    Parameters
+    ----------
+    title : str
+        The bar's title
+    total : int
+        The number of bytes to do (I.E. the size of the tar balls)
+    done : t.Callable[[], float]
+        The number of bytes done so far. It is called from the background thread
+    documents : t.Callable[[], float]
+        The number of documents done so far. It is called from the background thread
+    interval : float
+        The seconds between redraws
+    """
+    total = max(total, 1)
+    widgets = [
+        title, ' ', pb.Percentage(), ' ', pb.Variable('documents', format = '{formatted_value} docs', precision = 0, width = 1), ' ',
+        pb.DataSize(), ' ', pb.FileTransferSpeed(), ' ', pb.Bar(marker = '.', left = '[', right = ']'), ' ', pb.AdaptiveETA()]
+    with pb.ProgressBar(widgets = widgets, max_value = total) as bar:
+        def _update() -> None:
+            bar.update(min(int(done()), total), documents = int(documents()))
+        with every(interval, _update):
+            yield
+
+@contextlib.contextmanager
+def every(interval: float, action: t.Callable[[], None]) -> t.Iterator[None]:
+    """
+    Runs the action on a background thread every `interval` seconds while the body of the `with` runs, then once more at the end.
+    An action that fails is not run again until the end, where the failure is raised.
+    """
+    stop = threading.Event()
+    failure: t.List[BaseException] = []
+    def _run() -> None:
+        try:
+            while not stop.wait(interval):
+                action()
+        except BaseException as exception:
+            failure.append(exception)
+    thread = threading.Thread(target = _run, daemon = True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+    action()
+    if len(failure) > 0:
+        raise failure[0]
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import pathlib
+import typing as t
+from ..dtypes import Filter, Limits, Manifest, Node, Overrun, Quarantine, Shard, Stats, TarPart
+from .dedup_helper import open_dedup, plan_dedup, save_dedup_plan
+from .fs_helper import list_folder_tar_balls
+from .log_helper import print_issues
+from .schedule_helper import index_tar_parts, list_tar_parts, manifest_name, node_tar_parts, part_key, part_size, quarantine_name, schedule_tar_balls
+from .stats_helper import monitor_run
+
+class UnitResult(t.NamedTuple):
+    """
+    What processing a unit gave, with the errors and issues of each of the run's outputs in order
+    """
+    documents: int
+    errors: t.List[int]
+    issues: t.List[t.Dict[str, int]]
+    # The text files written, for the outputs that write them
+    shards: t.List[Shard]
+    overruns: t.List[Overrun]
+    stats: Stats
+
+class UnitOutput(t.Protocol):
+    """
+    One output of a run (I.E. convert's text files), kept in its own folder along with its manifest and quarantine
+    """
+    def output_folder(self) -> pathlib.Path:
+        ...
+    def fingerprint(self) -> str:
+        ...
+    def is_complete(self, unit: TarPart, manifest: Manifest) -> bool:
+        ...
+    def rollback(self, unit: TarPart, manifest: Manifest) -> None:
+        ...
+    def complete(self, unit: TarPart, manifest: Manifest, documents: int, errors: int, issues: t.Dict[str, int], shards: t.List[Shard]) -> None:
+        ...
+    def finish(self, tar_balls: t.List[pathlib.Path], units: t.List[TarPart]) -> None:
+        ...
+
+class UnitRun:
+
+    def __init__(self, outputs: t.List[UnitOutput], source: pathlib.Path, split: int = 1, shard: t.Optional[Node] = None, restart: bool = False, dedup: t.Optional[pathlib.Path] = None, limits: Limits = Limits()):
+        """
+        The lifecycle of a run over the tar balls (or parts of them), shared by the modes.
+        Each output keeps its own manifest and quarantine so the modes can resume each other's work.
+
+        Parameters
+        ----------
+        outputs : t.List[UnitOutput]
+            The outputs each unit writes
+        source : pathlib.Path
+            The folder containing the tar balls
+        split : int
+            The number of byte ranges each tar ball is split into
+        shard : Node
+            This machine's share of the units, None for all of them
+        restart : bool
+            Redo every unit, even the completed ones
+        dedup : pathlib.Path
+            The SQLite file of the dedup plan, None to keep every copy
+        limits : Limits
+            The limits the quarantined documents went over
+        """
+        self._outputs = outputs
+        self._source = source
+        self._split = split
+        self._shard = shard
+        self._dedup = dedup
+        self._limits = limits
+        self._manifests: t.List[Manifest] = []
+        for output in outputs:
+            folder = output.output_folder()
+            folder.mkdir(exist_ok = True)
+            self._manifests.append(Manifest(folder.joinpath(manifest_name(shard))))
+            if restart:
+                self._manifests[-1].clear()
+        self._quarantines = [Quarantine(output.output_folder(), quarantine_name(shard)) for output in outputs]
+        self._tar_balls: t.List[pathlib.Path] = []
+        self._units: t.List[TarPart] = []
+        self._todo: t.List[TarPart] = []
+        self._skip: t.Dict[str, t.Set[str]] = {}
+
+    @property
+    def tar_balls(self) -> t.List[pathlib.Path]:
+        return self._tar_balls
+    @property
+    def units(self) -> t.List[TarPart]:
+        """
+        This machine's units
+        """
+        return self._units
+    @property
+    def todo(self) -> t.List[TarPart]:
+        """
+        The units to process, in order
+        """
+        return self._todo
+    @property
+    def skip(self) -> t.Dict[str, t.Set[str]]:
+        """
+        The quarantined members to pass over, keyed by the tar ball's file name
+        """
+        return self._skip
+
+    def plan(self) -> t.List[TarPart]:
+        """
+        Works out the units to process, clearing away the output they left in earlier runs.
+        A unit is redone when any output is missing or was made with other settings (see `fingerprint`), or when the older copies it skips changed.
+
+        Returns
+        -------
+        The units to process
+        """
+        self._tar_balls = [path for path in list_folder_tar_balls(self._source)]
+        units = list_tar_parts(self._tar_balls, self._split)
+        for output, manifest in zip(self._outputs, self._manifests):
+            _rollback_stale(output.output_folder(), self._tar_balls, units, manifest)
+        # The units that moved to another node are forgotten, leaving their output for that node to replace
+        self._units = node_tar_parts(units, self._shard)
+        for manifest in self._manifests:
+            manifest.retain(part_key(unit) for unit in self._units)
+        # Each output keeps its own plan, since any of them can have been run without the others
+        dedup = open_dedup(self._dedup) if self._dedup is not None else None
+        stale: t.Set[str] = set()
+        if dedup is not None:
+            for output in self._outputs:
+                stale |= plan_dedup(dedup, self._tar_balls, output.output_folder())
+        complete = {unit for unit in self._units if all(output.is_complete(unit, manifest) for output, manifest in zip(self._outputs, self._manifests))}
+        redo = {unit for unit in complete if unit.path.name in stale}
+        todo = [unit for unit in self._units if unit not in complete or unit in redo]
+        if len(todo) < len(self._units):
+            print(f'Skipping {len(self._units) - len(todo)} completed tar balls')
+        if len(redo) > 0:
+            print(f'Redoing {len(redo)} completed tar balls whose older copies changed')
+        for unit in todo:
+            for output, manifest in zip(self._outputs, self._manifests):
+                output.rollback(unit, manifest)
+        if dedup is not None:
+            copies = [save_dedup_plan(dedup, output.output_folder()) for output in self._outputs]
+            print(f'Skipping {copies[-1]} older copies')
+            dedup.close()
+        # Each split tar ball is indexed once, here, before its parts are handed out
+        self._todo = index_tar_parts(todo)
+        # A document quarantined by any output is skipped
+        self._skip = {}
+        for quarantine in self._quarantines:
+            for name, members in quarantine.skipped((unit.path for unit in self._todo), self._limits).items():
+                self._skip[name] = self._skip.get(name, set()) | members
+        if len(self._skip) > 0:
+            print(f'Skipping {sum(len(x) for x in self._skip.values())} quarantined documents')
+        return self._todo
+
+    def run(self, mode: str, title: str, work: t.Callable[[TarPart], UnitResult], jobs: int, stats: Stats, report: t.Optional[pathlib.Path] = None, prometheus: t.Optional[pathlib.Path] = None, titles: t.Optional[t.List[str]] = None) -> None:
+        """
+        Processes the planned units, recording each in every output's manifest as it finishes, then finishes the outputs
+
+        Parameters
+        ----------
+        mode : str
+            The name of the mode, for the report
+        title : str
+            The progress bar's title
+        work : t.Callable[[TarPart], UnitResult]
+            The per unit process. It must be picklable when jobs > 1
+        jobs : int
+            The number of units processed at once
+        stats : Stats
+            The run's counters, each unit's are merged in as it finishes
+        report : pathlib.Path
+            The JSON file for the run's report
+        prometheus : pathlib.Path
+            The Prometheus textfile kept up to date during the run
+        titles : t.List[str]
+            The heading for each output's issues
+        """
+        total = sum(part_size(unit) for unit in self._todo)
+        with monitor_run(mode, title, stats, total, len(self._todo), report, prometheus):
+            for unit, result in schedule_tar_balls(self._todo, work, jobs):
+                stats.merge(result.stats)
+                for i, output in enumerate(self._outputs):
+                    self._quarantines[i].add(unit.path, result.overruns)
+                    output.complete(unit, self._manifests[i], result.documents, result.errors[i], result.issues[i], result.shards)
+        keys = [part_key(unit) for unit in self._units]
+        for i, manifest in enumerate(self._manifests):
+            print_issues(manifest.issues(keys), 'Issues' if titles is None else titles[i])
+        for output in self._outputs:
+            output.finish(self._tar_balls, self._units)
+
+def fingerprint(settings: t.Dict[str, t.Any]) -> str:
+    """
+    A digest of the settings that shape a unit's output, kept in the manifest so a rerun with other settings redoes the unit
+
+    Parameters
+    ----------
+    settings : t.Dict[str, t.Any]
+        The settings, as JSON values
+    """
+    text = json.dumps(settings, sort_keys = True, ensure_ascii = False)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size = 8).hexdigest()
+
+def filter_fingerprint(filter: t.Optional[Filter]) -> t.Optional[t.Dict[str, t.Any]]:
+    """
+    The filter's part of a fingerprint, None when it keeps everything
+    """
+    return None if filter is None or filter.is_empty else filter.as_dict()
+
+def _rollback_stale(folder: pathlib.Path, tar_balls: t.List[pathlib.Path], units: t.List[TarPart], manifest: Manifest) -> None:
+    """
+    Removes the output of tar balls that were split differently in an earlier run
+    """
+    names = {path.name: path for path in tar_balls}
+    keys = {part_key(unit) for unit in units}
+    for key in [key for key in manifest.entries.keys() if key not in keys]:
+        path = names.get(key.split(':')[0])
+        if path is not None:
+            for name in manifest.outputs(path, key):
+                folder.joinpath(name).unlink(missing_ok = True)
+            manifest.forget(path, key)
@@ -0,0 +1,192 @@
+import concurrent.futures as cf
+import pathlib
+import re
+import shutil
+import typing as t
+from ..dtypes import Node, TarMember, TarPart
+from .fs_helper import is_compressed, tar_ball_stem
+from .index_helper import get_index, member_blocks, split_index
+
+T = t.TypeVar('T')
+
+def list_tar_parts(tar_balls: t.Iterable[pathlib.Path], parts: int) -> t.List[TarPart]:
+    """
+    Lists the units of work, each tar ball split into the given number of byte ranges.
+    Compressed tar balls can only be read front to back so they are never split.
+
+    Parameters
+    ----------
+    tar_balls : t.Iterable[pathlib.Path]
+        The tar balls
+    parts : int
+        The number of byte ranges per tar ball
+    """
+    result: t.List[TarPart] = []
+    for tar_ball in tar_balls:
+        count = 1 if is_compressed(tar_ball) else parts
+        result.extend(TarPart(tar_ball, i, count) for i in range(count))
+    return result
+
+def index_tar_parts(tar_parts: t.Iterable[TarPart]) -> t.List[TarPart]:
+    """
+    Gives each split unit its range of the tar ball's index.
+    Each tar ball's index is loaded (or built) once, here, so the units that read it never race to build it
+    and all of them split the same index.
+
+    Parameters
+    ----------
+    tar_parts : t.Iterable[TarPart]
+        The units of work
+    """
+    ranges: t.Dict[pathlib.Path, t.List[t.List[TarMember]]] = {}
+    result: t.List[TarPart] = []
+    for tar_part in tar_parts:
+        if tar_part.parts > 1 and tar_part.members is None:
+            if tar_part.path not in ranges:
+                ranges[tar_part.path] = split_index(get_index(tar_part.path), tar_part.parts)
+            tar_part = tar_part._replace(members = tuple(ranges[tar_part.path][tar_part.part]))
+        result.append(tar_part)
+    return result
+
+def assign_tar_parts(tar_parts: t.Iterable[TarPart], nodes: int) -> t.List[t.List[TarPart]]:
+    """
+    Splits the units of work across the nodes so each has about the same number of bytes.
+    The largest units are placed first, each on the node with the fewest bytes so far (the lowest numbered on a tie).
+    Every node works out the same plan from the same folder, so no coordination is needed.
+    Each node's units keep their original order.
+
+    Parameters
+    ----------
+    tar_parts : t.Iterable[TarPart]
+        The units of work
+    nodes : int
+        The number of nodes
+    """
+    ordered = [x for x in tar_parts]
+    sizes = {part_key(x): part_size(x) for x in ordered}
+    loads = [0] * nodes
+    owners: t.Dict[str, int] = {}
+    for key in sorted(sizes.keys(), key = lambda x: (-sizes[x], x)):
+        node = min(range(nodes), key = lambda i: (loads[i], i))
+        loads[node] += sizes[key]
+        owners[key] = node
+    result: t.List[t.List[TarPart]] = [[] for _ in range(nodes)]
+    for tar_part in ordered:
+        result[owners[part_key(tar_part)]].append(tar_part)
+    return result
+
+def node_tar_parts(tar_parts: t.Iterable[TarPart], node: t.Optional[Node]) -> t.List[TarPart]:
+    """
+    The units of work for the node, all of them when the run is not shared
+    """
+    if node is None:
+        return [x for x in tar_parts]
+    return assign_tar_parts(tar_parts, node.nodes)[node.node]
+
+def manifest_name(node: t.Optional[Node] = None) -> str:
+    """
+    The manifest's file name. Each node of a shared run keeps its own
+    """
+    return 'oas.manifest.json' if node is None else f'oas.manifest.{node.node}-of-{node.nodes}.json'
+
+def quarantine_name(node: t.Optional[Node] = None) -> str:
+    """
+    The quarantine's file name. Each node of a shared run keeps its own
+    """
+    return 'oas.quarantine.json' if node is None else f'oas.quarantine.{node.node}-of-{node.nodes}.json'
+
+def list_node_manifests(folder: pathlib.Path) -> t.Dict[Node, pathlib.Path]:
+    """
+    The manifests written by the nodes of shared runs
+
+    Parameters
+    ----------
+    folder : pathlib.Path
+        The folder of the output files
+    """
+    result: t.Dict[Node, pathlib.Path] = {}
+    for path in sorted(folder.glob('oas.manifest.*-of-*.json')):
+        match = re.fullmatch(r'oas\.manifest\.(\d+)-of-(\d+)\.json', path.name)
+        if match is not None:
+            result[Node(int(match.group(1)), int(match.group(2)))] = path
+    return result
+
+def part_stem(tar_part: TarPart) -> str:
+    """
+    The name used for the unit's output (I.E. the tar ball's stem, plus the part number when split)
+    """
+    stem = tar_ball_stem(tar_part.path)
+    return stem if tar_part.parts == 1 else f'{stem}.{tar_part.part:03}'
+
+def part_size(tar_part: TarPart) -> int:
+    """
+    The unit's share of its tar ball's bytes, the blocks of its documents once they are known
+    """
+    if tar_part.members is not None:
+        return sum(member_blocks(member) for member in tar_part.members)
+    return tar_part.path.stat().st_size // tar_part.parts
+
+def part_key(tar_part: TarPart) -> str:
+    """
+    The name used for the unit in the manifest
+    """
+    name = tar_part.path.name
+    return name if tar_part.parts == 1 else f'{name}:{tar_part.part}/{tar_part.parts}'
+
+def schedule_tar_balls(tar_parts: t.Iterable[TarPart], work: t.Callable[[TarPart], T], jobs: int) -> t.Iterator[t.Tuple[TarPart, T]]:
+    """
+    Runs the work over each tar ball (or part of one), several at a time
+
+    Parameters
+    ----------
+    tar_parts : t.Iterable[TarPart]
+        The units of work
+    work : t.Callable[[TarPart], T]
+        The per unit process. It must be picklable when jobs > 1
+    jobs : int
+        The number of units processed at once.
+        1 means process them in order in this process.
+        Otherwise the largest units are started first to cut the tail time.
+        Results are returned as they finish.
+    """
+    if jobs <= 1:
+        for tar_part in tar_parts:
+            yield (tar_part, work(tar_part))
+    else:
+        ordered = sorted(tar_parts, key = part_size, reverse = True)
+        with cf.ProcessPoolExecutor(max_workers = jobs) as pool:
+            futures = {pool.submit(work, tar_part): tar_part for tar_part in ordered}
+            for future in cf.as_completed(futures):
+                yield (futures[future], future.result())
+
+def merge_csv_shards(shards: t.Iterable[pathlib.Path], dest: pathlib.Path) -> None:
+    """
+    Concatenates CSV files that share the same header into a single file.
+    Only the first header is kept.
+    A file with another header (I.E. written with other fields) raises a ValueError, before anything is written.
+
+    Parameters
+    ----------
+    shards : t.Iterable[pathlib.Path]
+        The CSV files in the order they are to be merged
+    dest : pathlib.Path
+        The merged CSV file
+    """
+    shards = [shard for shard in shards]
+    header: t.Optional[bytes] = None
+    for shard in shards:
+        with open(shard, 'rb') as fp_in:
+            line = fp_in.readline()
+        if header is None:
+            header = line
+        elif line != header:
+            raise ValueError(f'{shard} has the columns {line.decode("utf-8").strip()}, not {header.decode("utf-8").strip()}')
+    buffer = 16 * 1024 * 1024
+    with open(dest, 'wb') as fp_out:
+        first = True
+        for shard in shards:
+            with open(shard, 'rb') as fp_in:
+                if not first:
+                    fp_in.readline()
+                shutil.copyfileobj(fp_in, fp_out, buffer)
+            first = False
@@ -0,0 +1,79 @@
+import pathlib
+import re
+import typing as t
+
+# Words ending in a period that do not end a sentence. Compared in lower case.
+# Only the ones that never end a sentence, words like `min.`, `no.` or `etc.` often end one in methods text.
+default_abbreviations = frozenset([
+    'al.', 'approx.', 'ca.', 'cf.', 'dr.', 'e.g.', 'eq.', 'eqs.', 'fig.', 'figs.', 'i.e.', 'mr.', 'mrs.',
+    'prof.', 'ref.', 'refs.', 'viz.', 'vs.'])
+
+# A . ! or ? ending a word followed by a word starting with an upper case letter or digit (as str.isupper/isdigit, BMP only).
+# The check for the next word is compiled into the expression so only the real candidates come back to Python.
+_starts = ''.join(re.escape(chr(x)) for x in range(0x10000) if chr(x).isupper() or chr(x).isdigit())
+_boundary = re.compile(f'[.!?] (?=[{_starts}])')
+# Brackets and quotes before an abbreviation (I.E. `(e.g.`)
+_opening = '([{"\'‘“'
+
+class SentenceSplitter:
+
+    def __init__(self, abbreviations: t.Optional[t.Iterable[str]] = None):
+        """
+        Splits paragraphs into sentences.
+        A sentence ends at a word ending in `.`, `!` or `?` that is followed by a word starting with an upper case letter or digit.
+        The word, less any opening brackets or quotes, must not be one of the abbreviations.
+
+        Parameters
+        ----------
+        abbreviations : t.Iterable[str]
+            The words that do not end a sentence. It defaults to `default_abbreviations`
+        """
+        if abbreviations is None:
+            self._abbreviations = default_abbreviations
+        else:
+            self._abbreviations = frozenset(x.lower() for x in abbreviations)
+
+    @property
+    def abbreviations(self) -> t.FrozenSet[str]:
+        return self._abbreviations
+
+    def split(self, text: str) -> t.List[str]:
+        """
+        Splits a single paragraph into sentences
+        """
+        return self._split(' '.join(text.split()))
+
+    def split_paragraphs(self, paragraphs: t.List[str]) -> t.List[t.List[str]]:
+        """
+        Splits all of an article's paragraphs in one call.
+        The paragraphs must already be single spaced, as the extractors return them.
+        """
+        split = self._split
+        return [split(paragraph) for paragraph in paragraphs]
+
+    def _split(self, text: str) -> t.List[str]:
+        sentences: t.List[str] = []
+        start = 0
+        abbreviations = self._abbreviations
+        for match in _boundary.finditer(text):
+            end = match.start() + 1
+            if text[text.rfind(' ', 0, end) + 1:end].lstrip(_opening).lower() in abbreviations:
+                continue
+            sentences.append(text[start:end])
+            start = end + 1
+        if start < len(text):
+            sentences.append(text[start:])
+        return sentences
+
+def load_abbreviations(path: pathlib.Path) -> t.List[str]:
+    """
+    Loads an abbreviation lexicon, one per line. Blank lines and # comments are skipped
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The lexicon file
+    """
+    with open(path, 'r', encoding = 'utf-8') as fp:
+        lines = (line.split('#')[0].strip() for line in fp)
+        return [line for line in lines if line != '']
@@ -0,0 +1,208 @@
+import io
+import queue
+import threading
+import time
+import typing as t
+from ..dtypes import NamedDocument, Stats
+
+_done = object()
+
+class _Failure(t.NamedTuple):
+    exception: BaseException
+
+class _Budget:
+    """
+    The bytes a queue may hold. An item bigger than the whole budget is still let in once the queue is empty.
+    """
+    def __init__(self, limit: int):
+        self._limit = limit
+        self._used = 0
+        self._stopped = False
+        self._changed = threading.Condition()
+
+    @property
+    def used(self) -> int:
+        return self._used
+
+    def acquire(self, size: int) -> float:
+        """
+        Waits for room for the bytes, returning the seconds waited
+        """
+        start = time.perf_counter()
+        with self._changed:
+            while self._used > 0 and self._used + size > self._limit and not self._stopped:
+                self._changed.wait()
+            self._used += size
+        return time.perf_counter() - start
+
+    def release(self, size: int) -> None:
+        with self._changed:
+            self._used -= size
+            self._changed.notify_all()
+
+    def stop(self) -> None:
+        """
+        Lets every waiting and future `acquire` through
+        """
+        with self._changed:
+            self._stopped = True
+            self._changed.notify_all()
+
+def read_ahead(documents: t.Iterator[NamedDocument], budget: int, stats: t.Optional[Stats] = None, name: str = 'read') -> t.Iterator[NamedDocument]:
+    """
+    Reads the documents on a background thread, ahead of their parsing, so the disk and the CPU are busy at the same time.
+    A streamed document is only valid until the next document is read, so the thread waits for it to be done with before going on.
+    A failure to read is raised here, after the documents read before it.
+
+    Parameters
+    ----------
+    documents : t.Iterator[NamedDocument]
+        The documents (I.E. from `list_documents`)
+    budget : int
+        The bytes of documents that can be waiting to be parsed. 0 means read them in this thread, in turn
+    stats : Stats
+        Counts the `queue.{name}.items` and the `queue.{name}.bytes` waiting as each is taken (divide by the items for the mean),
+        along with the `seconds.queue.{name}.full` the thread waited for room and the `seconds.queue.{name}.empty` spent waiting on the thread.
+        Mostly `full` means parsing is the bottleneck, mostly `empty` means reading is.
+    name : str
+        The name of the stage in `stats`
+    """
+    if budget <= 0:
+        yield from documents
+        return
+    if stats is None:
+        stats = Stats()
+    room = _Budget(budget)
+    waiting: queue.Queue = queue.Queue()
+    released = threading.Event()
+    stopped = threading.Event()
+    def _read() -> None:
+        try:
+            for doc in documents:
+                if stopped.is_set():
+                    break
+                size = len(doc.document) if isinstance(doc.document, bytes) else 0
+                stats.add(f'seconds.queue.{name}.full', room.acquire(size)) # type: ignore
+                waiting.put((doc, size))
+                if not isinstance(doc.document, bytes):
+                    released.wait()
+                    released.clear()
+        except BaseException as exception:
+            waiting.put(_Failure(exception))
+        finally:
+            close = getattr(documents, 'close', None)
+            if close is not None:
+                close()
+            waiting.put(_done)
+    thread = threading.Thread(target = _read, daemon = True)
+    thread.start()
+    try:
+        while True:
+            start = time.perf_counter()
+            entry = waiting.get()
+            stats.add(f'seconds.queue.{name}.empty', time.perf_counter() - start)
+            if entry is _done:
+                break
+            if isinstance(entry, _Failure):
+                raise entry.exception
+            doc, size = entry
+            stats.add(f'queue.{name}.items')
+            stats.add(f'queue.{name}.bytes', room.used)
+            room.release(size)
+            yield doc
+            if not isinstance(doc.document, bytes):
+                released.set()
+    finally:
+        stopped.set()
+        room.stop()
+        released.set()
+        thread.join()
+
+class _WriteBehind(io.RawIOBase):
+    """
+    Hands each write to a background thread that writes to the file in large batches
+    """
+    def __init__(self, fp: t.BinaryIO, budget: int, stats: Stats, name: str):
+        self._fp = fp
+        self._room = _Budget(budget)
+        self._stats = stats
+        self._name = name
+        self._waiting: queue.Queue = queue.Queue()
+        self._failure: t.Optional[BaseException] = None
+        self._thread = threading.Thread(target = self._write_behind, daemon = True)
+        self._thread.start()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self._failure is not None:
+            raise self._failure
+        # The caller may reuse its buffer as soon as this returns
+        data = bytes(data)
+        self._stats.add(f'seconds.queue.{self._name}.full', self._room.acquire(len(data)))
+        self._stats.add(f'queue.{self._name}.items')
+        self._stats.add(f'queue.{self._name}.bytes', self._room.used)
+        self._waiting.put(data)
+        return len(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._waiting.put(_done)
+        self._thread.join()
+        try:
+            self._fp.close()
+        finally:
+            super().close()
+        if self._failure is not None:
+            raise self._failure
+
+    def _write_behind(self) -> None:
+        finished = False
+        while not finished:
+            start = time.perf_counter()
+            chunks = [self._waiting.get()]
+            self._stats.add(f'seconds.queue.{self._name}.empty', time.perf_counter() - start)
+            # Everything waiting goes out in one write
+            while chunks[-1] is not _done and not self._waiting.empty():
+                chunks.append(self._waiting.get())
+            if chunks[-1] is _done:
+                chunks.pop()
+                finished = True
+            size = sum(len(x) for x in chunks)
+            if size > 0 and self._failure is None:
+                start = time.perf_counter()
+                try:
+                    self._fp.write(b''.join(chunks))
+                except BaseException as exception:
+                    # Reported by the next write, or the close. The rest is dropped
+                    self._failure = exception
+                self._stats.add(f'seconds.io.{self._name}', time.perf_counter() - start)
+            self._room.release(size)
+
+def write_behind(fp: t.BinaryIO, budget: int, stats: t.Optional[Stats] = None, name: str = 'write', buffer_size: int = 1024 * 1024) -> t.BinaryIO:
+    """
+    Writes to the file on a background thread, so formatting the next rows or lines never waits on the disk.
+    The writes are gathered into `buffer_size` chunks, then the chunks waiting are joined into a single write.
+    A compressed file is compressed on the background thread too.
+    Closing the returned file waits for the writes then closes `fp`. A failure to write is raised by the next write or the close.
+
+    Parameters
+    ----------
+    fp : t.BinaryIO
+        The file (I.E. from `open_output`)
+    budget : int
+        The bytes that can be waiting to be written. 0 means write in this thread, to `fp` itself
+    stats : Stats
+        Counts the same `queue.{name}` items, bytes and seconds as `read_ahead`, from the writer's side.
+        Mostly `full` means writing is the bottleneck.
+        The `seconds.io.{name}` spent in the writes themselves are added too.
+    name : str
+        The name of the stage in `stats`
+    buffer_size : int
+        The size of the chunks handed to the thread
+    """
+    if budget <= 0:
+        return fp
+    return io.BufferedWriter(_WriteBehind(fp, budget, stats if stats is not None else Stats(), name), buffer_size) # type: ignore
@@ -0,0 +1,156 @@
+import contextlib
+import datetime
+import json
+import os
+import pathlib
+import re
+import time
+import typing as t
+from ..dtypes import Stats
+from .progress_helper import byte_progress, every
+
+@contextlib.contextmanager
+def monitor_run(mode: str, title: str, stats: Stats, total: int, units: int, report: t.Optional[pathlib.Path] = None, prometheus: t.Optional[pathlib.Path] = None, interval: float = 15) -> t.Iterator[None]:
+    """
+    Shows the run's progress, by bytes of the tar balls, while the body of the `with` runs.
+    Optionally keeps a Prometheus textfile up to date and writes a JSON report at the end, even when the run fails.
+
+    Parameters
+    ----------
+    mode : str
+        The name of the mode (I.E. convert) used to label the report
+    title : str
+        The progress bar's title
+    stats : Stats
+        The run's counters. The `source_bytes` and `documents` drive the progress bar
+    total : int
+        The number of bytes in the tar balls to be processed
+    units : int
+        The number of tar balls, or parts, to be processed
+    report : pathlib.Path
+        The JSON file for the run's report
+    prometheus : pathlib.Path
+        The Prometheus textfile (I.E. for the node exporter's textfile collector)
+    interval : float
+        The seconds between updates of the Prometheus textfile
+    """
+    started = time.time()
+    start = time.perf_counter()
+    def _export() -> None:
+        write_prometheus(prometheus, mode, stats, time.perf_counter() - start, total) # type: ignore
+    completed = False
+    try:
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(byte_progress(title, total, lambda: stats['source_bytes'], lambda: stats['documents']))
+            if prometheus is not None:
+                stack.enter_context(every(interval, _export))
+            yield
+        completed = True
+    finally:
+        if report is not None:
+            write_stats_report(report, mode, stats, started, time.perf_counter() - start, total, units, completed)
+
+def write_stats_report(path: pathlib.Path, mode: str, stats: Stats, started: float, elapsed: float, total: int, units: int, completed: bool) -> None:
+    """
+    Writes the run's counters, seconds per stage, throughput, queues and slowest documents as JSON.
+    The seconds of the stages run by `workers` are added up across the workers so they can be more than the elapsed time.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The JSON file
+    mode : str
+        The name of the mode (I.E. convert)
+    stats : Stats
+        The run's counters
+    started : float
+        When the run started, as seconds since the epoch
+    elapsed : float
+        The seconds the run took
+    total : int
+        The number of bytes in the tar balls to be processed
+    units : int
+        The number of tar balls, or parts, processed
+    completed : bool
+        False when the run failed part way through
+    """
+    counters = stats.counters()
+    seconds = max(elapsed, 1e-9)
+    report = {
+        'mode': mode,
+        'started': datetime.datetime.fromtimestamp(started, datetime.timezone.utc).isoformat(),
+        'elapsed_seconds': elapsed,
+        'completed': completed,
+        'units': units,
+        'source_bytes_total': total,
+        'counters': dict(sorted(counters.items())),
+        'stage_seconds': dict(sorted(stats.timers().items())),
+        'rates': {
+            'documents_per_second': counters.get('documents', 0) / seconds,
+            'source_mb_per_second': counters.get('source_bytes', 0) / seconds / 1e6,
+            'output_mb_per_second': counters.get('output_bytes', 0) / seconds / 1e6 },
+        'queues': _queues(stats),
+        'slowest_documents': [{ 'name': name, 'seconds': seconds } for seconds, name in stats.slowest()] }
+    _write_atomic(path, json.dumps(report, indent = 2) + '\n')
+
+def write_prometheus(path: pathlib.Path, mode: str, stats: Stats, elapsed: float, total: int) -> None:
+    """
+    Writes the run's counters in the Prometheus text format.
+    Each counter is `oas_{name}_total` and each stage is `oas_stage_seconds_total{stage="{name}"}`, all labeled with the mode.
+    The file is replaced in one step so a scrape never sees half of it.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The textfile
+    mode : str
+        The name of the mode (I.E. convert)
+    stats : Stats
+        The run's counters
+    elapsed : float
+        The seconds the run has taken so far
+    total : int
+        The number of bytes in the tar balls to be processed
+    """
+    label = f'mode="{mode}"'
+    lines: t.List[str] = []
+    def _metric(name: str, kind: str, samples: t.List[t.Tuple[str, float]]) -> None:
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(f'{name}{{{labels}}} {_sample(value)}' for labels, value in samples)
+    for name, value in sorted(stats.counters().items()):
+        _metric(f'oas_{_metric_name(name)}_total', 'counter', [(label, value)])
+    timers = sorted(stats.timers().items())
+    if len(timers) > 0:
+        _metric('oas_stage_seconds_total', 'counter', [(f'{label},stage="{name}"', value) for name, value in timers])
+    _metric('oas_source_bytes_planned', 'gauge', [(label, total)])
+    _metric('oas_elapsed_seconds', 'gauge', [(label, elapsed)])
+    _metric('oas_last_update_timestamp_seconds', 'gauge', [(label, time.time())])
+    _write_atomic(path, '\n'.join(lines) + '\n')
+
+def _queues(stats: Stats) -> t.Dict[str, t.Dict[str, float]]:
+    """
+    The mean bytes waiting in each stage's queue, and the seconds either side of it waited on the other
+    """
+    counters = stats.counters()
+    timers = stats.timers()
+    result: t.Dict[str, t.Dict[str, float]] = {}
+    for name in sorted({x.split('.')[1] for x in counters.keys() if x.startswith('queue.')}):
+        items = counters.get(f'queue.{name}.items', 0)
+        result[name] = {
+            'items': items,
+            'mean_bytes_waiting': counters.get(f'queue.{name}.bytes', 0) / max(items, 1),
+            'seconds_full': timers.get(f'queue.{name}.full', 0),
+            'seconds_empty': timers.get(f'queue.{name}.empty', 0) }
+    return result
+
+def _sample(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _metric_name(name: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+def _write_atomic(path: pathlib.Path, text: str) -> None:
+    temp = path.with_name(f'{path.name}.tmp')
+    with open(temp, 'w', encoding = 'utf-8', newline = '\n') as fp:
+        fp.write(text)
+    os.replace(temp, path)
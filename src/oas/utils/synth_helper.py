@@ -0,0 +1,172 @@
+import hashlib
+import io
+import math
+import pathlib
+import random
+import tarfile as tf
+import typing as t
+from ..dtypes import NamedDocument
+
+# Words for the made up text. The abbreviations and numbers keep the sentence splitter honest
+_words = [
+    'the', 'of', 'and', 'in', 'to', 'a', 'with', 'for', 'was', 'were', 'is', 'by', 'that', 'on', 'as', 'from', 'at', 'or', 'be', 'this',
+    'patients', 'cells', 'expression', 'protein', 'analysis', 'treatment', 'study', 'data', 'results', 'response', 'clinical', 'gene',
+    'levels', 'group', 'significant', 'model', 'activity', 'disease', 'samples', 'effect', 'increased', 'observed', 'associated', 'function',
+    'cohort', 'receptor', 'pathway', 'mice', 'tissue', 'dose', 'risk', 'binding', 'signal', 'infection', 'tumor', 'mutation', 'sequence',
+    'et al.', 'Fig.', 'e.g.', 'i.e.', 'approx.', 'vs.', '0.05', '12.5', '3.2%', '(n = 24)', 'p &lt; 0.001', '95%', 'IL-6', 'CD4+', 'mRNA']
+_journals = ['PLoS One', 'BMC Genomics', 'Nucleic Acids Res', 'Sci Rep', 'Front Immunol', 'J Biol Chem', 'Cell Rep', 'eLife']
+_subjects = ['Research Article', 'Review', 'Methods', 'Brief Report', 'Case Report']
+_given = ['Anna', 'Wei', 'Carlos', 'Fatima', 'John', 'Yuki', 'Olga', 'Ravi', 'Maria', 'Lars']
+_surnames = ['Smith', 'Wang', 'Garcia', 'Khan', 'Müller', 'Tanaka', 'Ivanova', 'Patel', 'Rossi', 'Nielsen']
+
+class SynthOptions(t.NamedTuple):
+    """
+    The shape of a synthetic corpus
+    """
+    articles: int = 1000
+    seed: int = 0
+    # The median number of body paragraphs. Sizes are log normal, like the real corpus
+    paragraphs: int = 20
+    sigma: float = 0.8
+    # The fraction of articles with an abstract
+    abstract: float = 0.9
+    # The mean number of tables per article
+    tables: float = 1.0
+    # The fraction of articles that are malformed, half recoverable (an undeclared namespace) and half cut short
+    malformed: float = 0.02
+
+def synth_documents(options: SynthOptions) -> t.Iterator[NamedDocument]:
+    """
+    Makes PMC style JATS documents.
+    The same options always make the same documents.
+
+    Parameters
+    ----------
+    options : SynthOptions
+        The shape of the corpus
+    """
+    rng = random.Random(options.seed)
+    for i in range(options.articles):
+        pmcid = 1000000 + i
+        paragraphs = max(1, int(round(options.paragraphs * math.exp(rng.gauss(0, options.sigma)))))
+        abstract = rng.random() < options.abstract
+        tables = _poisson(rng, options.tables)
+        malformed = rng.random() < options.malformed
+        document = _synth_document(rng, pmcid, paragraphs, abstract, tables, malformed)
+        yield NamedDocument(f'PMC{pmcid // 1000000:03}xxxxxx/PMC{pmcid}.xml', document)
+
+def write_synth_tar_ball(path: pathlib.Path, options: SynthOptions) -> str:
+    """
+    Writes a synthetic tar ball, byte for byte the same for the same options.
+    The SHA-256 of the tar ball is returned so results can be matched to the data they came from.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The .tar file
+    options : SynthOptions
+        The shape of the corpus
+    """
+    with tf.open(path, 'w', format = tf.GNU_FORMAT) as tar_ball:
+        for name, document in synth_documents(options):
+            info = tf.TarInfo(name)
+            info.size = len(document) # type: ignore
+            info.mtime = 0
+            tar_ball.addfile(info, io.BytesIO(document)) # type: ignore
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _synth_document(rng: random.Random, pmcid: int, paragraphs: int, abstract: bool, tables: int, malformed: bool) -> bytes:
+    recoverable = malformed and rng.random() < 0.5
+    parts: t.List[str] = []
+    parts.append('<?xml version="1.0" encoding="UTF-8"?>\n')
+    parts.append('<!DOCTYPE article PUBLIC "-//NLM//DTD JATS (Z39.96) Journal Archiving and Interchange DTD v1.2 20190208//EN" "JATS-archivearticle1.dtd">\n')
+    if recoverable:
+        # xlink is used below but never declared, so only the recover parser reads it
+        parts.append('<article article-type="research-article">\n')
+    else:
+        parts.append('<article xmlns:xlink="http://www.w3.org/1999/xlink" article-type="research-article">\n')
+    parts.append(_front(rng, pmcid, abstract))
+    parts.append('<body>\n')
+    sections = max(1, paragraphs // 5)
+    for s in range(sections):
+        parts.append(f'<sec id="s{s + 1}">\n<title>{_sentence(rng, 2, 5)[:-1]}</title>\n')
+        for _ in range(paragraphs // sections + (1 if s < paragraphs % sections else 0)):
+            parts.append(f'<p>{_paragraph(rng)}</p>\n')
+        if s < tables:
+            parts.append(_table(rng, s + 1))
+        parts.append('</sec>\n')
+    for s in range(sections, tables):
+        parts.append(_table(rng, s + 1))
+    parts.append('</body>\n')
+    parts.append(_back(rng))
+    parts.append('</article>\n')
+    document = ''.join(parts).encode('utf-8')
+    if malformed and not recoverable:
+        document = document[:rng.randint(0, len(document) // 2)]
+    return document
+
+def _front(rng: random.Random, pmcid: int, abstract: bool) -> str:
+    journal = rng.choice(_journals)
+    year = rng.randint(1995, 2024)
+    authors = ''.join(f'<contrib contrib-type="author"><name><surname>{rng.choice(_surnames)}</surname><given-names>{rng.choice(_given)}</given-names></name></contrib>' for _ in range(rng.randint(1, 8)))
+    result = \
+        '<front>\n<journal-meta>\n' \
+        f'<journal-id journal-id-type="nlm-ta">{journal}</journal-id>\n' \
+        f'<journal-title-group><journal-title>{journal}</journal-title></journal-title-group>\n' \
+        f'<issn pub-type="epub">{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}</issn>\n' \
+        '</journal-meta>\n<article-meta>\n' \
+        f'<article-id pub-id-type="pmc">{pmcid}</article-id>\n' \
+        f'<article-id pub-id-type="doi">10.{rng.randint(1000, 9999)}/synth.{pmcid}</article-id>\n' \
+        f'<article-categories><subj-group subj-group-type="heading"><subject>{rng.choice(_subjects)}</subject></subj-group></article-categories>\n' \
+        f'<title-group><article-title>{_sentence(rng, 6, 16)[:-1]} <italic>in vivo</italic></article-title></title-group>\n' \
+        f'<contrib-group>{authors}</contrib-group>\n' \
+        f'<pub-date pub-type="epub"><day>{rng.randint(1, 28)}</day><month>{rng.randint(1, 12)}</month><year>{year}</year></pub-date>\n' \
+        f'<volume>{rng.randint(1, 60)}</volume>\n<issue>{rng.randint(1, 12)}</issue>\n'
+    if abstract:
+        result += '<abstract>\n' + ''.join(f'<p>{_paragraph(rng)}</p>\n' for _ in range(rng.randint(1, 3))) + '</abstract>\n'
+    return result + '</article-meta>\n</front>\n'
+
+def _back(rng: random.Random) -> str:
+    refs = ''.join(
+        f'<ref id="R{i + 1}"><element-citation publication-type="journal"><person-group person-group-type="author"><name><surname>{rng.choice(_surnames)}</surname><given-names>{rng.choice(_given)[0]}</given-names></name></person-group>'
+        f'<article-title>{_sentence(rng, 5, 12)[:-1]}</article-title><source>{rng.choice(_journals)}</source><year>{rng.randint(1970, 2024)}</year>'
+        f'<ext-link xlink:href="https://doi.org/10.{rng.randint(1000, 9999)}/{i}" ext-link-type="uri">link</ext-link></element-citation></ref>\n'
+        for i in range(rng.randint(5, 60)))
+    return f'<back>\n<ack><p>{_sentence(rng, 8, 20)}</p></ack>\n<ref-list>\n{refs}</ref-list>\n</back>\n'
+
+def _table(rng: random.Random, number: int) -> str:
+    rows = ''.join('<tr>' + ''.join(f'<td>{rng.choice(_words)}</td>' for _ in range(5)) + '</tr>' for _ in range(rng.randint(3, 30)))
+    return \
+        f'<table-wrap id="T{number}"><label>Table {number}</label><caption><p>{_sentence(rng, 5, 15)}</p></caption>' \
+        f'<table frame="hsides"><thead><tr>{"".join(f"<th>{rng.choice(_words)}</th>" for _ in range(5))}</tr></thead><tbody>{rows}</tbody></table></table-wrap>\n'
+
+def _paragraph(rng: random.Random) -> str:
+    sentences = [_sentence(rng, 5, 30) for _ in range(rng.randint(1, 8))]
+    if rng.random() < 0.5:
+        i = rng.randrange(len(sentences))
+        sentences[i] = sentences[i][:-1] + f' [<xref ref-type="bibr" rid="R{rng.randint(1, 5)}">{rng.randint(1, 5)}</xref>].'
+    return ' '.join(sentences)
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    words = [rng.choice(_words) for _ in range(rng.randint(low, high))]
+    words[0] = words[0][0].upper() + words[0][1:]
+    if rng.random() < 0.2:
+        i = rng.randrange(len(words))
+        words[i] = f'<italic>{words[i]}</italic>'
+    return ' '.join(words) + rng.choice('..........?!')
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    """
+    Knuth's method, fine for the small means used here
+    """
+    limit = math.exp(-mean)
+    count = 0
+    product = rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
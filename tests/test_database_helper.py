@@ -0,0 +1,46 @@
+import os
+from oas.utils import csv_shard_fields, load_csv_shards, open_database
+
+fields = ['id', 'doi', 'year']
+
+def _write(path, rows):
+    path.write_text(''.join(','.join(row) + '\n' for row in [fields] + rows), encoding = 'utf-8')
+
+def _rows(path, shards):
+    database = open_database(path, fields)
+    try:
+        load_csv_shards(database, shards)
+        return sorted(database.execute('SELECT id, doi, year, shard FROM articles'))
+    finally:
+        database.close()
+
+def _shards(folder):
+    shards = [folder / 'a.csv', folder / 'b.csv', folder / 'c.csv']
+    _write(shards[0], [['1', 'a1', '2001'], ['2', 'a2', '2002'], ['3', 'a3', '2003']])
+    _write(shards[1], [['2', 'b2', '2012'], ['4', 'b4', '2014']])
+    _write(shards[2], [['3', 'c3', '2023'], ['4', 'c4', '2024'], ['5', 'c5', '2025']])
+    return shards
+
+def test_last_shard_in_order_wins(tmp_path):
+    shards = _shards(tmp_path)
+    rows = _rows(tmp_path / 'full.sqlite', shards)
+    assert rows == [('1', 'a1', 2001, 'a.csv'), ('2', 'b2', 2012, 'b.csv'), ('3', 'c3', 2023, 'c.csv'), ('4', 'c4', 2024, 'c.csv'), ('5', 'c5', 2025, 'c.csv')]
+
+def test_changed_shard_matches_full_load(tmp_path):
+    shards = _shards(tmp_path)
+    _rows(tmp_path / 'incremental.sqlite', shards)
+    _write(shards[0], [['1', 'a1', '2001'], ['3', 'a3', '2003'], ['4', 'a4', '2004'], ['6', 'a6', '2006']])
+    os.utime(shards[0], ns = (1, 1))
+    assert _rows(tmp_path / 'incremental.sqlite', shards) == _rows(tmp_path / 'full.sqlite', shards)
+
+def test_removed_shard_restores_ids(tmp_path):
+    shards = _shards(tmp_path)
+    _rows(tmp_path / 'incremental.sqlite', shards)
+    rows = _rows(tmp_path / 'incremental.sqlite', shards[:2])
+    assert rows == _rows(tmp_path / 'full.sqlite', shards[:2])
+    assert [x[0] for x in rows] == ['1', '2', '3', '4']
+
+def test_csv_shard_fields(tmp_path):
+    shards = _shards(tmp_path)
+    assert csv_shard_fields([tmp_path / 'missing.csv'] + shards) == fields
+    assert csv_shard_fields([tmp_path / 'missing.csv']) is None
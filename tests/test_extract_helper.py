@@ -0,0 +1,106 @@
+import pytest
+from lxml import etree # type: ignore
+from oas.utils import extractors, needed_sections, optional_extractor
+from oas.utils.synth_helper import SynthOptions, synth_documents
+
+# The extractors as they were before the XPath expressions were compiled, kept to check the compiled ones give the same output
+_translate = str.maketrans({'“':'"', '”':'"', "‘":"'", "’":"'", "`":"'"})
+
+def _clean_str(text):
+    return ' '.join(text.split()).translate(_translate)
+
+def _ncs(txt):
+    if txt is None:
+        return None
+    txt = _clean_str(txt)
+    return None if len(txt) == 0 else txt
+
+def _nct(obj):
+    return None if obj is None else _ncs(obj.text)
+
+def _ncls(list):
+    if list is None or len(list) == 0:
+        return None
+    return [item for item in (_ncs(item) for item in list) if item is not None]
+
+def _author_name(node):
+    given = next(iter(node.xpath('./given-names/text()') or []), '')
+    sur = next(iter(node.xpath('./surname/text()') or []), '')
+    full = f'{given} {sur}'.strip()
+    return full if len(full) > 3 else '???'
+
+def _paragraphs(root, xpaths):
+    for xpath in xpaths:
+        result = [''.join(node.xpath('.//text()')) for node in root.xpath(xpath)]
+        if len(result) > 0:
+            return result
+    return []
+
+reference = {
+    'id': lambda root: _nct(root.find("./front/article-meta/article-id[@pub-id-type='pmc']")),
+    'journal': lambda root: _nct(root.find('./front/journal-meta//journal-title')),
+    'volume': lambda root: _nct(root.find('./front/article-meta/volume')),
+    'issue': lambda root: _nct(root.find('./front/article-meta/issue')),
+    'year': lambda root: min(map(int, root.xpath('./front/article-meta/pub-date/year/text()'))),
+    'category': lambda root: _ncs(';'.join([x for x in map(_nct, root.xpath('./front/article-meta/article-categories//subject')) if x is not None])),
+    'doi': lambda root: _ncs(';'.join(map(_nct, root.xpath("./front/article-meta/article-id[@pub-id-type='doi']")))),
+    'issn': lambda root: _ncs(';'.join([x for x in map(_nct, root.xpath('./front/journal-meta/issn')) if x is not None])),
+    'authors': lambda root: _ncs(';'.join(map(_author_name, root.xpath('./front/article-meta/contrib-group/contrib/name')))),
+    'title': lambda root: _ncs(' '.join(''.join(root.xpath('./front/article-meta/title-group/article-title//text()')).split())),
+    'abstract': lambda root: _ncls(_paragraphs(root, ['./front/article-meta/abstract//p', './front/article-meta/trans-abstract//p'])),
+    'body': lambda root: _ncls(_paragraphs(root, ['./body//sec/p', './body/p'])),
+    'references': lambda root: len(root.findall('./back/ref-list/ref')) }
+
+# The cases the synthetic corpus does not make
+handmade = [
+    b"""<article><front>
+        <journal-meta><journal-title-group><journal-title> J  \xe2\x80\x9cQuoted\xe2\x80\x9d </journal-title></journal-title-group><issn>1</issn><issn/><issn>2</issn></journal-meta>
+        <article-meta>
+            <article-id pub-id-type="pmc">123</article-id><article-id pub-id-type="doi">10.1/a</article-id><article-id pub-id-type="doi">10.1/b</article-id>
+            <article-categories><subj-group><subject>A</subject><subj-group><subject>B</subject></subj-group></subj-group></article-categories>
+            <title-group><article-title>A <italic>mixed</italic>
+                title</article-title></title-group>
+            <contrib-group><contrib><name><surname>Li</surname></name></contrib><contrib><name><given-names>Ann</given-names><surname>Lee</surname></name></contrib></contrib-group>
+            <pub-date><year>2012</year></pub-date><pub-date><year>2010</year></pub-date>
+            <trans-abstract><p>Only a <bold>translated</bold> abstract.</p><p> </p></trans-abstract>
+        </article-meta></front>
+        <body><p>Loose paragraph.</p><sec><p>In a section.</p><sec><p>Nested.</p></sec></sec></body>
+        <back><ref-list><ref/><ref/></ref-list></back></article>""",
+    b"""<article><front><journal-meta/><article-meta><pub-date><season>Spring</season></pub-date></article-meta></front>
+        <body><p>Only loose.</p><p>Paragraphs.</p></body></article>""",
+    b'<article><front/></article>']
+
+def _outcome(extractor, root):
+    """
+    The value extracted, or the type of error raised
+    """
+    try:
+        return extractor(root)
+    except Exception as exception:
+        return type(exception)
+
+def _documents():
+    for seed in range(3):
+        for doc in synth_documents(SynthOptions(articles = 50, seed = seed, malformed = 0.1)):
+            yield doc.name, doc.document
+    for i, document in enumerate(handmade):
+        yield f'handmade{i}', document
+
+@pytest.mark.parametrize('name', [x for x in reference.keys()])
+def test_compiled_match_previous(name):
+    parser = etree.XMLParser(recover = True)
+    assert extractors.keys() == reference.keys()
+    compared = 0
+    for doc_name, document in _documents():
+        root = etree.fromstring(document, parser)
+        if root is None:
+            continue
+        assert _outcome(extractors[name], root) == _outcome(reference[name], root), doc_name
+        compared += 1
+    assert compared > 150
+
+def test_optional_extractor():
+    year = optional_extractor(extractors['year'])
+    assert year(etree.fromstring(handmade[0])) == 2010
+    assert year(etree.fromstring(handmade[1])) is None
+    assert needed_sections({'id': extractors['id'], 'year': year}) == frozenset(['front'])
@@ -0,0 +1,101 @@
+import os
+from oas.dtypes import Convert as settings_conv
+from oas.dtypes import Filter
+from oas.dtypes import Manifest
+from oas.dtypes import Metadata as settings_meta
+from oas.modes import Convert, Metadata
+from oas.utils.synth_helper import SynthOptions, write_synth_tar_ball
+
+def _source(folder):
+    source = folder / 'src'
+    source.mkdir()
+    folder.joinpath('log').mkdir()
+    for i in range(2):
+        write_synth_tar_ball(source / f'pack{i}.tar', SynthOptions(articles = 20, seed = i, paragraphs = 3, malformed = 0))
+    return source
+
+def _convert(folder, **kwargs):
+    settings = dict(lines = 1000000, dest_pattern = '{source}.{id:04}.txt')
+    settings.update(kwargs)
+    dest = folder / 'out'
+    dest.mkdir(exist_ok = True)
+    app = Convert(settings_conv(folder / 'src', dest, log = folder / 'log', **settings))
+    app.init()
+    app.run()
+    return dest
+
+def _metadata(folder, **kwargs):
+    dest = folder / 'metadata.csv'
+    app = Metadata(settings_meta(folder / 'src', dest, log = folder / 'log', **kwargs))
+    app.init()
+    app.run()
+    return [line.split(',') for line in dest.read_text(encoding = 'utf-8').splitlines()]
+
+def _files(dest):
+    return {x.name: x.stat().st_mtime_ns for x in dest.iterdir() if not x.name.startswith('oas.')}
+
+def _articles(dest):
+    return [line for path in sorted(dest.glob('*.txt')) for line in path.read_text(encoding = 'utf-8').splitlines() if line.startswith('--- ')]
+
+def _outputs(dest):
+    return {name for entry in Manifest(dest / 'oas.manifest.json').entries.values() for name in entry['outputs']}
+
+def _fingerprints(dest):
+    return {entry['fingerprint'] for entry in Manifest(dest / 'oas.manifest.json').entries.values()}
+
+def test_rerun_skips_the_same_settings(tmp_path):
+    _source(tmp_path)
+    before = _files(_convert(tmp_path))
+    assert _files(_convert(tmp_path)) == before
+
+def test_rerun_redoes_other_settings(tmp_path):
+    _source(tmp_path)
+    dest = _convert(tmp_path)
+    before, fingerprints = _files(dest), _fingerprints(dest)
+    _convert(tmp_path, lines = 50)
+    after = _files(dest)
+    assert len(after) > len(before)
+    assert all(after.get(name, 0) != mtime for name, mtime in before.items())
+    assert len(_fingerprints(dest)) == 1 and _fingerprints(dest) != fingerprints
+
+def test_rerun_redoes_other_fields(tmp_path):
+    source = _source(tmp_path)
+    assert len(_metadata(tmp_path)[0]) == 11
+    rows = _metadata(tmp_path, fields = ['id', 'doi', 'year'])
+    assert len(rows) == 41 and all(len(row) == 3 for row in rows)
+    os.utime(source / 'pack1.tar', ns = (1, 1))
+    rows = _metadata(tmp_path)
+    assert len(rows) == 41 and len(rows[0]) == 11
+
+def test_rerun_redoes_other_filters(tmp_path):
+    _source(tmp_path)
+    every = _metadata(tmp_path)
+    rows = _metadata(tmp_path, filter = Filter(year_min = 2010))
+    assert 1 < len(rows) < len(every)
+    assert _metadata(tmp_path, filter = Filter(year_min = 2010)) == rows
+    assert _metadata(tmp_path, filter = Filter()) == every
+    dest = _convert(tmp_path)
+    articles = _articles(dest)
+    assert 0 < len(_articles(_convert(tmp_path, filter = Filter(year_min = 2010)))) < len(articles)
+    assert _articles(_convert(tmp_path)) == articles
+
+def test_rerun_replaces_the_old_naming(tmp_path):
+    _source(tmp_path)
+    dest = _convert(tmp_path)
+    assert set(_files(dest)) == {'pack0.0000.txt', 'pack1.0000.txt'}
+    dest = _convert(tmp_path, compression = 'gzip')
+    assert set(_files(dest)) == {'pack0.0000.txt.gz', 'pack1.0000.txt.gz'} == _outputs(dest)
+    dest = _convert(tmp_path, compression = 'gzip', bytes = 4000)
+    assert len(_files(dest)) > 2 and all(name.endswith('.txt.gz') for name in _files(dest))
+    assert set(_files(dest)) == _outputs(dest)
+    dest = _convert(tmp_path)
+    assert set(_files(dest)) == {'pack0.0000.txt', 'pack1.0000.txt'} == _outputs(dest)
+
+def test_rerun_switches_the_format(tmp_path):
+    _source(tmp_path)
+    dest = _convert(tmp_path)
+    assert set(_files(dest)) == {'pack0.0000.txt', 'pack1.0000.txt'}
+    dest = _convert(tmp_path, format = 'jsonl')
+    assert set(_files(dest)) == {'pack0.0000.jsonl', 'pack0.0000.jsonl.idx', 'pack1.0000.jsonl', 'pack1.0000.jsonl.idx'} == _outputs(dest)
+    dest = _convert(tmp_path)
+    assert set(_files(dest)) == {'pack0.0000.txt', 'pack1.0000.txt'} == _outputs(dest)
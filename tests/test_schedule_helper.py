@@ -0,0 +1,41 @@
+import io
+import pytest
+import tarfile
+from oas.dtypes import TarPart
+from oas.utils import index_path, index_tar_parts, list_documents, list_tar_parts, merge_csv_shards, part_size
+
+def _tar_ball(path, count):
+    with tarfile.open(path, 'w') as tar:
+        for i in range(count):
+            data = f'<article>{"x" * (i * 97)}</article>'.encode('utf-8')
+            info = tarfile.TarInfo(f'PMC{i}.xml')
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+def test_index_tar_parts_covers_each_member_once(tmp_path):
+    tar_ball = _tar_ball(tmp_path / 'a.tar', 40)
+    units = index_tar_parts(list_tar_parts([tar_ball], 6))
+    assert index_path(tar_ball).exists()
+    assert [x.name for x in tmp_path.iterdir() if x.name.endswith('.tmp')] == []
+    names = [member.name for unit in units for member in unit.members]
+    assert sorted(names) == sorted(f'PMC{i}.xml' for i in range(40))
+    listed = [doc.name for unit in units for doc in list_documents(unit.path, part = unit.part, parts = unit.parts, members = unit.members)]
+    assert listed == names
+    assert sum(part_size(unit) for unit in units) <= tar_ball.stat().st_size
+
+def test_index_tar_parts_leaves_whole_tar_balls(tmp_path):
+    tar_ball = _tar_ball(tmp_path / 'a.tar', 3)
+    assert index_tar_parts([TarPart(tar_ball)]) == [TarPart(tar_ball)]
+    assert not index_path(tar_ball).exists()
+
+def test_merge_csv_shards_checks_the_headers(tmp_path):
+    shards = [tmp_path / 'a.csv', tmp_path / 'b.csv', tmp_path / 'c.csv']
+    shards[0].write_text('"id","doi","year"\n"1","a","2001"\n', encoding = 'utf-8')
+    shards[1].write_text('"id","doi","year"\n"2","b","2002"\n', encoding = 'utf-8')
+    shards[2].write_text('"id","year"\n"3","2003"\n', encoding = 'utf-8')
+    merge_csv_shards(shards[:2], tmp_path / 'merged.csv')
+    assert (tmp_path / 'merged.csv').read_text(encoding = 'utf-8') == '"id","doi","year"\n"1","a","2001"\n"2","b","2002"\n'
+    with pytest.raises(ValueError, match = 'c.csv'):
+        merge_csv_shards(shards, tmp_path / 'mixed.csv')
+    assert not (tmp_path / 'mixed.csv').exists()
@@ -0,0 +1,29 @@
+import pytest
+from oas.utils import SentenceSplitter
+
+# Each paragraph along with the sentences it must split into using the default abbreviations
+golden = [
+    ('Cells were incubated for 10 min. The supernatant was removed.', ['Cells were incubated for 10 min.', 'The supernatant was removed.']),
+    ('Spectra were compared (cf. Ref. 12). They matched.', ['Spectra were compared (cf. Ref. 12).', 'They matched.']),
+    ('Smith et al. 2020 showed this. It was replicated.', ['Smith et al. 2020 showed this.', 'It was replicated.']),
+    ('See Fig. 2 for details. Values are given in Eq. 3.', ['See Fig. 2 for details.', 'Values are given in Eq. 3.']),
+    ('Some solvents (e.g. Ethanol) work. Others, i.e. Water, do not.', ['Some solvents (e.g. Ethanol) work.', 'Others, i.e. Water, do not.']),
+    ('Is it safe? Yes! It is.', ['Is it safe?', 'Yes!', 'It is.']),
+    ('The ratio was 2.5 in total. 3 samples failed.', ['The ratio was 2.5 in total.', '3 samples failed.']),
+    ('Measured in nm. Ångström units were used.', ['Measured in nm.', 'Ångström units were used.']),
+    ('This is approx. Ten times more. not a new sentence.', ['This is approx. Ten times more. not a new sentence.']),
+    ('Treated vs. Untreated cells. Dr. Jones agreed.', ['Treated vs. Untreated cells.', 'Dr. Jones agreed.']),
+    ('No sentence end', ['No sentence end']),
+    ('', [])]
+
+@pytest.mark.parametrize('paragraph, sentences', golden)
+def test_split_paragraphs(paragraph, sentences):
+    assert SentenceSplitter().split_paragraphs([paragraph]) == [sentences]
+
+def test_split_collapses_white_space():
+    assert SentenceSplitter().split(' One.\n  Two.\t') == ['One.', 'Two.']
+
+def test_abbreviations_replace_the_defaults():
+    splitter = SentenceSplitter(['Min.'])
+    assert splitter.split('Cells were incubated for 10 min. The supernatant was removed.') == ['Cells were incubated for 10 min. The supernatant was removed.']
+    assert splitter.split('See Fig. 2 for details.') == ['See Fig.', '2 for details.']